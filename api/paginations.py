@@ -1,5 +1,9 @@
+from rest_framework import pagination
 from rest_framework.response import Response
 from rest_framework.pagination import PageNumberPagination
+from rest_framework.utils.urls import replace_query_param, remove_query_param
+
+from rating_movies.services.crud import crud_utils
 
 
 class BasePagination(PageNumberPagination):
@@ -22,3 +26,47 @@ class MovieAPIListPagination(PageNumberPagination):
             },
             "result": data
         })
+
+
+class MovieAPICursorPagination(pagination.BasePagination):
+    """Pagination by key (world_premiere, id): /movies/?cursor=<cursor>&page_size=<number>&count=true.
+    The number of movies is returned only if it was requested and it is approximate"""
+    page_size = 5
+    page_size_query_param = "page_size"
+    max_page_size = 50
+    cursor_query_param = "cursor"
+    count_query_param = "count"
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.count = None
+        if request.query_params.get(self.count_query_param, "").lower() in ("1", "true"):
+            self.count = crud_utils.get_approximate_count(queryset)
+
+        self.page = crud_utils.paginate_by_keyset(
+            queryset, cursor=request.query_params.get(self.cursor_query_param), page_size=self.get_page_size(request)
+        )
+        return self.page.objects
+
+    def get_page_size(self, request) -> int:
+        try:
+            page_size = int(request.query_params.get(self.page_size_query_param, self.page_size))
+        except ValueError:
+            return self.page_size
+        return min(max(page_size, 1), self.max_page_size)
+
+    def get_link(self, cursor):
+        url = self.request.build_absolute_uri()
+        if cursor is None:
+            return None
+        return replace_query_param(remove_query_param(url, self.count_query_param), self.cursor_query_param, cursor)
+
+    def get_paginated_response(self, data):
+        return Response({
+            "count": self.count,
+            "links": {
+                "next": self.get_link(self.page.next_cursor),
+                "previous": self.get_link(self.page.previous_cursor),
+            },
+            "result": data
+        })
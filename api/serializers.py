@@ -1,6 +1,8 @@
 from rest_framework import serializers
 
 from rating_movies import models
+from rating_movies.services.crud import catalogue_import
+from rating_movies.services.api.crypto_currency import crypto_currency_service
 
 
 class RecursiveReviewSerializer(serializers.Serializer):
@@ -17,6 +19,75 @@ class FilterReviewListSerializer(serializers.ListSerializer):
         return super().to_representation(data=new_data)
 
 
+class SuggestionSerializer(serializers.Serializer):
+    """Output movie titles and actor/director names found by autocomplete"""
+    type = serializers.CharField()
+    id = serializers.IntegerField(source="pk")
+    text = serializers.CharField()
+    url = serializers.CharField(source="get_absolute_url")
+    similarity = serializers.FloatField()
+
+
+class CurrencyRateRangeSerializer(serializers.Serializer):
+    """Validate period of the currency rate series: ?start=YYYY-MM-DD&end=YYYY-MM-DD"""
+    start = serializers.DateField()
+    end = serializers.DateField()
+
+    def validate(self, attrs):
+        if attrs["start"] > attrs["end"]:
+            raise serializers.ValidationError("'start' must not be later than 'end'")
+        return attrs
+
+
+class CurrencyRateSerializer(serializers.Serializer):
+    date = serializers.DateField()
+    nominal = serializers.IntegerField()
+    value = serializers.FloatField()
+    unit_value = serializers.FloatField()
+
+
+class CurrencyRateSeriesSerializer(serializers.Serializer):
+    """Output rates of one currency for a period and their statistics"""
+    char_code = serializers.CharField()
+    start = serializers.DateField()
+    end = serializers.DateField()
+    min = serializers.FloatField(allow_null=True)
+    max = serializers.FloatField(allow_null=True)
+    mean = serializers.FloatField(allow_null=True)
+    series = CurrencyRateSerializer(many=True)
+
+
+class CryptoCurrencyQuerySerializer(serializers.Serializer):
+    """Validate window of the crypto currency table: ?offset=0&limit=10&columns=name,price&sorting=descending:2"""
+    offset = serializers.IntegerField(min_value=0, default=0)
+    limit = serializers.IntegerField(min_value=1, max_value=crypto_currency_service.MAX_LIMIT,
+                                     default=crypto_currency_service.DEFAULT_LIMIT)
+    columns = serializers.CharField(required=False)
+    sorting = serializers.RegexField(r"^(ascending|descending):\d$", required=False)
+
+    def validate_columns(self, value: str) -> tuple[str, ...]:
+        columns = tuple(dict.fromkeys(column.strip() for column in value.split(",") if column.strip()))
+        unknown_columns = [column for column in columns if column not in crypto_currency_service.COLUMNS]
+        if not columns or unknown_columns:
+            raise serializers.ValidationError(
+                f"Available columns: {', '.join(crypto_currency_service.COLUMNS)}"
+            )
+        return columns
+
+
+class MovieImportSerializer(serializers.Serializer):
+    """Validate file of the bulk movie import: CSV with header or JSON lines, format is taken from the extension"""
+    file = serializers.FileField()
+    format = serializers.ChoiceField(choices=tuple(catalogue_import.READERS), required=False)
+
+    def validate(self, attrs):
+        if "format" not in attrs:
+            attrs["format"] = catalogue_import.get_format(attrs["file"].name)
+            if attrs["format"] is None:
+                raise serializers.ValidationError("'format' must be set for files without .csv or .jsonl extension")
+        return attrs
+
+
 class ActorListSerializer(serializers.ModelSerializer):
     class Meta:
         model = models.Actor
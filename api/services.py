@@ -5,7 +5,6 @@ from rest_framework.exceptions import PermissionDenied
 from rest_framework.permissions import IsAuthenticated, IsAdminUser
 
 from rating_movies.models import Movie
-from rating_movies.services.crud import update, read
 
 
 class GenresInFilter(rest_framework.BaseInFilter, rest_framework.CharFilter):
@@ -38,12 +37,3 @@ class MovieFilter(rest_framework.FilterSet):
         model = Movie
         fields = ("genres", "year")
 
-
-def update_movie_other_sources_rating_api(pk: int, data: dict = None) -> None:
-    """Update OtherSourcesRating instance using gotten params: pk and data.
-    If data wasn't given then get movie by pk and add needed information"""
-    if data is None or not ("title" in data and "world_premiere" in data):
-        movie = read.get_movie_by_parameters(pk=pk)
-        data = {"title": movie.title, "world_premiere": movie.world_premiere}
-
-    update.update_movie_other_sources_rating(movie_cleaned_data=data)
@@ -1,7 +1,9 @@
 import json
 from datetime import date
+from unittest import mock
 
 from django.urls import reverse
+from django.core.files.uploadedfile import SimpleUploadedFile
 from rest_framework import status
 from django.db import connection
 from django.test.utils import CaptureQueriesContext
@@ -10,6 +12,8 @@ from django.contrib.auth.models import User
 
 from api import serializers, views
 from rating_movies import models
+from rating_movies.services import suggest
+from rating_movies.services.api.crypto_currency import crypto_currency_api, crypto_currency_service
 
 
 class ActorAPITestCase(APITestCase):
@@ -212,3 +216,237 @@ class RatingAPITestCase(APITestCase):
 
         self.assertEqual(status.HTTP_204_NO_CONTENT, response.status_code)
         self.assertEqual(1, ratings_number)
+
+
+class MovieAPITestCase(APITestCase):
+    def setUp(self):
+        self.factory = APIRequestFactory()
+        self.user = User.objects.create_user("user")
+
+        first_star = models.RatingStar.objects.create(value=3)
+        second_star = models.RatingStar.objects.create(value=5)
+
+        self.first_movie = models.Movie.objects.create(title="First movie")
+        self.second_movie = models.Movie.objects.create(title="Second movie")
+
+        models.Rating.objects.create(ip="127.0.0.1", star=first_star, movie=self.first_movie)
+        models.Rating.objects.create(ip="127.0.0.2", star=second_star, movie=self.first_movie)
+
+    def test_movie_list_rating(self):
+        view = views.MovieAPIViewSet.as_view({"get": "list"})
+        request = self.factory.get("/", REMOTE_ADDR="127.0.0.1")
+        force_authenticate(request, user=self.user)
+
+        response = view(request)
+        results = {movie["id"]: movie for movie in response.data.get("result")}
+
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        self.assertEqual(4, results[self.first_movie.id]["average_rating"])
+        self.assertEqual(True, results[self.first_movie.id]["user_rating"])
+        self.assertEqual(None, results[self.second_movie.id]["average_rating"])
+        self.assertEqual(False, results[self.second_movie.id]["user_rating"])
+
+    def test_movie_retrieve_is_read_only(self):
+        view = views.MovieAPIViewSet.as_view({"get": "retrieve"})
+        request = self.factory.get("/")
+        force_authenticate(request, user=self.user)
+
+        with CaptureQueriesContext(connection) as context:
+            response = view(request, pk=self.second_movie.pk)
+
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        self.assertTrue(all(query["sql"].startswith("SELECT") for query in context.captured_queries))
+        self.assertFalse(models.RatingEnrichmentTask.objects.exists())
+
+
+class MovieCursorPaginationAPITestCase(APITestCase):
+    def setUp(self):
+        self.factory = APIRequestFactory()
+        self.user = User.objects.create_user("user")
+        self.movies = [
+            models.Movie.objects.create(
+                title=f"Movie {number}", world_premiere=date(year=2000 + number // 2, month=1, day=1)
+            )
+            for number in range(7)
+        ]
+        # two movies have the same premiere date, so the order depends on id too
+        self.view = views.MovieAPIViewSet.as_view({"get": "list"})
+
+    def _get(self, url: str):
+        request = self.factory.get(url)
+        force_authenticate(request, user=self.user)
+        return self.view(request)
+
+    def test_cursor_pagination(self):
+        expected_ids = [movie.id for movie in sorted(self.movies, key=lambda m: (m.world_premiere, m.id), reverse=True)]
+        ids, pages, url = [], [], "/?page_size=3&count=true"
+        while url:
+            response = self._get(url)
+            self.assertEqual(status.HTTP_200_OK, response.status_code)
+            pages.append(response.data)
+            ids.extend(movie["id"] for movie in response.data.get("result"))
+            url = response.data["links"]["next"]
+
+        self.assertEqual(expected_ids, ids)
+        self.assertEqual(7, pages[0]["count"])
+        self.assertEqual(None, pages[0]["links"]["previous"])
+
+        previous_page = self._get(pages[-1]["links"]["previous"]).data
+        self.assertEqual(pages[-2]["result"], previous_page["result"])
+
+    def test_page_number_pagination_is_supported(self):
+        response = self._get("/?page=2&page_size=3")
+        self.assertEqual(7, response.data["count"])
+        self.assertEqual(3, len(response.data.get("result")))
+
+    def test_invalid_cursor(self):
+        response = self._get("/?cursor=invalid")
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        self.assertEqual(5, len(response.data.get("result")))
+
+
+class SuggestAPITestCase(APITestCase):
+    def setUp(self):
+        self.factory = APIRequestFactory()
+        self.movie = models.Movie.objects.create(title="Terminator", url="terminator")
+        self.draft_movie = models.Movie.objects.create(title="Terminal", url="terminal", draft=True)
+        self.actor = models.Actor.objects.create(name="Arnold Schwarzenegger", age=75, url="arnold")
+
+    def tearDown(self):
+        suggest.reset_index()
+
+    def test_suggest(self):
+        view = views.SuggestAPIView.as_view()
+        response = view(self.factory.get("/", {"q": "termi"}))
+        texts = [suggestion["text"] for suggestion in response.data.get("result")]
+
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        self.assertEqual(["Terminator"], texts)
+        self.assertEqual(self.movie.get_absolute_url(), response.data.get("result")[0]["url"])
+
+    def test_suggest_with_typo_and_changes(self):
+        view = views.SuggestAPIView.as_view()
+        response = view(self.factory.get("/", {"q": "shwarzeneger"}))
+        self.assertEqual([self.actor.id], [suggestion["id"] for suggestion in response.data.get("result")])
+
+        self.draft_movie.draft = False
+        self.draft_movie.save()
+        self.movie.delete()
+        response = view(self.factory.get("/", {"q": "termi"}))
+        self.assertEqual(["Terminal"], [suggestion["text"] for suggestion in response.data.get("result")])
+
+
+class CurrencyRateSeriesAPITestCase(APITestCase):
+    def setUp(self):
+        for day, value in ((1, "70.5"), (2, "72.5"), (3, "71"), (10, "80")):
+            models.CurrencyRate.objects.create(date=date(2022, 3, day), num_code="840", char_code="USD", nominal=1,
+                                               name="Доллар США", value=value, previous=value)
+        models.CurrencyRate.objects.create(date=date(2022, 3, 2), num_code="978", char_code="EUR", nominal=1,
+                                           name="Евро", value="85", previous="85")
+
+    def test_rate_series(self):
+        response = self.client.get(reverse("currency_rates", kwargs={"char_code": "usd"}),
+                                   {"start": "2022-03-01", "end": "2022-03-05"})
+
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        self.assertEqual([70.5, 72.5, 71.0], [rate["value"] for rate in response.data["series"]])
+        self.assertEqual((70.5, 72.5), (response.data["min"], response.data["max"]))
+        self.assertAlmostEqual(71.3333, response.data["mean"], places=4)
+        self.assertEqual("USD", response.data["char_code"])
+
+    def test_statistics_are_calculated_per_unit(self):
+        for day, nominal, value in ((1, 100, "17.5"), (2, 10, "1.8"), (3, 10, "1.7")):
+            models.CurrencyRate.objects.create(date=date(2022, 3, day), num_code="398", char_code="KZT",
+                                               nominal=nominal, name="Тенге", value=value, previous=value)
+        response = self.client.get(reverse("currency_rates", kwargs={"char_code": "KZT"}),
+                                   {"start": "2022-03-01", "end": "2022-03-05"})
+
+        self.assertEqual([17.5, 1.8, 1.7], [rate["value"] for rate in response.data["series"]])
+        for expected, unit_value in zip((0.175, 0.18, 0.17), [rate["unit_value"] for rate in response.data["series"]]):
+            self.assertAlmostEqual(expected, unit_value)
+        self.assertAlmostEqual(0.17, response.data["min"])
+        self.assertAlmostEqual(0.18, response.data["max"])
+        self.assertAlmostEqual(0.175, response.data["mean"])
+
+    def test_empty_and_invalid_periods(self):
+        url = reverse("currency_rates", kwargs={"char_code": "USD"})
+        response = self.client.get(url, {"start": "2021-01-01", "end": "2021-02-01"})
+        self.assertEqual([], response.data["series"])
+        self.assertIsNone(response.data["mean"])
+
+        response = self.client.get(url, {"start": "2022-03-05", "end": "2022-03-01"})
+        self.assertEqual(status.HTTP_400_BAD_REQUEST, response.status_code)
+        response = self.client.get(url, {"start": "yesterday"})
+        self.assertEqual(status.HTTP_400_BAD_REQUEST, response.status_code)
+
+
+class CryptoCurrencyAPITestCase(APITestCase):
+    def setUp(self):
+        coins = [
+            {"number": number, "name": f"Coin {number}", "symbol": f"C{number}",
+             "raw": {"price": 10.0 * number, "percent_change_24h": 1.0, "percent_change_7d": 2.0,
+                     "percent_change_30d": 3.0}}
+            for number in range(1, 31)
+        ]
+        snapshot = crypto_currency_api.CryptoCurrencyData(error_message="", last_updated="", crypto_currencies_list=coins)
+        patcher = mock.patch.object(crypto_currency_service, "get_read_data", lambda: snapshot)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_window_and_columns(self):
+        response = self.client.get(reverse("crypto_currency_table"),
+                                   {"offset": 25, "limit": 10, "columns": "name,price", "sorting": "ascending:0"})
+
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        self.assertEqual(30, response.data["count"])
+        self.assertEqual({"name": "Coin 26", "price": "260.00"}, response.data["results"][0])
+        self.assertEqual(5, len(response.data["results"]))
+
+    def test_invalid_query(self):
+        for query in ({"columns": "name,volume"}, {"limit": 0}, {"offset": -1}, {"sorting": "up"}):
+            response = self.client.get(reverse("crypto_currency_table"), query)
+            self.assertEqual(status.HTTP_400_BAD_REQUEST, response.status_code, query)
+
+
+class MovieImportAPITestCase(APITestCase):
+    def setUp(self):
+        self.superuser = User.objects.create_superuser("superuser")
+        self.user = User.objects.create_user("user")
+        self.url = reverse("movie_import")
+
+    def get_file(self, name: str = "movies.jsonl") -> SimpleUploadedFile:
+        return SimpleUploadedFile(name, "\n".join([
+            json.dumps({"title": "Imported movie", "genres": ["Drama"], "actors": ["Imported actor"]}),
+            json.dumps({"title": ""}),
+        ]).encode())
+
+    def test_import_movies(self):
+        self.client.force_login(user=self.superuser)
+        response = self.client.post(self.url, data={"file": self.get_file()}, format="multipart")
+
+        self.assertEqual(status.HTTP_201_CREATED, response.status_code)
+        self.assertEqual((1, 0, 1), (response.data["created"], response.data["skipped"], response.data["failed"]))
+        self.assertTrue(models.Movie.objects.filter(title="Imported movie", actors__name="Imported actor").exists())
+
+    def test_import_without_new_movies(self):
+        self.client.force_login(user=self.superuser)
+        self.client.post(self.url, data={"file": self.get_file()}, format="multipart")
+
+        response = self.client.post(self.url, data={"file": self.get_file()}, format="multipart")
+        self.assertEqual(status.HTTP_400_BAD_REQUEST, response.status_code)
+        self.assertEqual((0, 1, 1), (response.data["created"], response.data["skipped"], response.data["failed"]))
+
+        file = SimpleUploadedFile("movies.jsonl", json.dumps({"title": "Imported movie"}).encode())
+        response = self.client.post(self.url, data={"file": file}, format="multipart")
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        self.assertEqual((0, 1, 0), (response.data["created"], response.data["skipped"], response.data["failed"]))
+
+    def test_import_unknown_format(self):
+        self.client.force_login(user=self.superuser)
+        response = self.client.post(self.url, data={"file": self.get_file("movies.txt")}, format="multipart")
+        self.assertEqual(status.HTTP_400_BAD_REQUEST, response.status_code)
+
+    def test_import_permission(self):
+        self.client.force_login(user=self.user)
+        response = self.client.post(self.url, data={"file": self.get_file()}, format="multipart")
+        self.assertEqual(status.HTTP_403_FORBIDDEN, response.status_code)
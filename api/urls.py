@@ -19,6 +19,7 @@ urlpatterns = [
 
     path("", include(router.urls)),
     path("movies/", views.MovieAPIViewSet.as_view({"get": "list"})),
+    path("movies/import/", views.MovieImportAPIView.as_view(), name="movie_import"),
     path("movies/<int:pk>/", views.MovieAPIViewSet.as_view({"get": "retrieve"})),
     path("categories/", views.CategoryAPIViewSet.as_view({"get": "list"})),
     path("categories/<int:pk>/", views.CategoryAPIViewSet.as_view({"get": "retrieve"})),
@@ -27,4 +28,7 @@ urlpatterns = [
     path("destroy/review/<int:pk>/", views.ReviewAPIDestroyView.as_view()),
     path("rating/", views.RatingAPIUpdateOrCreateView.as_view(), name="update_or_create_rating"),
     path("rating/<int:movie_id>/", views.RatingAPIDestroyView.as_view(), name="destroy_rating"),
+    path("suggest/", views.SuggestAPIView.as_view(), name="suggest"),
+    path("currency/<str:char_code>/rates/", views.CurrencyRateSeriesAPIView.as_view(), name="currency_rates"),
+    path("crypto_currency/", views.CryptoCurrencyAPIView.as_view(), name="crypto_currency_table"),
 ]
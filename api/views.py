@@ -1,12 +1,20 @@
+import io
+from datetime import date, timedelta
+
 from django.http import Http404
-from rest_framework import generics, permissions, viewsets
+from rest_framework import generics, permissions, viewsets, status
 from rest_framework.request import Request
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from rest_framework.parsers import MultiPartParser
 from rest_framework.filters import SearchFilter, OrderingFilter
 from django_filters.rest_framework import DjangoFilterBackend
 
 from api import serializers, paginations, services as api_services
-from rating_movies.services.crud import read
+from rating_movies.services.crud import read, catalogue_import
+from rating_movies.services.api.crypto_currency import crypto_currency_service
 from rating_movies.services.utils import get_client_ip
+from rating_movies.services.db_routing import ReplicaReadMixin
 
 
 class ActorAPIViewSet(viewsets.ModelViewSet, api_services.PermissionMixin):
@@ -28,12 +36,22 @@ class ActorAPIViewSet(viewsets.ModelViewSet, api_services.PermissionMixin):
         self.check_user_permissions()
 
 
-class MovieAPIViewSet(viewsets.ReadOnlyModelViewSet, api_services.PermissionMixin):
+class MovieAPIViewSet(ReplicaReadMixin, viewsets.ReadOnlyModelViewSet, api_services.PermissionMixin):
     filter_backends = (DjangoFilterBackend, )
     filterset_class = api_services.MovieFilter
-    pagination_class = paginations.MovieAPIListPagination
+    pagination_class = paginations.MovieAPICursorPagination
     permission_classes = [permissions.IsAuthenticated]
 
+    @property
+    def paginator(self):
+        """Movie list is paginated by cursor, old page numbers (?page=) are still supported"""
+        if not hasattr(self, "_paginator"):
+            if "page" in self.request.query_params:
+                self._paginator = paginations.MovieAPIListPagination()
+            else:
+                self._paginator = self.pagination_class()
+        return self._paginator
+
     def get_serializer_class(self):
         if self.action == "list":
             return serializers.MovieListSerializer
@@ -44,11 +62,37 @@ class MovieAPIViewSet(viewsets.ReadOnlyModelViewSet, api_services.PermissionMixi
         if self.action == "list":
             return read.get_all_movies_annotated_by_rating(request=self.request)
         elif self.action == "retrieve":
-            api_services.update_movie_other_sources_rating_api(pk=self.kwargs.get("pk"))
             return read.get_movie_set_by_pk_annotated_by_rating(self.kwargs.get("pk"))
 
 
-class GenreAPIViewSet(viewsets.ModelViewSet, api_services.PermissionMixin):
+class MovieImportAPIView(APIView):
+    """Bulk import of movies with genres, categories, actors and directors: POST /movies/import/ with a file.
+    The file is read line by line and written in batches, so it isn't loaded into memory.
+    Status: 201 if movies were created, 400 if nothing was created and some rows failed, 200 if all movies exist"""
+    permission_classes = (permissions.IsAdminUser, )
+    parser_classes = (MultiPartParser, )
+
+    def post(self, request: Request):
+        serializer = serializers.MovieImportSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        lines = io.TextIOWrapper(serializer.validated_data["file"], encoding="utf-8-sig", newline="")
+        result = catalogue_import.import_movies(catalogue_import.READERS[serializer.validated_data["format"]](lines))
+        if result.created:
+            response_status = status.HTTP_201_CREATED
+        elif result.failed:
+            response_status = status.HTTP_400_BAD_REQUEST
+        else:
+            response_status = status.HTTP_200_OK
+        return Response({
+            "created": result.created,
+            "skipped": result.skipped,
+            "failed": result.failed,
+            "errors": result.errors,
+        }, status=response_status)
+
+
+class GenreAPIViewSet(ReplicaReadMixin, viewsets.ModelViewSet, api_services.PermissionMixin):
     queryset = read.get_all_genres_ordered_by_parameter("id")
     pagination_class = paginations.BasePagination
     permission_classes = [permissions.IsAuthenticated]
@@ -70,7 +114,7 @@ class GenreAPIViewSet(viewsets.ModelViewSet, api_services.PermissionMixin):
         self.check_user_permissions()
 
 
-class CategoryAPIViewSet(viewsets.ReadOnlyModelViewSet):
+class CategoryAPIViewSet(ReplicaReadMixin, viewsets.ReadOnlyModelViewSet):
     queryset = read.get_all_categories_ordered_by_parameter("id")
     permission_classes = (permissions.IsAuthenticated, )
     pagination_class = paginations.BasePagination
@@ -130,3 +174,58 @@ class RatingAPIDestroyView(generics.DestroyAPIView):
         if not queryset:
             raise Http404
         return queryset
+
+
+class SuggestAPIView(APIView):
+    """Autocomplete for movie titles and actor/director names: /suggest/?q=<text>&limit=<number>"""
+    permission_classes = (permissions.AllowAny, )
+    max_limit = 50
+
+    def get(self, request: Request):
+        try:
+            limit = min(int(request.query_params.get("limit", 10)), self.max_limit)
+        except ValueError:
+            limit = 10
+        suggestions = read.get_suggestions(query=request.query_params.get("q", ""), number=max(limit, 1))
+        return Response({"result": serializers.SuggestionSerializer(suggestions, many=True).data})
+
+
+class CurrencyRateSeriesAPIView(APIView):
+    """Archived CBR rates of one currency: /currency/<char_code>/rates/?start=YYYY-MM-DD&end=YYYY-MM-DD.
+    The last 30 days are returned by default"""
+    permission_classes = (permissions.AllowAny, )
+    default_days = 30
+
+    def get(self, request: Request, char_code: str):
+        end = date.today()
+        query_serializer = serializers.CurrencyRateRangeSerializer(data={
+            "start": request.query_params.get("start", end - timedelta(days=self.default_days)),
+            "end": request.query_params.get("end", end),
+        })
+        query_serializer.is_valid(raise_exception=True)
+        period = query_serializer.validated_data
+
+        series = read.get_currency_rate_series(char_code=char_code, **period)
+        return Response(serializers.CurrencyRateSeriesSerializer({
+            "char_code": char_code.upper(), **period, **series
+        }).data)
+
+
+class CryptoCurrencyAPIView(APIView):
+    """Window of the crypto currency table: /crypto_currency/?offset=0&limit=10&columns=name,price&sorting=descending:2.
+    Only rows of the window are formatted, the snapshot itself is not copied"""
+    permission_classes = (permissions.AllowAny, )
+
+    def get(self, request: Request):
+        query_serializer = serializers.CryptoCurrencyQuerySerializer(data=request.query_params)
+        query_serializer.is_valid(raise_exception=True)
+
+        page = crypto_currency_service.get_crypto_currency_page(**query_serializer.validated_data)
+        return Response({
+            "error_message": page.error_message,
+            "last_updated": page.last_updated,
+            "count": page.count,
+            "offset": page.offset,
+            "limit": page.limit,
+            "results": page.crypto_currencies_list,
+        })
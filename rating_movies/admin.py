@@ -5,7 +5,8 @@ from ckeditor_uploader.widgets import CKEditorUploadingWidget
 from modeltranslation.admin import TranslationAdmin
 
 from rating_movies.models import Category, Actor, Genre, Movie, \
-    MovieShots, RatingStar, Rating, Review, OtherSourcesRating, UserProfile
+    MovieShots, RatingStar, Rating, Review, OtherSourcesRating, UserProfile, MovieRatingStats, \
+    CurrencyRate, RatingEnrichmentTask
 
 
 class MovieAdminForm(forms.ModelForm):
@@ -169,6 +170,13 @@ class RatingAdmin(admin.ModelAdmin):
     list_display = ("ip", "movie", "star")
 
 
+@admin.register(MovieRatingStats)
+class MovieRatingStatsAdmin(admin.ModelAdmin):
+    """Агрегированный рейтинг фильмов"""
+    list_display = ("movie", "count", "average")
+    readonly_fields = ("movie", "count", "total", "average", "histogram")
+
+
 @admin.register(RatingStar)
 class RatingStarAdmin(admin.ModelAdmin):
     """Звёзды рейтинга"""
@@ -178,10 +186,17 @@ class RatingStarAdmin(admin.ModelAdmin):
 @admin.register(OtherSourcesRating)
 class OtherSourcesRatingAdmin(admin.ModelAdmin):
     """Movie rating obtained from other sources"""
-    list_display = ("id", "movie")
+    list_display = ("id", "movie", "refreshed_at")
     list_display_links = ("id", "movie")
     
 
+@admin.register(RatingEnrichmentTask)
+class RatingEnrichmentTaskAdmin(admin.ModelAdmin):
+    """Очередь получения рейтингов из других источников"""
+    list_display = ("movie", "attempts", "available_at", "created_at")
+    readonly_fields = ("created_at", )
+
+
 @admin.register(UserProfile)
 class UserProfileAdmin(admin.ModelAdmin):
     """User profile"""
@@ -189,5 +204,14 @@ class UserProfileAdmin(admin.ModelAdmin):
     list_display_links = ("id", "user")
 
 
+@admin.register(CurrencyRate)
+class CurrencyRateAdmin(admin.ModelAdmin):
+    """Архив курсов валют"""
+    list_display = ("date", "char_code", "nominal", "value")
+    list_filter = ("char_code", )
+    date_hierarchy = "date"
+    readonly_fields = ("date", "num_code", "char_code", "nominal", "name", "value", "previous")
+
+
 admin.site.site_title = "Django rating movies"
 admin.site.site_header = "Django rating movies"
@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class RatingMoviesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'rating_movies'
+
+    def ready(self):
+        from rating_movies import signals  # noqa: F401
@@ -0,0 +1,45 @@
+import time
+import datetime
+
+from django.core.management.base import BaseCommand
+
+from rating_movies.models import Movie
+from rating_movies.services.api.movies import rating_enrichment
+
+
+class Command(BaseCommand):
+    help = "Receive ratings of queued movies from IMDb API and save them in bulk"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--all", action="store_true", help="Queue all movies without rating before processing")
+        parser.add_argument("--batch-size", type=int, default=rating_enrichment.BATCH_SIZE,
+                            help="Number of movies taken from the queue at once")
+        parser.add_argument("--concurrency", type=int, default=rating_enrichment.CONCURRENCY,
+                            help="Number of parallel requests to IMDb API")
+        parser.add_argument("--ttl", type=int, default=rating_enrichment.RATING_TTL.days,
+                            help="Ratings older than this number of days are received again")
+        parser.add_argument("--rate", type=float, default=rating_enrichment.RATE, help="Movies per second")
+        parser.add_argument("--loop", action="store_true", help="Keep processing the queue until it's stopped")
+        parser.add_argument("--interval", type=int, default=60, help="Seconds between checks of an empty queue")
+
+    def handle(self, *args, **options):
+        if options["all"]:
+            number = rating_enrichment.enqueue_movies(Movie.objects.values_list("pk", flat=True))
+            self.stdout.write(f"{number} movies without rating were queued")
+
+        ttl = datetime.timedelta(days=options["ttl"])
+        while True:
+            rating_enrichment.enqueue_stale_ratings(ttl=ttl)
+            self.process_queue(options)
+            if not options["loop"]:
+                break
+            time.sleep(options["interval"])
+
+    def process_queue(self, options: dict) -> None:
+        while True:
+            received, postponed = rating_enrichment.process_batch(
+                batch_size=options["batch_size"], concurrency=options["concurrency"], rate=options["rate"]
+            )
+            if not (received or postponed):
+                break
+            self.stdout.write(f"Ratings were received for {received} movies, {postponed} movies were postponed")
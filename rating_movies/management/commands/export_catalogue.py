@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from rating_movies.services.crud import catalogue_import
+
+
+class Command(BaseCommand):
+    help = "Export all movies with genres, categories, actors and directors to JSON lines or CSV file"
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="Path to the file, '-' writes to standard output")
+        parser.add_argument("--format", choices=tuple(catalogue_import.WRITERS),
+                            help="Format of the file, by default it's taken from the extension")
+        parser.add_argument("--chunk-size", type=int, default=catalogue_import.EXPORT_CHUNK_SIZE,
+                            help="Number of movies read from the database at once")
+
+    def handle(self, *args, **options):
+        file_format = options["format"] or catalogue_import.get_format(options["path"])
+        if file_format is None:
+            raise CommandError("--format must be set for files without .csv or .jsonl extension")
+
+        write = catalogue_import.WRITERS[file_format]
+        movies = catalogue_import.export_movies(chunk_size=options["chunk_size"])
+        if options["path"] == "-":
+            number = write(movies, self.stdout)
+        else:
+            try:
+                with open(options["path"], "w", encoding="utf-8", newline="") as file:
+                    number = write(movies, file)
+            except OSError as exc:
+                raise CommandError(exc)
+            self.stdout.write(f"Exported: {number}")
@@ -0,0 +1,43 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from rating_movies.services.crud import catalogue_import
+
+
+class Command(BaseCommand):
+    help = "Import movies with genres, categories, actors and directors from JSON lines or CSV file"
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="Path to the file, '-' reads standard input")
+        parser.add_argument("--format", choices=tuple(catalogue_import.READERS),
+                            help="Format of the file, by default it's taken from the extension")
+        parser.add_argument("--batch-size", type=int, default=catalogue_import.BATCH_SIZE,
+                            help="Number of movies written in one transaction")
+        parser.add_argument("--no-enrichment", action="store_true",
+                            help="Don't queue new movies for enrich_movie_ratings")
+
+    def handle(self, *args, **options):
+        file_format = options["format"] or catalogue_import.get_format(options["path"])
+        if file_format is None:
+            raise CommandError("--format must be set for files without .csv or .jsonl extension")
+
+        if options["path"] == "-":
+            result = self.import_movies(sys.stdin, file_format, options)
+        else:
+            try:
+                with open(options["path"], encoding="utf-8-sig", newline="") as file:
+                    result = self.import_movies(file, file_format, options)
+            except OSError as exc:
+                raise CommandError(exc)
+
+        for error in result.errors:
+            self.stderr.write(error)
+        self.stdout.write(f"Created: {result.created}, skipped: {result.skipped}, failed: {result.failed}")
+
+    @staticmethod
+    def import_movies(lines, file_format: str, options: dict) -> catalogue_import.ImportResult:
+        return catalogue_import.import_movies(
+            catalogue_import.READERS[file_format](lines),
+            batch_size=options["batch_size"], enqueue_ratings=not options["no_enrichment"]
+        )
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from rating_movies.services.crud.repositories import MovieRatingStatsRepository
+
+
+class Command(BaseCommand):
+    help = "Rebuild denormalized rating stats (count, sum, average, histogram) of all movies"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000, help="Number of records per INSERT")
+
+    def handle(self, *args, **options):
+        number = MovieRatingStatsRepository().rebuild_all_stats(batch_size=options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(f"Rating stats were rebuilt for {number} movies"))
@@ -0,0 +1,56 @@
+import time
+from functools import partial
+from typing import Callable
+
+from django.core.management.base import BaseCommand, CommandError
+
+from rating_movies.services.api import api_utils
+from rating_movies.services.api.snapshot_refresh import refresh_concurrently
+from rating_movies.services.api.weather import weather_json_recording
+from rating_movies.services.api.currency import currency_json_recording
+from rating_movies.services.api.crypto_currency import crypto_currency_json_recording
+
+
+SNAPSHOTS = {
+    "weather": weather_json_recording,
+    "currency": currency_json_recording,
+    "crypto_currency": crypto_currency_json_recording,
+}
+
+
+class Command(BaseCommand):
+    help = "Refresh outdated snapshots of weather, currency and crypto currency data concurrently"
+
+    def add_arguments(self, parser):
+        parser.add_argument("names", nargs="*", help=f"Snapshots to refresh: {', '.join(SNAPSHOTS)}. All by default")
+        parser.add_argument("--force", action="store_true", help="Refresh snapshots which are not outdated yet")
+        parser.add_argument("--loop", action="store_true", help="Keep snapshots warm until the command is stopped")
+        parser.add_argument("--interval", type=int, default=30, help="Seconds between checks in the loop mode")
+
+    def handle(self, *args, **options):
+        unknown_names = set(options["names"]) - set(SNAPSHOTS)
+        if unknown_names:
+            raise CommandError(f"Unknown snapshots: {', '.join(sorted(unknown_names))}")
+
+        modules = {name: SNAPSHOTS[name] for name in options["names"] or SNAPSHOTS}
+        if "weather" in modules:
+            # местонахождение сервера определяется один раз при запуске, а не при каждом обновлении погоды
+            coordinates = api_utils.refresh_my_coordinates()
+            self.stdout.write(f"Weather is refreshed for {coordinates.city}")
+
+        while True:
+            self.refresh(modules, force=options["force"])
+            if not options["loop"]:
+                break
+            time.sleep(options["interval"])
+
+    def refresh(self, modules: dict, force: bool) -> None:
+        refreshes: dict[str, Callable[[], bool]] = {
+            name: partial(module.refresh_data, force=force)
+            for name, module in modules.items() if force or module.is_outdated()
+        }
+        for name, is_refreshed in refresh_concurrently(refreshes).items():
+            if is_refreshed:
+                self.stdout.write(self.style.SUCCESS(f"Snapshot '{name}' was refreshed"))
+            else:
+                self.stdout.write(self.style.WARNING(f"Snapshot '{name}' wasn't refreshed"))
@@ -0,0 +1,50 @@
+# Generated by Django 4.0.3 on 2026-10-18 17:52
+
+from collections import defaultdict
+
+from django.db import migrations, models
+from django.db.models import Count
+import django.db.models.deletion
+
+
+def fill_movie_rating_stats(apps, schema_editor):
+    Rating = apps.get_model("rating_movies", "Rating")
+    MovieRatingStats = apps.get_model("rating_movies", "MovieRatingStats")
+
+    histograms = defaultdict(dict)
+    for row in Rating.objects.values("movie_id", "star__value").annotate(votes=Count("id")).order_by():
+        histograms[row["movie_id"]][str(row["star__value"])] = row["votes"]
+
+    stats = []
+    for movie_id, histogram in histograms.items():
+        count = sum(histogram.values())
+        total = sum(int(value) * votes for value, votes in histogram.items())
+        stats.append(MovieRatingStats(movie_id=movie_id, count=count, total=total,
+                                      average=total / count, histogram=histogram))
+    MovieRatingStats.objects.bulk_create(stats, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rating_movies', '0002_actor_death_date'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MovieRatingStats',
+            fields=[
+                ('movie', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='rating_stats', serialize=False, to='rating_movies.movie', verbose_name='Фильм')),
+                ('count', models.PositiveIntegerField(default=0, verbose_name='Количество оценок')),
+                ('total', models.PositiveIntegerField(default=0, verbose_name='Сумма оценок')),
+                ('average', models.FloatField(blank=True, null=True, verbose_name='Средний рейтинг')),
+                ('histogram', models.JSONField(default=dict, help_text='Количество оценок для каждого значения звезды', verbose_name='Распределение оценок')),
+            ],
+            options={
+                'verbose_name': 'Статистика рейтинга',
+                'verbose_name_plural': 'Статистика рейтинга',
+                'db_table': 'MovieRatingStats',
+            },
+        ),
+        migrations.RunPython(fill_movie_rating_stats, migrations.RunPython.noop),
+    ]
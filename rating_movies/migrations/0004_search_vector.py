@@ -0,0 +1,83 @@
+# Generated by Django 4.0.3 on 2026-10-18 17:54
+
+import django.contrib.postgres.search
+from django.db import migrations
+
+
+SEARCH_VECTORS = {
+    # table: (title-like columns, description-like columns)
+    "Movie": (("title_ru", "title_en"), ("description_ru", "description_en")),
+    "Actor": (("name_ru", "name_en"), ("description_ru", "description_en")),
+}
+
+
+def _form_vector_sql(row: str, columns: tuple[str, str], weight: str) -> str:
+    """Russian columns are parsed with 'russian' configuration and english columns with 'english' one"""
+    russian_column, english_column = columns
+    return (
+        f"setweight(to_tsvector('russian', coalesce({row}.{russian_column}, '')), '{weight}') || "
+        f"setweight(to_tsvector('english', coalesce({row}.{english_column}, '')), '{weight}')"
+    )
+
+
+def create_search_triggers(apps, schema_editor):
+    """Fill search vectors with a trigger and index them with GIN. Only PostgreSQL supports it,
+    other databases use in-memory inverted index from rating_movies.services.search"""
+    if schema_editor.connection.vendor != "postgresql":
+        return
+
+    for table, (title_columns, description_columns) in SEARCH_VECTORS.items():
+        function = f"{table.lower()}_search_vector_update"
+        vector = " || ".join((_form_vector_sql("NEW", title_columns, "A"),
+                              _form_vector_sql("NEW", description_columns, "B")))
+        columns = ", ".join(title_columns + description_columns)
+
+        schema_editor.execute(f"""
+            CREATE OR REPLACE FUNCTION {function}() RETURNS trigger AS $$
+            BEGIN
+                NEW.search_vector := {vector};
+                RETURN NEW;
+            END
+            $$ LANGUAGE plpgsql;
+        """)
+        schema_editor.execute(f"""
+            CREATE TRIGGER {function}_trigger BEFORE INSERT OR UPDATE OF {columns}
+            ON "{table}" FOR EACH ROW EXECUTE PROCEDURE {function}();
+        """)
+        schema_editor.execute(f'UPDATE "{table}" SET {title_columns[0]} = {title_columns[0]};')
+        # запускаем триггер для уже существующих записей
+        schema_editor.execute(
+            f'CREATE INDEX "{table}_search_vector_gin" ON "{table}" USING gin (search_vector);'
+        )
+
+
+def drop_search_triggers(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+
+    for table in SEARCH_VECTORS:
+        function = f"{table.lower()}_search_vector_update"
+        schema_editor.execute(f'DROP INDEX IF EXISTS "{table}_search_vector_gin";')
+        schema_editor.execute(f'DROP TRIGGER IF EXISTS {function}_trigger ON "{table}";')
+        schema_editor.execute(f"DROP FUNCTION IF EXISTS {function}();")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rating_movies', '0003_movieratingstats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='actor',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='movie',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunPython(create_search_triggers, drop_search_triggers),
+    ]
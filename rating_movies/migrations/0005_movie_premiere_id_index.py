@@ -0,0 +1,17 @@
+# Generated by Django 4.0.3 on 2026-10-18 18:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rating_movies', '0004_search_vector'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='movie',
+            index=models.Index(fields=['world_premiere', 'id'], name='movie_premiere_id_idx'),
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 4.0.3 on 2026-10-18 18:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rating_movies', '0005_movie_premiere_id_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CurrencyRate',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(verbose_name='Дата')),
+                ('num_code', models.CharField(max_length=3, verbose_name='Цифровой код')),
+                ('char_code', models.CharField(max_length=3, verbose_name='Буквенный код')),
+                ('nominal', models.PositiveIntegerField(verbose_name='Номинал')),
+                ('name', models.CharField(max_length=100, verbose_name='Название')),
+                ('value', models.DecimalField(decimal_places=4, max_digits=14, verbose_name='Курс')),
+                ('previous', models.DecimalField(decimal_places=4, max_digits=14, verbose_name='Предыдущий курс')),
+            ],
+            options={
+                'verbose_name': 'Курс валюты',
+                'verbose_name_plural': 'Курсы валют',
+                'db_table': 'CurrencyRate',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='currencyrate',
+            index=models.Index(fields=['date'], name='currency_rate_date_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='currencyrate',
+            constraint=models.UniqueConstraint(fields=('char_code', 'date'), name='currency_rate_code_date_unique'),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 4.0.3 on 2026-10-18 18:20
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rating_movies', '0006_currency_rate'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RatingEnrichmentTask',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('attempts', models.PositiveSmallIntegerField(default=0, verbose_name='Попытки')),
+                ('available_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Доступна с')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Добавлена')),
+                ('movie', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='rating_enrichment_task', to='rating_movies.movie', verbose_name='Фильм')),
+            ],
+            options={
+                'verbose_name': 'Задача получения рейтинга',
+                'verbose_name_plural': 'Очередь получения рейтингов',
+                'db_table': 'RatingEnrichmentTask',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='ratingenrichmenttask',
+            index=models.Index(fields=['available_at'], name='rating_task_available_idx'),
+        ),
+    ]
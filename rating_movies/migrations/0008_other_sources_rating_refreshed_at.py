@@ -0,0 +1,22 @@
+# Generated by Django 4.0.3 on 2026-10-18 18:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rating_movies', '0007_rating_enrichment_task'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='othersourcesrating',
+            name='refreshed_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Обновлён'),
+        ),
+        migrations.AddIndex(
+            model_name='othersourcesrating',
+            index=models.Index(fields=['refreshed_at'], name='other_rating_refreshed_idx'),
+        ),
+    ]
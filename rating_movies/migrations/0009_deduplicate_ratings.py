@@ -0,0 +1,44 @@
+from django.db import migrations
+from django.db.models import Count, Max
+
+
+def deduplicate_ratings(apps, schema_editor):
+    """Keep only the latest rating of each (ip, movie) pair before the unique constraint is added
+    and recalculate rating stats of the movies which lost ratings"""
+    Rating = apps.get_model("rating_movies", "Rating")
+    MovieRatingStats = apps.get_model("rating_movies", "MovieRatingStats")
+
+    duplicates = Rating.objects.values("ip", "movie_id").annotate(
+        latest_id=Max("id"), number=Count("id")
+    ).filter(number__gt=1).order_by()
+
+    movie_ids = set()
+    for duplicate in duplicates:
+        Rating.objects.filter(ip=duplicate["ip"], movie_id=duplicate["movie_id"]).exclude(
+            id=duplicate["latest_id"]
+        ).delete()
+        movie_ids.add(duplicate["movie_id"])
+
+    for movie_id in movie_ids:
+        histogram = {
+            str(row["star__value"]): row["votes"]
+            for row in Rating.objects.filter(movie_id=movie_id).values("star__value").annotate(
+                votes=Count("id")
+            ).order_by()
+        }
+        count = sum(histogram.values())
+        total = sum(int(value) * votes for value, votes in histogram.items())
+        MovieRatingStats.objects.filter(movie_id=movie_id).update(
+            count=count, total=total, average=total / count if count else None, histogram=histogram
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rating_movies', '0008_other_sources_rating_refreshed_at'),
+    ]
+
+    operations = [
+        migrations.RunPython(deduplicate_ratings, migrations.RunPython.noop),
+    ]
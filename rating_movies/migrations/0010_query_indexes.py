@@ -0,0 +1,53 @@
+# Generated by Django 4.0.3 on 2026-10-18 18:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rating_movies', '0009_deduplicate_ratings'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='movie',
+            name='movie_premiere_id_idx',
+        ),
+        migrations.AddIndex(
+            model_name='movie',
+            index=models.Index(condition=models.Q(('draft', False)), fields=['world_premiere', 'id'], name='movie_premiere_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='movie',
+            index=models.Index(condition=models.Q(('draft', False)), fields=['id'], name='movie_active_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='movie',
+            index=models.Index(condition=models.Q(('draft', False)), fields=['title_ru'], name='movie_active_title_ru_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='movie',
+            index=models.Index(condition=models.Q(('draft', False)), fields=['title_en'], name='movie_active_title_en_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='movie',
+            index=models.Index(condition=models.Q(('draft', False)), fields=['year'], name='movie_active_year_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='movie',
+            index=models.Index(fields=['country_ru'], name='movie_country_ru_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='movie',
+            index=models.Index(fields=['country_en'], name='movie_country_en_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(fields=['movie', 'parent'], name='review_movie_parent_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='rating',
+            constraint=models.UniqueConstraint(fields=('ip', 'movie'), name='rating_ip_movie_unique'),
+        ),
+    ]
@@ -1,36 +1,22 @@
 import json
 from datetime import date
-from time import time
+from functools import partial
 
 from django.db import models
+from django.db.models import Q
 from django.urls import reverse
+from django.utils import timezone
+from django.contrib.postgres.search import SearchVectorField
 from django.conf import settings
-from django.utils.text import slugify as django_slugify
+
+from rating_movies.services import slugs
+from rating_movies.services.transliteration import slugify
 
 
 def get_current_year():
     return date.today().year
 
 
-def is_unique_url(model: any, url: str) -> bool:
-    if model.objects.filter(url__iexact=url).exists():
-        return False
-    return True
-
-
-def slugify(some_str: str):
-    alphabet = {"а": "a", "б": "b", "в": "v", "г": "g", "д": "d", "е": "e", "ё": "yo", "ж": "zh", "з": "z", "и": "i",
-                "й": "j", "к": "k", "л": "l", "м": "m", "н": "n", "о": "o", "п": "p", "р": "r", "с": "s", "т": "t",
-                "у": "u", "ф": "f", "х": "kh", "ц": "ts", "ч": "ch", "ш": "sh", "щ": "shch", "ы": "i", "э": "e",
-                "ю": "yu",
-                "я": "ya"}
-    return django_slugify("".join(alphabet.get(letter, letter) for letter in some_str.lower()))
-
-
-def generate_unique_slug(slug: str):
-    return f"{slug}-{int(time())}"
-
-
 class Category(models.Model):
     """Категории"""
     name = models.CharField("Категория", max_length=150, db_index=True)
@@ -59,6 +45,8 @@ class Actor(models.Model):
     url = models.SlugField(max_length=160, unique=True, blank=True)
     birth_date = models.DateField("Дата рождения", default=date.today)
     death_date = models.DateField("Дата смерти", blank=True, null=True)
+    search_vector = SearchVectorField(null=True, editable=False)
+    # заполняется триггером PostgreSQL из полей name_ru, name_en, description_ru, description_en
 
     class Meta:
         db_table = "Actor"
@@ -71,11 +59,11 @@ class Actor(models.Model):
 
     def save(self, *args, **kwargs):
         self.update_age()
-        if not self.pk:
-            self.url = slugify(str(self.name))
-            if not is_unique_url(model=Actor, url=self.url):
-                self.url = generate_unique_slug(slug=self.url)
-        super().save(*args, **kwargs)
+        if self.pk:
+            super().save(*args, **kwargs)
+        else:
+            slugs.save_with_unique_slug(self, slug=slugify(str(self.name)),
+                                        save=partial(super().save, *args, **kwargs))
 
     def get_absolute_url(self):
         return reverse("actor_director_detail", kwargs={"slug": self.url})
@@ -142,20 +130,36 @@ class Movie(models.Model):
         null=True, related_name="movie_category")
     url = models.SlugField(max_length=160, unique=True, blank=True)
     draft = models.BooleanField("Черновик", default=False)
+    search_vector = SearchVectorField(null=True, editable=False)
+    # заполняется триггером PostgreSQL из полей title_ru, title_en, description_ru, description_en
 
     class Meta:
         db_table = "Movie"
         verbose_name = "Фильм"
         verbose_name_plural = "Фильмы"
+        indexes = [
+            models.Index(fields=["world_premiere", "id"], name="movie_premiere_id_idx", condition=Q(draft=False)),
+            # для постраничного вывода по ключу (world_premiere, id), индекс читается в обоих направлениях
+            models.Index(fields=["id"], name="movie_active_id_idx", condition=Q(draft=False)),
+            models.Index(fields=["title_ru"], name="movie_active_title_ru_idx", condition=Q(draft=False)),
+            models.Index(fields=["title_en"], name="movie_active_title_en_idx", condition=Q(draft=False)),
+            models.Index(fields=["year"], name="movie_active_year_idx", condition=Q(draft=False)),
+            models.Index(fields=["country_ru"], name="movie_country_ru_idx"),
+            models.Index(fields=["country_en"], name="movie_country_en_idx"),
+        ]
+        # на сайте показываются только опубликованные фильмы (draft=False), поэтому индексы для сортировки
+        # и фильтрации частичные: черновики в них не попадают
 
     def __str__(self):
         return self.title
 
     def save(self, *args, **kwargs):
-        if not self.pk:
-            self.add_url()
+        if self.pk:
+            super().save(*args, **kwargs)
+        else:
             self.add_year()
-        super().save(*args, **kwargs)
+            slugs.save_with_unique_slug(self, slug=slugify(str(self.title)),
+                                        save=partial(super().save, *args, **kwargs))
 
     def get_absolute_url(self):
         return reverse("movie_detail", kwargs={"slug": self.url})
@@ -163,11 +167,6 @@ class Movie(models.Model):
     def get_update_url(self):
         return reverse("update_movie", kwargs={"slug": self.url})
 
-    def add_url(self) -> None:
-        self.url = slugify(str(self.title))
-        if not is_unique_url(model=Movie, url=self.url):
-            self.url = generate_unique_slug(slug=self.url)
-
     def add_year(self):
         self.year = str(self.world_premiere).split("-")[0]
 
@@ -213,11 +212,34 @@ class Rating(models.Model):
         db_table = "Rating"
         verbose_name = "Рейтинг"
         verbose_name_plural = "Рейтинги"
+        constraints = [
+            models.UniqueConstraint(fields=["ip", "movie"], name="rating_ip_movie_unique"),
+        ]
+        # один ip оценивает фильм один раз, индекс также используется для поиска оценки посетителя
 
     def __str__(self):
         return f"{self.star} - {self.movie}"
 
 
+class MovieRatingStats(models.Model):
+    """Агрегированный рейтинг фильма, обновляется при каждой оценке"""
+    movie = models.OneToOneField("Movie", on_delete=models.CASCADE, primary_key=True,
+                                 related_name="rating_stats", verbose_name="Фильм")
+    count = models.PositiveIntegerField("Количество оценок", default=0)
+    total = models.PositiveIntegerField("Сумма оценок", default=0)
+    average = models.FloatField("Средний рейтинг", null=True, blank=True)
+    histogram = models.JSONField("Распределение оценок", default=dict,
+                                 help_text="Количество оценок для каждого значения звезды")
+
+    class Meta:
+        db_table = "MovieRatingStats"
+        verbose_name = "Статистика рейтинга"
+        verbose_name_plural = "Статистика рейтинга"
+
+    def __str__(self):
+        return f"{self.movie} - {self.average}"
+
+
 class Review(models.Model):
     """Отзыв"""
     email = models.EmailField("Email")
@@ -232,6 +254,9 @@ class Review(models.Model):
         db_table = "Review"
         verbose_name = "Отзыв"
         verbose_name_plural = "Отзывы"
+        indexes = [
+            models.Index(fields=["movie", "parent"], name="review_movie_parent_idx"),
+        ]
 
     def __str__(self):
         return f"{self.name} - {self.movie}"
@@ -241,16 +266,43 @@ class OtherSourcesRating(models.Model):
     """Movie rating obtained from other sources"""
     rating = models.JSONField("Рейтинг", encoder=json.JSONEncoder, decoder=json.JSONDecoder, default=None)
     movie = models.ForeignKey("Movie", verbose_name="Фильм", on_delete=models.CASCADE, related_name="movie_rating")
+    refreshed_at = models.DateTimeField("Обновлён", null=True, blank=True)
+    # None - время получения рейтинга неизвестно, такой рейтинг считается устаревшим
 
     class Meta:
         db_table = "OtherSourcesRating"
         verbose_name = "Рейтинг из других источников"
         verbose_name_plural = "Рейтинги из других источников"
+        indexes = [
+            models.Index(fields=["refreshed_at"], name="other_rating_refreshed_idx"),
+        ]
 
     def __str__(self):
         return f"{self.movie} - {self.rating}"
 
 
+class RatingEnrichmentTask(models.Model):
+    """Movie which rating from other sources hasn't been received yet.
+    The queue is processed by the "enrich_movie_ratings" command"""
+    movie = models.OneToOneField(
+        "Movie", verbose_name="Фильм", on_delete=models.CASCADE, related_name="rating_enrichment_task"
+    )
+    attempts = models.PositiveSmallIntegerField("Попытки", default=0)
+    available_at = models.DateTimeField("Доступна с", default=timezone.now)
+    created_at = models.DateTimeField("Добавлена", auto_now_add=True)
+
+    class Meta:
+        db_table = "RatingEnrichmentTask"
+        verbose_name = "Задача получения рейтинга"
+        verbose_name_plural = "Очередь получения рейтингов"
+        indexes = [
+            models.Index(fields=["available_at"], name="rating_task_available_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.movie} - {self.attempts}"
+
+
 class UserProfile(models.Model):
     """Extending the "User" model"""
     user = models.OneToOneField(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="user_profile")
@@ -284,3 +336,29 @@ class UserProfileMovie(models.Model):
 
     def __str__(self):
         return f"User_profile: {self.user_profile}; movie: {self.movie};  added: {self.added}"
+
+
+class CurrencyRate(models.Model):
+    """Курс валюты ЦБ РФ на дату. Архив только пополняется: курсы на прошедшие даты не меняются"""
+    date = models.DateField("Дата")
+    num_code = models.CharField("Цифровой код", max_length=3)
+    char_code = models.CharField("Буквенный код", max_length=3)
+    nominal = models.PositiveIntegerField("Номинал")
+    name = models.CharField("Название", max_length=100)
+    value = models.DecimalField("Курс", max_digits=14, decimal_places=4)
+    previous = models.DecimalField("Предыдущий курс", max_digits=14, decimal_places=4)
+
+    class Meta:
+        db_table = "CurrencyRate"
+        verbose_name = "Курс валюты"
+        verbose_name_plural = "Курсы валют"
+        constraints = [
+            models.UniqueConstraint(fields=["char_code", "date"], name="currency_rate_code_date_unique"),
+        ]
+        # уникальный индекс (char_code, date) также используется для выборки курса валюты за период
+        indexes = [
+            models.Index(fields=["date"], name="currency_rate_date_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.char_code} {self.date}: {self.value}"
@@ -1,15 +1,23 @@
 import os
+import hashlib
 from datetime import datetime
 from dataclasses import dataclass
 from typing import Optional
 
-from requests import get as requests_get
 from requests.exceptions import ConnectionError, Timeout, TooManyRedirects, MissingSchema
 from geopy.geocoders import Nominatim
-from geopy.location import Location
+from django.core.cache import cache
 
 from site_engine.settings import BASE_DIR
 from rating_movies.exceptions import ConversionStringError
+from rating_movies.services import cache_variables
+from rating_movies.services.api import http_client
+
+
+GEOCODE_TIMEOUT = 60 * 60 * 24 * 30
+NOT_FOUND_GEOCODE_TIMEOUT = 60 * 60 * 24
+# место, которое не удалось найти, ищется снова через сутки
+NOT_FOUND = "not_found"
 
 
 def format_crypto_currency_value(price: float) -> str:
@@ -80,49 +88,79 @@ class Coordinates:
     city: str
 
 
-def _get_geolocation(user_agent: str, place: str) -> Optional[Location]:
+def _get_geolocation(user_agent: str, place: str) -> Optional[tuple[float, float]]:
+    """Возвращает координаты (широта, долгота) места. Найденные координаты хранятся в кэше месяц,
+    отсутствие места - сутки. Ошибки сети не кэшируются"""
+    key = cache_variables.CACHE_FOR_GEOCODE % hashlib.md5(" ".join(place.lower().split()).encode()).hexdigest()
+    coordinates = cache.get(key)
+    if coordinates is not None:
+        return None if coordinates == NOT_FOUND else coordinates
+
     try:
         location = Nominatim(user_agent=user_agent).geocode(place)
     except Exception as exc:
         print(exc)
-        location = None
+        return None
 
-    return location
+    if location is None:
+        cache.set(key, NOT_FOUND, NOT_FOUND_GEOCODE_TIMEOUT)
+        return None
 
+    coordinates = (location.latitude, location.longitude)
+    cache.set(key, coordinates, GEOCODE_TIMEOUT)
+    return coordinates
 
-def get_coordinates(place: str = None) -> Coordinates:
-    """Возвращает координаты моего местонахождения"""
+
+def _find_coordinates(place: Optional[str]) -> tuple[Coordinates, bool]:
+    """Возвращает координаты места и признак того, что они найдены, а не взяты по умолчанию"""
     user_agent = "user"
     base_latitude = 55.7833
     base_longitude = 42.0833
     city = "Penza"
     # Координаты Пензы
 
-    if place is None:
-        place = _get_my_geolocation()
-
-    geolocation = _get_geolocation(user_agent=user_agent, place=place)
+    is_found = place is not None
+    geolocation = _get_geolocation(user_agent=user_agent, place=place or city)
 
     if geolocation is None:
-        user_coordinates = Coordinates(latitude=base_latitude, longitude=base_longitude, city=city)
-    else:
-        user_coordinates = Coordinates(latitude=geolocation.latitude, longitude=geolocation.longitude,
-                                       city=place.split()[0])
+        return Coordinates(latitude=base_latitude, longitude=base_longitude, city=city), False
+
+    latitude, longitude = geolocation
+    return Coordinates(latitude=latitude, longitude=longitude, city=(place or city).split()[0]), is_found
+
+
+def get_coordinates(place: str = None) -> Coordinates:
+    """Возвращает координаты переданного места или моего местонахождения.
+    Моё местонахождение определяется один раз и хранится в кэше, см. refresh_my_coordinates"""
+    if place is not None:
+        return _find_coordinates(place)[0]
+
+    coordinates = cache.get(cache_variables.CACHE_FOR_MY_COORDINATES)
+    if coordinates is None:
+        coordinates = refresh_my_coordinates()
+    return coordinates
+
 
-    return user_coordinates
+def refresh_my_coordinates() -> Coordinates:
+    """Определяет моё местонахождение заново и сохраняет его в кэш.
+    Координаты по умолчанию не сохраняются, чтобы при следующем запросе попробовать снова"""
+    coordinates, is_found = _find_coordinates(_get_my_geolocation())
+    if is_found:
+        cache.set(cache_variables.CACHE_FOR_MY_COORDINATES, coordinates, GEOCODE_TIMEOUT)
+    return coordinates
 
 
-def _get_my_geolocation() -> str:
-    """Возвращает город, в котором я нахожусь"""
+def _get_my_geolocation() -> Optional[str]:
+    """Возвращает регион, в котором я нахожусь, или None, если его не удалось определить"""
     url = "http://ipinfo.io/json"
     try:
-        response = requests_get(url)
+        response = http_client.get_client("ipinfo").get(url, endpoint="json")
         data = response.json()
     except Exception as exc:
         print(exc)
         data = {}
 
-    return data.get("region", "Penza")
+    return data.get("region")
 
 
 def return_base_requests_exceptions() -> tuple:
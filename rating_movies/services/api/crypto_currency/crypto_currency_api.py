@@ -5,10 +5,9 @@ from datetime import datetime
 from typing import final, Optional
 
 import backoff
-from requests import Session
 
 from site_engine.settings import load_env
-from rating_movies.services.api import api_utils
+from rating_movies.services.api import api_utils, http_client
 
 
 @dataclass
@@ -49,10 +48,10 @@ class CoinMarketCapAPI:
     def __make_api_call(self) -> Optional[dict]:
         """В случае успешного запроса возвращает ответ от сервера в виде словаря с данными о криптовалюте,
          иначе возвращает None"""
-        session = Session()
-        session.headers.update(self.__headers)
         try:
-            response = session.get(url=self.__url, params=self.__parameters)
+            response = http_client.get_client("coin_market_cap").get(
+                self.__url, endpoint="listings/latest", headers=self.__headers, params=self.__parameters
+            )
             data = response.json()
         except api_utils.return_base_requests_exceptions() as exc:
             self.__logger.error(exc)
@@ -78,19 +77,19 @@ class CoinMarketCapAPI:
         try:
             number = 1
             for current_currency in data_response:
+                raw_values = {
+                    "price": _fetch_price(current_currency, self.__convert),
+                    "percent_change_24h": _fetch_percent_change_24h(current_currency, self.__convert),
+                    "percent_change_7d": _fetch_percent_change_7d(current_currency, self.__convert),
+                    "percent_change_30d": _fetch_percent_change_30d(current_currency, self.__convert),
+                }
                 crypto_currency_dict = {
                     "number": number,
                     "name": _fetch_name(current_currency),
                     "symbol": _fetch_symbol(current_currency),
-                    "price": api_utils.format_crypto_currency_value(_fetch_price(current_currency, self.__convert)),
-                    "percent_change_24h": api_utils.format_crypto_currency_value(
-                        _fetch_percent_change_24h(current_currency, self.__convert)
-                    ),
-                    "percent_change_7d": api_utils.format_crypto_currency_value(
-                        _fetch_percent_change_7d(current_currency, self.__convert)
-                    ),
-                    "percent_change_30d": api_utils.format_crypto_currency_value(
-                        _fetch_percent_change_30d(current_currency, self.__convert))
+                    "raw": raw_values,
+                    # числа сохраняются как есть: форматируются только выводимые строки таблицы,
+                    # см. crypto_currency_service.get_crypto_currency_page
                 }
                 data_object.crypto_currencies_list.append(crypto_currency_dict)
                 number += 1
@@ -134,9 +133,9 @@ def _fetch_percent_change_30d(currency_data: dict, convert: str) -> float:
     return currency_data.get("quote").get(convert)["percent_change_30d"]
 
 
-def _is_error(response: dict) -> bool:
+def _is_error(response: Optional[dict]) -> bool:
     """Проверяет ответ на наличие статуса ошибки"""
-    if response.get("statusCode") == 404 or response is None:
+    if response is None or response.get("statusCode") == 404:
         return True
 
     status = response.get("status")
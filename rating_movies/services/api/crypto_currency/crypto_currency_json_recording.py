@@ -1,21 +1,24 @@
-import json
-import os
 import logging
 
-from site_engine.settings import BASE_DIR
-from rating_movies.services.api.api_utils import do_need_update, create_dir_for_json_files, is_dir_for_json_files,\
-    get_folder_name_for_json_files
+from rating_movies.services.api.api_utils import do_need_update, return_error_message
+from rating_movies.services.api.snapshot_store import JSONSnapshotStore
+from rating_movies.services.api.snapshot_refresh import refresh_in_background
 from rating_movies.services.api.crypto_currency.crypto_currency_api import get_coin_market_cap_data, CryptoCurrencyData
-from rating_movies.exceptions import ReadFileError, WriteToFileError, ConversionStringError
+from rating_movies.exceptions import ReadFileError, ConversionStringError
 
 
 LOGGER = logging.getLogger("json_api_logger")
 
+SNAPSHOT_STORE = JSONSnapshotStore("coin_market_cap_data.json")
+
+SNAPSHOT_LIMIT = "100"
+# количество криптовалют в снимке, страница и API выводят из него только запрошенное окно
+
 
 def _get_data_for_recording() -> dict:
     """Возвращает словарь с данными для записи в файл.
     При наличии сообщения об ошибке запишет в 'crypto_currencies_list' старые данные."""
-    data_for_recording = get_coin_market_cap_data()
+    data_for_recording = get_coin_market_cap_data(limit=SNAPSHOT_LIMIT)
 
     if not data_for_recording.error_message:
         crypto_currencies_list = data_for_recording.crypto_currencies_list
@@ -32,77 +35,59 @@ def _get_data_for_recording() -> dict:
 def _get_old_crypto_currencies_list() -> list:
     """Возвращает старые данные из файла."""
     try:
-        old_data = _read_crypto_currency_data()
+        old_data = SNAPSHOT_STORE.read()
         crypto_currencies_list = old_data.get("crypto_currencies_list")
-    except (ReadFileError, FileNotFoundError) as exc:
+    except ReadFileError as exc:
         LOGGER.error(exc)
         crypto_currencies_list = []
 
     return crypto_currencies_list
 
 
-def _form_full_path(file_name: str = None) -> str:
-    """Формирует полный путь до передаваемого файла.
-    Если имя файла не было передано, оно устанавливается в базовое значение"""
-    if file_name is None:
-        file_name = "coin_market_cap_data.json"
-
-    return BASE_DIR / "rating_movies" / get_folder_name_for_json_files() / file_name
+def _convert_to_crypto_currency_object(read_data: dict) -> CryptoCurrencyData:
+    """Конвертирует словарь с данными в объект класса CryptoCurrencyData.
+    Список криптовалют не копируется: он общий для всех запросов, изменять его нельзя"""
+    return CryptoCurrencyData(
+        error_message=read_data.get("error_message", ""),
+        last_updated=read_data.get("last_updated", ""),
+        crypto_currencies_list=read_data.get("crypto_currencies_list", []),
+    )
 
 
-def _write_crypto_currency_data() -> None:
-    """Записывает данные в файл с расширением .json"""
-    full_path = _form_full_path()
-    crypto_currency_data = _get_data_for_recording()
+def _is_outdated(crypto_currency_data: dict) -> bool:
+    """Проверяет, нужно ли обновить снимок данных о криптовалюте"""
+    interval = 1 if crypto_currency_data.get("error_message", "") else 10
+    # Если есть ошибка - обновлять каждую минуту, иначе каждые 10 минут
     try:
-        with open(full_path, "w", encoding="utf-8") as file:
-            json.dump(crypto_currency_data, file, ensure_ascii=False, indent=2)
-    except Exception:
-        raise WriteToFileError(full_path)
+        return do_need_update(last_updated=crypto_currency_data.get("last_updated", ""), interval=interval)
+    except ConversionStringError:
+        return True
 
 
-def _read_crypto_currency_data() -> dict:
-    """Возвращает считанные данные из файла с расширением .json"""
-    full_path = _form_full_path()
+def is_outdated() -> bool:
+    """Проверяет, отсутствует или устарел ли сохранённый снимок"""
     try:
-        with open(full_path, "r") as file:
-            json_data = json.load(file)
-    except Exception:
-        raise ReadFileError(full_path)
+        return _is_outdated(SNAPSHOT_STORE.read())
+    except ReadFileError:
+        return True
 
-    return json_data
 
-
-def _convert_to_crypto_currency_object(read_data: dict, rows: int) -> CryptoCurrencyData:
-    """Конвертирует словарь с данными в объект класса CryptoCurrencyData"""
-    return CryptoCurrencyData(
-        error_message=read_data.get("error_message"),
-        last_updated=read_data.get("last_updated"),
-        crypto_currencies_list=read_data.get("crypto_currencies_list")[:rows],
-    )
+def refresh_data(force: bool = False) -> bool:
+    """Получает данные от API и сохраняет их в снимок, если он устарел или передан force.
+    Возвращает False, если снимок обновляет другой процесс или он уже актуален"""
+    return SNAPSHOT_STORE.refresh(_get_data_for_recording, _is_outdated, force=force)
 
 
-def get_read_data(rows: str) -> CryptoCurrencyData:
-    """Возвращает объект класса CryptoCurrencyData с актуальными данными"""
-    if not is_dir_for_json_files():
-        create_dir_for_json_files()
-
+def get_read_data() -> CryptoCurrencyData:
+    """Возвращает объект класса CryptoCurrencyData с последним сохранённым снимком.
+    Отсутствующий или устаревший снимок обновляется в фоновом потоке, запрос пользователя его не ждёт"""
     try:
-        if not os.path.isfile(_form_full_path()):
-            _write_crypto_currency_data()
-        else:
-            crypto_currency_data = _read_crypto_currency_data()
-            last_updated = crypto_currency_data.get("last_updated", "")
-            interval = 1 if crypto_currency_data.get("error_message", "") else 10
-            # Если есть ошибка - обновлять каждую минуту, иначе каждые 10 минут
-            if do_need_update(last_updated=last_updated, interval=interval):
-                # если данные не актуальны, то информация обновляется
-                _write_crypto_currency_data()
-
-        crypto_currency_data = _read_crypto_currency_data()
-
-    except (ReadFileError, WriteToFileError, ConversionStringError) as exc:
+        crypto_currency_data = SNAPSHOT_STORE.read()
+    except ReadFileError as exc:
         LOGGER.error(exc)
-        crypto_currency_data = _get_data_for_recording()
+        crypto_currency_data = {"error_message": return_error_message()}
+
+    if _is_outdated(crypto_currency_data):
+        refresh_in_background("crypto_currency", refresh_data)
 
-    return _convert_to_crypto_currency_object(crypto_currency_data, int(rows))
+    return _convert_to_crypto_currency_object(crypto_currency_data)
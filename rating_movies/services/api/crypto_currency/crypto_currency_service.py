@@ -1,6 +1,84 @@
+from dataclasses import dataclass
+from typing import Any, Optional, Union
+
+from rating_movies.services.api.api_utils import format_crypto_currency_value
 from rating_movies.services.api.crypto_currency.crypto_currency_json_recording import get_read_data
-from rating_movies.services.api.crypto_currency.crypto_currency_api import CryptoCurrencyData
+from rating_movies.services.api.crypto_currency.crypto_currency_sorting import sort_crypto_currency
+
+
+COLUMNS = ("number", "name", "symbol", "price", "percent_change_24h", "percent_change_7d", "percent_change_30d")
+FORMATTED_COLUMNS = frozenset(("price", "percent_change_24h", "percent_change_7d", "percent_change_30d"))
+DEFAULT_LIMIT = 10
+MAX_LIMIT = 500
+
+
+@dataclass
+class CryptoCurrencyPage:
+    error_message: str
+    last_updated: str
+    crypto_currencies_list: list[dict]
+    count: int
+    offset: int
+    limit: int
+
+    @property
+    def previous_offset(self) -> Optional[int]:
+        return max(self.offset - self.limit, 0) if self.offset > 0 else None
+
+    @property
+    def next_offset(self) -> Optional[int]:
+        return self.offset + self.limit if self.offset + self.limit < self.count else None
+
+
+def _to_int(value: Union[str, int, None], default: int, minimum: int, maximum: Optional[int] = None) -> int:
+    if value is None:
+        return default
+    try:
+        number = int(value)
+    except ValueError:
+        return default
+    number = max(number, minimum)
+    return number if maximum is None else min(number, maximum)
+
+
+def _format_crypto_currency(crypto_currency: dict, columns: tuple[str, ...]) -> dict:
+    """Возвращает выбранные столбцы одной строки таблицы, числа форматируются только здесь"""
+    raw_values = crypto_currency.get("raw") or {}
+    row: dict[str, Any] = {}
+    for column in columns:
+        if column in FORMATTED_COLUMNS and column in raw_values:
+            value = raw_values[column]
+            row[column] = "" if value is None else format_crypto_currency_value(value)
+        else:
+            # снимок, сохранённый до появления исходных чисел, уже содержит отформатированные строки
+            row[column] = crypto_currency.get(column)
+    return row
+
+
+def get_crypto_currency_page(offset: Union[str, int, None] = 0, limit: Union[str, int, None] = DEFAULT_LIMIT,
+                             columns: tuple[str, ...] = COLUMNS, sorting: Optional[str] = None) -> CryptoCurrencyPage:
+    """Возвращает окно [offset, offset + limit) снимка с выбранными столбцами.
+    Снимок не копируется: сортировка создаёт новый список ссылок, а форматируются только строки окна"""
+    offset = _to_int(offset, 0, 0)
+    limit = _to_int(limit, DEFAULT_LIMIT, 1, MAX_LIMIT)
+
+    crypto_currency_data = get_read_data()
+    if sorting:
+        crypto_currency_data = sort_crypto_currency(sorting=sorting, crypto_currency_data=crypto_currency_data)
+    crypto_currencies_list = crypto_currency_data.crypto_currencies_list
+
+    return CryptoCurrencyPage(
+        error_message=crypto_currency_data.error_message,
+        last_updated=crypto_currency_data.last_updated,
+        crypto_currencies_list=[
+            _format_crypto_currency(crypto_currency, columns)
+            for crypto_currency in crypto_currencies_list[offset:offset + limit]
+        ],
+        count=len(crypto_currencies_list),
+        offset=offset,
+        limit=limit,
+    )
 
 
-def get_crypto_currency_data(rows: str = "10") -> CryptoCurrencyData:
-    return get_read_data(rows)
+def get_crypto_currency_data(rows: str = "10") -> CryptoCurrencyPage:
+    return get_crypto_currency_page(limit=rows)
@@ -6,10 +6,9 @@ from dataclasses import dataclass
 from typing import final, Optional
 
 import backoff
-from requests import get as requests_get
 from requests.models import Response
 
-from rating_movies.services.api import api_utils
+from rating_movies.services.api import api_utils, http_client
 
 
 @dataclass
@@ -17,6 +16,8 @@ class CurrencyData:
     error_message: str
     last_updated: str
     currencies_list: list[dict]
+    rates_date: Optional[date] = None
+    # дата, на которую ЦБ установил курсы (поле Date ответа API)
 
 
 @final
@@ -43,7 +44,8 @@ class CurrencyAPI:
     def __make_call(self) -> Optional[Response]:
         """Возвращает ответ от сервера в виде объекта Response"""
         try:
-            response = requests_get(url=self.__form_url())
+            endpoint = "daily_json" if self.__date is None else "archive"
+            response = http_client.get_client("cbr").get(self.__form_url(), endpoint=endpoint)
         except api_utils.return_base_requests_exceptions() as exc:
             self.__logger.error(exc)
             response = None
@@ -59,7 +61,7 @@ class CurrencyAPI:
         )
         response = self.__make_call()
         if _is_error(response):
-            if response.status_code == 404:
+            if response is not None and response.status_code == 404:
                 self.__logger.error(response.text)
 
             currency_instance.error_message = api_utils.return_error_message()
@@ -72,6 +74,11 @@ class CurrencyAPI:
             currency_instance.error_message = api_utils.return_error_message()
             return currency_instance
 
+        try:
+            currency_instance.rates_date = date.fromisoformat(json_response["Date"][:10])
+        except (KeyError, TypeError, ValueError) as exc:
+            self.__logger.error(exc)
+
         try:
             currencies_dict: dict = json_response.get("Valute")
             for currency in currencies_dict.values():
@@ -108,7 +115,7 @@ def _check_date(date_obj: date) -> bool:
     return isinstance(date_obj, date)
 
 
-def _is_error(response: Response) -> bool:
+def _is_error(response: Optional[Response]) -> bool:
     """Проверяет объект response на наличие статуса ошибки"""
     if response is None or not response.ok:
         return True
@@ -1,26 +1,31 @@
-import json
-import os
 import logging
 from datetime import date
 from typing import Optional
 
-from site_engine.settings import BASE_DIR
-from rating_movies.exceptions import WriteToFileError, ReadFileError, ConversionStringError
-from rating_movies.services.api.api_utils import do_need_update, create_dir_for_json_files, is_dir_for_json_files,\
-    get_folder_name_for_json_files
+from rating_movies.exceptions import ReadFileError, ConversionStringError
+from rating_movies.services.api.api_utils import do_need_update, return_error_message
+from rating_movies.services.api.snapshot_store import JSONSnapshotStore
+from rating_movies.services.api.snapshot_refresh import refresh_in_background
 from rating_movies.services.api.currency.currency_api import get_cbr_data, CurrencyData
+from rating_movies.services.crud.repositories import CurrencyRateRepository
 
 
 LOGGER = logging.getLogger("json_api_logger")
 
+SNAPSHOT_STORE = JSONSnapshotStore("cbr_data.json")
+
 
 def _get_data_for_recording(specific_date: date = None) -> dict:
     """Возвращает словарь с данными для записи в файл.
-    При наличии сообщения об ошибке запишет в 'currencies_list' старые данные."""
+    Полученные курсы добавляются в архив на дату ЦБ, при наличии сообщения об ошибке
+    запишет в 'currencies_list' старые данные."""
     data_for_recording = get_cbr_data(specific_date)
 
     if not data_for_recording.error_message:
         currencies_list = data_for_recording.currencies_list
+        CurrencyRateRepository().archive_rates(
+            specific_date or data_for_recording.rates_date or date.today(), currencies_list
+        )
     else:
         currencies_list = _get_old_currencies_list()
 
@@ -34,78 +39,72 @@ def _get_data_for_recording(specific_date: date = None) -> dict:
 def _get_old_currencies_list() -> list:
     """Возвращает старые данные из файла."""
     try:
-        old_data = _read_currency_data()
+        old_data = SNAPSHOT_STORE.read()
         currencies_list = old_data.get("currencies_list")
-    except (ReadFileError, FileNotFoundError) as exc:
+    except ReadFileError as exc:
         LOGGER.error(exc)
         currencies_list = []
 
     return currencies_list
 
 
-def _form_full_path(file_name: str = None) -> str:
-    """Формирует полный путь до передаваемого файла.
-    Если имя файла не было передано, оно устанавливается в базовое значение"""
-    if file_name is None:
-        file_name = "cbr_data.json"
-
-    return BASE_DIR / "rating_movies" / get_folder_name_for_json_files() / file_name
+def _convert_to_currency_data(read_data: dict) -> CurrencyData:
+    """Конвертирует словарь с данными в объект класса CryptoCurrencyData"""
+    return CurrencyData(
+        error_message=read_data.get("error_message", ""),
+        last_updated=read_data.get("last_updated", ""),
+        currencies_list=read_data.get("currencies_list", [])
+    )
 
 
-def _write_currency_data(specific_date: Optional[date]) -> None:
-    """Записывает данные в файл с расширением .json"""
-    full_path = _form_full_path()
-    currency_data = _get_data_for_recording(specific_date)
+def _is_outdated(currency_data: dict) -> bool:
+    """Проверяет, нужно ли обновить снимок данных о курсе валют"""
+    interval = 1 if currency_data.get("error_message", "") else 60
+    # Если есть ошибка - обновлять каждую минуту, иначе каждые 60 минут
     try:
-        with open(full_path, "w", encoding="utf-8") as file:
-            json.dump(currency_data, file, ensure_ascii=False, indent=2)
-    except Exception:
-        raise WriteToFileError(full_path)
+        return do_need_update(last_updated=currency_data.get("last_updated", ""), interval=interval)
+    except ConversionStringError:
+        return True
 
 
-def _read_currency_data() -> dict:
-    """"Возвращает считанные данные из файла с расширением .json"""
-    full_path = _form_full_path()
+def is_outdated() -> bool:
+    """Проверяет, отсутствует или устарел ли сохранённый снимок"""
     try:
-        with open(full_path, "r", encoding="utf-8") as file:
-            json_data = json.load(file)
-    except Exception:
-        raise ReadFileError(full_path)
+        return _is_outdated(SNAPSHOT_STORE.read())
+    except ReadFileError:
+        return True
 
-    return json_data
 
+def refresh_data(force: bool = False) -> bool:
+    """Получает данные на текущую дату от API и сохраняет их в снимок, если он устарел или передан force.
+    Возвращает False, если снимок обновляет другой процесс или он уже актуален"""
+    return SNAPSHOT_STORE.refresh(_get_data_for_recording, _is_outdated, force=force)
 
-def _convert_to_currency_data(read_data: dict) -> CurrencyData:
-    """Конвертирует словарь с данными в объект класса CryptoCurrencyData"""
-    return CurrencyData(
-        error_message=read_data.get("error_message", ""),
-        last_updated=read_data.get("last_updated", ""),
-        currencies_list=read_data.get("currencies_list", [])
-    )
+
+def _get_data_for_date(specific_date: date) -> dict:
+    """Возвращает данные на прошедшую дату из архива, они не попадают в снимок.
+    Курсы, которых ещё нет в архиве, получаются от API один раз"""
+    repository = CurrencyRateRepository()
+    currencies_list = repository.get_rates_for_date(specific_date)
+    if currencies_list:
+        return {"error_message": "", "last_updated": str(specific_date), "currencies_list": currencies_list}
+
+    return _get_data_for_recording(specific_date)
 
 
 def get_read_data(specific_date: Optional[date]) -> CurrencyData:
-    """Возвращает объект класса CryptoCurrencyData с актуальными данными"""
-    if not is_dir_for_json_files():
-        create_dir_for_json_files()
+    """Возвращает объект класса CurrencyData с последним сохранённым снимком или с данными на переданную дату.
+    Отсутствующий или устаревший снимок обновляется в фоновом потоке, запрос пользователя его не ждёт"""
+    if specific_date is not None and specific_date != date.today():
+        return _convert_to_currency_data(_get_data_for_date(specific_date))
 
     try:
-        if not os.path.isfile(_form_full_path()):
-            _write_currency_data(specific_date)
-        else:
-            currency_data = _read_currency_data()
-            last_updated = currency_data.get("last_updated", "")
-            interval = 1 if currency_data.get("error_message", "") else 60
-            # Если есть ошибка - обновлять каждую минуту, иначе каждые 60 минут
-            if specific_date or do_need_update(last_updated=last_updated, interval=interval):
-                # если данные не актуальны или нужно получить новые данные на конкретную дату,
-                # информация обновляется
-                _write_currency_data(specific_date)
-
-        currency_data = _read_currency_data()
-
-    except (ReadFileError, WriteToFileError, ConversionStringError) as exc:
+        currency_data = SNAPSHOT_STORE.read()
+    except ReadFileError as exc:
         LOGGER.error(exc)
-        currency_data = _get_data_for_recording(specific_date)
+        currency_data = {"error_message": return_error_message()}
+
+    if _is_outdated(currency_data):
+        refresh_in_background("currency", refresh_data)
 
     return _convert_to_currency_data(currency_data)
@@ -0,0 +1,177 @@
+import time
+import bisect
+import threading
+from typing import Optional
+
+from requests import Session, Response
+from requests.adapters import HTTPAdapter
+from requests.exceptions import ConnectionError
+
+
+DEFAULT_TIMEOUT = (3.05, 10)
+# (подключение, чтение) в секундах: без таймаута зависший API держит поток сколько угодно долго
+POOL_SIZE = 10
+FAILURE_THRESHOLD = 5
+RESET_TIMEOUT = 30
+
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+# верхние границы интервалов гистограммы в секундах, последний интервал - всё, что дольше
+
+
+class CircuitOpenError(ConnectionError):
+    """Запросы к провайдеру временно не выполняются, так как он не отвечает.
+    Наследуется от ConnectionError, поэтому обрабатывается так же, как недоступность сервера"""
+
+    def __init__(self, provider: str):
+        super().__init__(f"Circuit breaker of '{provider}' is open")
+
+
+class CircuitBreaker:
+    """После failure_threshold ошибок подряд запросы не выполняются reset_timeout секунд,
+    затем пропускается один пробный запрос: при успехе запросы снова выполняются"""
+
+    def __init__(self, failure_threshold: int = FAILURE_THRESHOLD, reset_timeout: float = RESET_TIMEOUT):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.__failures = 0
+        self.__opened_at: Optional[float] = None
+        self.__is_probing = False
+        self.__lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self.__opened_at is None:
+            return "closed"
+        if time.monotonic() - self.__opened_at >= self.reset_timeout:
+            return "half-open"
+        return "open"
+
+    def allow_request(self) -> bool:
+        with self.__lock:
+            state = self.state
+            if state == "closed":
+                return True
+            if state == "half-open" and not self.__is_probing:
+                self.__is_probing = True
+                return True
+            return False
+
+    def record_success(self) -> None:
+        with self.__lock:
+            self.__failures = 0
+            self.__opened_at = None
+            self.__is_probing = False
+
+    def record_failure(self) -> None:
+        with self.__lock:
+            self.__failures += 1
+            if self.__is_probing or self.__failures >= self.failure_threshold:
+                self.__opened_at = time.monotonic()
+            self.__is_probing = False
+
+
+class LatencyHistogram:
+    def __init__(self, buckets: tuple[float, ...] = LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.__counts = [0] * (len(buckets) + 1)
+        self.__total = 0.0
+        self.__lock = threading.Lock()
+
+    def observe(self, seconds: float) -> None:
+        with self.__lock:
+            self.__counts[bisect.bisect_left(self.buckets, seconds)] += 1
+            self.__total += seconds
+
+    def as_dict(self) -> dict:
+        with self.__lock:
+            count = sum(self.__counts)
+            return {
+                "count": count,
+                "average": self.__total / count if count else None,
+                "buckets": {
+                    **{str(bound): number for bound, number in zip(self.buckets, self.__counts)},
+                    "inf": self.__counts[-1],
+                },
+            }
+
+
+class HTTPClient:
+    """Клиент одного провайдера: сессия с пулом keep-alive соединений для каждого хоста, таймауты,
+    предохранитель и гистограммы времени ответа для каждого адреса API"""
+
+    def __init__(self, provider: str, timeout: tuple[float, float] = DEFAULT_TIMEOUT, pool_size: int = POOL_SIZE,
+                 failure_threshold: int = FAILURE_THRESHOLD, reset_timeout: float = RESET_TIMEOUT):
+        self.provider = provider
+        self.timeout = timeout
+        self.circuit_breaker = CircuitBreaker(failure_threshold=failure_threshold, reset_timeout=reset_timeout)
+        self.__histograms: dict[str, LatencyHistogram] = {}
+        self.__histograms_lock = threading.Lock()
+
+        self.session = Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=0)
+        # повторы делает backoff в клиентах API, здесь запрос выполняется один раз
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def __get_histogram(self, endpoint: str) -> LatencyHistogram:
+        histogram = self.__histograms.get(endpoint)
+        if histogram is None:
+            with self.__histograms_lock:
+                histogram = self.__histograms.setdefault(endpoint, LatencyHistogram())
+        return histogram
+
+    def get(self, url: str, endpoint: str, **kwargs) -> Response:
+        """Выполняет GET запрос. endpoint - название адреса API для гистограммы времени ответа.
+        Ответы со статусом 5xx и ошибки соединения считаются отказами провайдера"""
+        if not self.circuit_breaker.allow_request():
+            raise CircuitOpenError(self.provider)
+
+        kwargs.setdefault("timeout", self.timeout)
+        start = time.monotonic()
+        try:
+            response = self.session.get(url, **kwargs)
+        except Exception:
+            self.circuit_breaker.record_failure()
+            raise
+        finally:
+            self.__get_histogram(endpoint).observe(time.monotonic() - start)
+
+        if response.status_code >= 500:
+            self.circuit_breaker.record_failure()
+        else:
+            self.circuit_breaker.record_success()
+        return response
+
+    def get_stats(self) -> dict:
+        return {
+            "circuit_breaker": self.circuit_breaker.state,
+            "endpoints": {endpoint: histogram.as_dict() for endpoint, histogram in self.__histograms.items()},
+        }
+
+
+_clients: dict[str, HTTPClient] = {}
+_clients_lock = threading.Lock()
+
+
+def get_client(provider: str, **options) -> HTTPClient:
+    """Возвращает клиент провайдера, общий для всех потоков процесса.
+    Параметры клиента (timeout, pool_size и т.д.) применяются при первом вызове"""
+    client = _clients.get(provider)
+    if client is None:
+        with _clients_lock:
+            client = _clients.get(provider)
+            if client is None:
+                client = _clients[provider] = HTTPClient(provider, **options)
+    return client
+
+
+def get_stats() -> dict[str, dict]:
+    """Возвращает состояние предохранителей и гистограммы времени ответа всех провайдеров"""
+    return {provider: client.get_stats() for provider, client in list(_clients.items())}
+
+
+def reset_clients() -> None:
+    with _clients_lock:
+        for client in _clients.values():
+            client.session.close()
+        _clients.clear()
@@ -3,10 +3,9 @@ from os import environ
 from typing import final, Optional
 
 import backoff
-from requests import get as requests_get
 
 from site_engine.settings import load_env
-from rating_movies.services.api import api_utils
+from rating_movies.services.api import api_utils, http_client
 
 
 @final
@@ -27,7 +26,7 @@ class IMDbAPI:
          иначе возвращает None"""
         url = "https://imdb-api.com/%s/API/SearchMovie/%s/%s" % (self.__lang, self.__api_key, movie_title)
         try:
-            response = requests_get(url=url)
+            response = http_client.get_client("imdb").get(url, endpoint="SearchMovie")
             data = response.json()
         except api_utils.return_base_requests_exceptions() as exc:
             self.__logger.error(exc)
@@ -48,7 +47,7 @@ class IMDbAPI:
 
         url = "https://imdb-api.com/%s/API/Ratings/%s/%s" % (self.__lang, self.__api_key, movie_id)
         try:
-            response = requests_get(url=url)
+            response = http_client.get_client("imdb").get(url, endpoint="Ratings")
             data = response.json()
         except api_utils.return_base_requests_exceptions() as exc:
             self.__logger.error(exc)
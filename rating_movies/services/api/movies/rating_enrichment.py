@@ -0,0 +1,97 @@
+import time
+import logging
+import datetime
+import threading
+from typing import Iterable, Optional
+from concurrent.futures import ThreadPoolExecutor
+
+from django.utils import timezone
+
+from rating_movies.services import page_cache
+from rating_movies.services.crud import repositories
+from rating_movies.services.api.movies import movies_api
+
+
+LOGGER = logging.getLogger("json_api_logger")
+
+BATCH_SIZE = 50
+CONCURRENCY = 4
+RATE = 2
+# фильмов в секунду, для каждого фильма выполняется два запроса к IMDb API
+MAX_ATTEMPTS = 5
+LEASE = datetime.timedelta(minutes=10)
+RETRY_DELAY = datetime.timedelta(minutes=5)
+RATING_TTL = datetime.timedelta(days=30)
+# рейтинг старше RATING_TTL получается заново
+
+
+class RateLimiter:
+    """Ограничивает частоту вызовов из всех потоков: не больше rate вызовов в секунду"""
+
+    def __init__(self, rate: float):
+        self.interval = 1 / rate if rate > 0 else 0
+        self.__next_call = time.monotonic()
+        self.__lock = threading.Lock()
+
+    def wait(self) -> None:
+        with self.__lock:
+            now = time.monotonic()
+            delay = self.__next_call - now
+            self.__next_call = max(self.__next_call, now) + self.interval
+        if delay > 0:
+            time.sleep(delay)
+
+
+def enqueue_movies(movie_ids: Iterable[int]) -> int:
+    """Добавляет фильмы без рейтинга из других источников в очередь. Рейтинг получает команда enrich_movie_ratings"""
+    return repositories.RatingEnrichmentTaskRepository().enqueue(movie_ids)
+
+
+def enqueue_stale_ratings(ttl: datetime.timedelta = RATING_TTL) -> None:
+    """Добавляет в очередь фильмы, рейтинг которых был получен больше ttl назад"""
+    stale_movie_ids = repositories.OtherSourcesRatingRepository().get_stale_movie_ids(timezone.now() - ttl)
+    repositories.RatingEnrichmentTaskRepository().add(list(stale_movie_ids))
+
+
+def fetch_ratings(titles: dict[int, str], concurrency: int = CONCURRENCY,
+                  rate: float = RATE) -> dict[int, Optional[dict]]:
+    """Возвращает рейтинги фильмов {id фильма: рейтинг или None}. Запросы выполняются в concurrency потоков,
+    но не чаще rate фильмов в секунду"""
+    rate_limiter = RateLimiter(rate)
+
+    def get_movie_rating(title: str) -> Optional[dict]:
+        rate_limiter.wait()
+        try:
+            return movies_api.get_movie_rating(movie_title=title)
+        except Exception as exc:
+            LOGGER.error(exc)
+            return None
+
+    with ThreadPoolExecutor(max_workers=max(concurrency, 1), thread_name_prefix="imdb") as executor:
+        return dict(zip(titles, executor.map(get_movie_rating, titles.values())))
+
+
+def process_batch(batch_size: int = BATCH_SIZE, concurrency: int = CONCURRENCY,
+                  rate: float = RATE) -> tuple[int, int]:
+    """Получает рейтинги одной партии фильмов из очереди и сохраняет их массовыми запросами.
+    Возвращает (число полученных рейтингов, число отложенных фильмов)"""
+    task_repository = repositories.RatingEnrichmentTaskRepository()
+    tasks = task_repository.claim(batch_size=batch_size, lease=LEASE, max_attempts=MAX_ATTEMPTS)
+    if not tasks:
+        return 0, 0
+
+    ratings = fetch_ratings(
+        {task.movie_id: task.movie.title_en or task.movie.title for task in tasks},
+        concurrency=concurrency, rate=rate,
+    )
+    received_ratings = {movie_id: rating for movie_id, rating in ratings.items() if rating}
+    completed_tasks = [task for task in tasks if task.movie_id in received_ratings]
+    failed_tasks = [task for task in tasks if task.movie_id not in received_ratings]
+
+    repositories.OtherSourcesRatingRepository().save_ratings(received_ratings)
+    task_repository.complete(completed_tasks)
+    task_repository.retry(failed_tasks, base_delay=RETRY_DELAY, max_attempts=MAX_ATTEMPTS)
+    for movie_id in received_ratings:
+        page_cache.reset_movie_page(movie_id=movie_id)
+
+    return len(completed_tasks), len(failed_tasks)
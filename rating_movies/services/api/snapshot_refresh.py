@@ -0,0 +1,53 @@
+import asyncio
+import logging
+import threading
+from typing import Callable, Optional
+
+
+LOGGER = logging.getLogger("json_api_logger")
+
+_running: set[str] = set()
+_running_lock = threading.Lock()
+# снимки, которые обновляются потоками текущего процесса; между процессами обновление разделяет
+# блокировка JSONSnapshotStore.lock
+
+
+def refresh_snapshot(name: str, refresh: Callable[[], bool]) -> bool:
+    """Обновляет снимок, если его не обновляет другой поток процесса.
+    Возвращает True, если снимок был обновлён"""
+    with _running_lock:
+        if name in _running:
+            return False
+        _running.add(name)
+
+    try:
+        return refresh()
+    except Exception as exc:
+        LOGGER.error(exc)
+        return False
+    finally:
+        with _running_lock:
+            _running.discard(name)
+
+
+def refresh_in_background(name: str, refresh: Callable[[], bool]) -> Optional[threading.Thread]:
+    """Запускает обновление снимка в фоновом потоке, чтобы запрос пользователя не ждал внешний API"""
+    if name in _running:
+        return None
+
+    thread = threading.Thread(target=refresh_snapshot, args=(name, refresh), name=f"refresh_{name}", daemon=True)
+    thread.start()
+    return thread
+
+
+async def _refresh_concurrently(refreshes: dict[str, Callable[[], bool]]) -> list[bool]:
+    return await asyncio.gather(
+        *(asyncio.to_thread(refresh_snapshot, name, refresh) for name, refresh in refreshes.items())
+    )
+
+
+def refresh_concurrently(refreshes: dict[str, Callable[[], bool]]) -> dict[str, bool]:
+    """Обновляет несколько снимков одновременно, время обновления равно времени самого медленного API"""
+    if not refreshes:
+        return {}
+    return dict(zip(refreshes, asyncio.run(_refresh_concurrently(refreshes))))
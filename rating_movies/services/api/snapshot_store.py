@@ -0,0 +1,117 @@
+import os
+import sys
+import json
+import tempfile
+import threading
+from pathlib import Path
+from contextlib import contextmanager
+from typing import Callable, Iterator, Optional
+
+if sys.platform == "win32":
+    import msvcrt
+else:
+    import fcntl
+
+from site_engine.settings import BASE_DIR
+from rating_movies.exceptions import ReadFileError, WriteToFileError
+from rating_movies.services.api.api_utils import get_folder_name_for_json_files
+
+
+class JSONSnapshotStore:
+    """Снимок данных внешнего API в файле с расширением .json.
+    Файл заменяется целиком через os.replace, поэтому читатели никогда не видят частично записанный файл.
+    Разобранный снимок хранится в памяти процесса, пока файл не будет заменён: чтение стоит одного stat()"""
+
+    def __init__(self, file_name: str):
+        self.path = Path(BASE_DIR) / "rating_movies" / get_folder_name_for_json_files() / file_name
+        self.__parsed: Optional[tuple[tuple, dict]] = None
+        # (подпись файла, разобранные данные)
+        self.__parse_lock = threading.Lock()
+
+    @staticmethod
+    def __get_signature(stat: os.stat_result) -> tuple:
+        return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+    def read(self) -> dict:
+        """Возвращает данные снимка. Словарь общий для всех потоков процесса, изменять его нельзя"""
+        try:
+            signature = self.__get_signature(os.stat(self.path))
+        except OSError:
+            raise ReadFileError(self.path)
+
+        parsed = self.__parsed
+        if parsed is not None and parsed[0] == signature:
+            return parsed[1]
+
+        with self.__parse_lock:
+            parsed = self.__parsed
+            if parsed is not None and parsed[0] == signature:
+                return parsed[1]
+            try:
+                with open(self.path, "r", encoding="utf-8") as file:
+                    signature = self.__get_signature(os.fstat(file.fileno()))
+                    data = json.load(file)
+            except Exception:
+                raise ReadFileError(self.path)
+            self.__parsed = (signature, data)
+
+        return data
+
+    def write(self, data: dict) -> None:
+        """Записывает данные во временный файл и атомарно заменяет им снимок"""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        descriptor, temp_path = tempfile.mkstemp(dir=self.path.parent, prefix=f".{self.path.name}.", suffix=".tmp")
+        try:
+            with os.fdopen(descriptor, "w", encoding="utf-8") as file:
+                json.dump(data, file, ensure_ascii=False, indent=2)
+                file.flush()
+                os.fsync(file.fileno())
+            os.chmod(temp_path, 0o644)
+            os.replace(temp_path, self.path)
+        except Exception:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise WriteToFileError(self.path)
+
+    @contextmanager
+    def lock(self) -> Iterator[bool]:
+        """Блокировка обновления снимка, общая для всех процессов. Возвращает False, если её уже захватил
+        другой процесс. Блокировку держит открытый файл, поэтому она снимается и при падении процесса"""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path.with_name(f"{self.path.name}.lock"), "a+b") as lock_file:
+            try:
+                if sys.platform != "win32":
+                    fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+                else:
+                    lock_file.seek(0)
+                    msvcrt.locking(lock_file.fileno(), msvcrt.LK_NBLCK, 1)
+            except OSError:
+                yield False
+                return
+
+            try:
+                yield True
+            finally:
+                if sys.platform != "win32":
+                    fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+                else:
+                    lock_file.seek(0)
+                    msvcrt.locking(lock_file.fileno(), msvcrt.LK_UNLCK, 1)
+
+    def refresh(self, get_data: Callable[[], dict], is_outdated: Callable[[dict], bool], force: bool = False) -> bool:
+        """Сохраняет данные, полученные от get_data, если снимок устарел. Снимок обновляет только один процесс,
+        остальные не ждут его и сразу возвращают False"""
+        with self.lock() as is_locked:
+            if not is_locked:
+                return False
+
+            if not force:
+                # снимок мог обновить другой процесс, пока этот решал его обновить
+                try:
+                    if not is_outdated(self.read()):
+                        return False
+                except ReadFileError:
+                    pass
+
+            self.write(get_data())
+        return True
@@ -5,10 +5,9 @@ from dataclasses import dataclass
 from typing import final, Optional
 
 import backoff
-from requests import get as requests_get
 
 from site_engine.settings import load_env
-from rating_movies.services.api import api_utils
+from rating_movies.services.api import api_utils, http_client
 
 
 @dataclass
@@ -53,7 +52,7 @@ class YandexWeatherAPI:
         url = "https://api.weather.yandex.ru/v2/informers?lat=%s&lon=%s" % (self.__geo_coordinates.latitude,
                                                                             self.__geo_coordinates.longitude)
         try:
-            response = requests_get(url=url, headers=self.__headers)
+            response = http_client.get_client("yandex_weather").get(url, endpoint="informers", headers=self.__headers)
             data = response.json()
         except api_utils.return_base_requests_exceptions() as exc:
             self.__logger.error(exc)
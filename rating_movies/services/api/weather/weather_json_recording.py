@@ -1,17 +1,17 @@
-import json
-import os
 import logging
 from typing import Optional
 
-from site_engine.settings import BASE_DIR
-from rating_movies.exceptions import WriteToFileError, ReadFileError, ConversionStringError
-from rating_movies.services.api.api_utils import create_dir_for_json_files, do_need_update, is_dir_for_json_files,\
-    get_folder_name_for_json_files
+from rating_movies.exceptions import ReadFileError, ConversionStringError
+from rating_movies.services.api.api_utils import do_need_update, return_error_message
+from rating_movies.services.api.snapshot_store import JSONSnapshotStore
+from rating_movies.services.api.snapshot_refresh import refresh_in_background
 from rating_movies.services.api.weather.weather_api import get_yandex_weather_data, WeatherData
 
 
 LOGGER = logging.getLogger("json_api_logger")
 
+SNAPSHOT_STORE = JSONSnapshotStore("yandex_weather_data.json")
+
 
 def _get_data_for_recording() -> dict:
     """Возвращает словарь с данными для записи в файл.
@@ -37,8 +37,8 @@ def _get_data_for_recording() -> dict:
 def _get_old_data() -> Optional[dict]:
     """Возвращает старые данные из файла"""
     try:
-        old_data = _read_weather_data(_form_full_path())
-    except (ReadFileError, FileNotFoundError) as exc:
+        old_data = SNAPSHOT_STORE.read()
+    except ReadFileError as exc:
         LOGGER.error(exc)
         old_data = None
 
@@ -65,36 +65,6 @@ def _get_old_weather_forecast(old_data: Optional[dict]) -> list:
     return weather_forecast
 
 
-def _form_full_path(file_name: str = None) -> str:
-    """Формирует полный путь до передаваемого файла.
-        Если имя файла не было передано, оно устанавливается в базовое значение"""
-    if file_name is None:
-        file_name = "yandex_weather_data.json"
-
-    return BASE_DIR / "rating_movies" / get_folder_name_for_json_files() / file_name
-
-
-def _write_weather_data(full_path: str) -> None:
-    """Записывает данные в файл с расширением .json"""
-    weather_data = _get_data_for_recording()
-    try:
-        with open(full_path, "w", encoding="utf-8") as file:
-            json.dump(weather_data, file, ensure_ascii=False, indent=2)
-    except Exception:
-        raise WriteToFileError(full_path)
-
-
-def _read_weather_data(full_path: str) -> dict:
-    """Возвращает считанные данные из файла с расширением .json"""
-    try:
-        with open(full_path, "r", encoding="utf-8") as file:
-            weather_json_data = json.load(file)
-    except Exception:
-        raise ReadFileError(full_path)
-
-    return weather_json_data
-
-
 def _convert_to_weather_object(read_data: dict) -> WeatherData:
     """Конвертирует словарь с данными в объект класса WeatherData"""
     return WeatherData(
@@ -105,27 +75,40 @@ def _convert_to_weather_object(read_data: dict) -> WeatherData:
     )
 
 
-def get_read_data() -> WeatherData:
-    """Возвращает объект класса WeatherData с актуальными данными"""
-    if not is_dir_for_json_files():
-        create_dir_for_json_files()
+def _is_outdated(weather_data: dict) -> bool:
+    """Проверяет, нужно ли обновить снимок данных о погоде"""
+    interval = 1 if weather_data.get("error_message", "") else 30
+    # Если есть ошибка - обновлять каждую минуту, иначе каждые 30 минут
+    try:
+        return do_need_update(last_updated=weather_data.get("last_updated", ""), interval=interval)
+    except ConversionStringError:
+        return True
+
+
+def is_outdated() -> bool:
+    """Проверяет, отсутствует или устарел ли сохранённый снимок"""
+    try:
+        return _is_outdated(SNAPSHOT_STORE.read())
+    except ReadFileError:
+        return True
 
+
+def refresh_data(force: bool = False) -> bool:
+    """Получает данные от API и сохраняет их в снимок, если он устарел или передан force.
+    Возвращает False, если снимок обновляет другой процесс или он уже актуален"""
+    return SNAPSHOT_STORE.refresh(_get_data_for_recording, _is_outdated, force=force)
+
+
+def get_read_data() -> WeatherData:
+    """Возвращает объект класса WeatherData с последним сохранённым снимком.
+    Отсутствующий или устаревший снимок обновляется в фоновом потоке, запрос пользователя его не ждёт"""
     try:
-        path = _form_full_path()
-        if not os.path.isfile(path):
-            _write_weather_data(path)
-        else:
-            weather_data = _read_weather_data(path)
-            last_updated = weather_data.get("last_updated", "")
-            interval = 1 if weather_data.get("error_message", "") else 30
-            # Если есть ошибка - обновлять каждую минуту, иначе каждые 30 минут
-            if do_need_update(last_updated=last_updated, interval=interval):
-                _write_weather_data(path)
-
-        weather_data = _read_weather_data(path)
-
-    except (WriteToFileError, ReadFileError, ConversionStringError) as exc:
+        weather_data = SNAPSHOT_STORE.read()
+    except ReadFileError as exc:
         LOGGER.error(exc)
-        weather_data = _get_data_for_recording()
+        weather_data = {"error_message": return_error_message()}
+
+    if _is_outdated(weather_data):
+        refresh_in_background("weather", refresh_data)
 
     return _convert_to_weather_object(weather_data)
@@ -1,4 +1,18 @@
 CACHE_FOR_NEW_MOVIES = "most_recently_added_movies"
-CACHE_FOR_USER_ADDED_MOVIES = "last_added_user_movies"
 CACHE_FOR_GENRES = "genres"
 CACHE_FOR_YEARS = "years"
+CACHE_FOR_USER_VERSION = "user_cache_version_%s"
+CACHE_FOR_USER_ADDED_MOVIES = "last_added_user_movies_%s"
+CACHE_FOR_USER_MOVIES = "user_movies_%s"
+CACHE_FOR_USER_WATCHLIST = "user_watchlist_%s"
+# keys of user's data are versioned by CACHE_FOR_USER_VERSION, see rating_movies/services/user_cache.py
+CACHE_FOR_CATALOGUE_VERSION = "catalogue_version"
+CACHE_FOR_MOVIE_VERSION = "movie_version_%s"
+CACHE_FOR_ANONYMOUS_USER_RATING = "anonymous_user_rating_%s_%s"
+CACHE_FOR_PAGE = "page_%s_%s_%s_%s"
+# pages of anonymous users: language, path, page number or cursor and versions of data, see rating_movies/services/page_cache.py
+CACHE_FOR_COUNT = "count_%s"
+CACHE_FOR_GEOCODE = "geocode_%s"
+CACHE_FOR_MY_COORDINATES = "my_coordinates"
+CACHE_FOR_RANDOM_MOVIES_POOL = "random_movies_pool_%s_%s"
+# ids of movies for random choice: catalogue version and filter, see rating_movies/services/random_movies.py
@@ -0,0 +1,29 @@
+import time
+from typing import Any
+
+from django.core.cache import cache
+
+
+def _get_counter(key: str, default: Any = None) -> Any:
+    """Versions are read from the shared cache: the local level of TieredCache in other processes
+    would return the old version after increase_version"""
+    get_counter = getattr(cache, "get_counter", cache.get)
+    return get_counter(key, default)
+
+
+def get_version(key: str) -> int:
+    """Return version of cached data stored by key. Initial version is taken from current time,
+    so entries whose version was evicted from the cache can't become valid again"""
+    version = _get_counter(key)
+    if version is None:
+        cache.add(key, int(time.time()), None)
+        version = _get_counter(key, int(time.time()))
+    return version
+
+
+def increase_version(key: str) -> None:
+    """Invalidate all cached data of the version stored by key"""
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, int(time.time()), None)
@@ -0,0 +1,314 @@
+import csv
+import json
+import logging
+import datetime
+import itertools
+from dataclasses import dataclass, field
+from typing import Any, Iterable, Iterator, Union, TextIO
+
+from django.db import transaction, IntegrityError
+from django.db.models import Model, Field
+from django.core.exceptions import ValidationError
+from django.core.validators import MaxLengthValidator
+
+from rating_movies.models import Movie, Actor, Genre, Category
+from rating_movies.services import search, suggest, page_cache, slugs, transliteration
+from rating_movies.services.crud import crud_utils, repositories
+
+
+LOGGER = logging.getLogger("json_main_logger")
+
+BATCH_SIZE = 1000
+MAX_ERRORS = 100
+# в результате импорта сохраняются сообщения только о первых MAX_ERRORS ошибках
+LIST_SEPARATOR = "|"
+# разделитель имён в столбцах genres, actors, directors файла CSV
+
+TEXT_FIELDS = ("title", "title_en", "tagline", "tagline_en", "description", "description_en",
+               "country", "country_en", "poster")
+NUMBER_FIELDS = ("budget", "fees_in_usa", "fees_in_world")
+RELATION_FIELDS: dict[str, type[Model]] = {"genres": Genre, "actors": Actor, "directors": Actor}
+# поле Many to many фильма: модель, объекты которой ищутся по имени и создаются, если их нет
+EXPORT_FIELDS = (*TEXT_FIELDS, *NUMBER_FIELDS, "world_premiere", "draft", "category", *RELATION_FIELDS)
+EXPORT_CHUNK_SIZE = 2000
+
+
+class RowError(ValueError):
+    """Строка файла, которую не удалось прочитать. Возвращается читателем вместо словаря"""
+
+
+@dataclass
+class ImportResult:
+    created: int = 0
+    skipped: int = 0
+    # фильмы с тем же названием и годом выхода уже есть
+    failed: int = 0
+    errors: list[str] = field(default_factory=list)
+
+    def add_error(self, line_number: int, error: Exception) -> None:
+        self.failed += 1
+        if len(self.errors) < MAX_ERRORS:
+            self.errors.append(f"Line {line_number}: {error}")
+
+    def update(self, other: "ImportResult") -> None:
+        self.created += other.created
+        self.skipped += other.skipped
+        self.failed += other.failed
+        self.errors.extend(other.errors[:MAX_ERRORS - len(self.errors)])
+
+
+def read_json_lines(lines: Iterable[str]) -> Iterator[Union[dict, RowError]]:
+    """Читает файл JSON lines: по одному объекту фильма в строке"""
+    for line in lines:
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as exc:
+            yield RowError(f"invalid JSON: {exc}")
+            continue
+        yield row if isinstance(row, dict) else RowError("a line must contain JSON object")
+
+
+def read_csv(lines: Iterable[str]) -> Iterator[dict]:
+    """Читает файл CSV с заголовком, имена в столбцах genres, actors, directors разделяются символом '|'"""
+    yield from csv.DictReader(lines)
+
+
+def write_json_lines(rows: Iterable[dict], stream: TextIO) -> int:
+    """Записывает фильмы в формате JSON lines, возвращает число записанных фильмов"""
+    number = 0
+    for number, row in enumerate(rows, 1):
+        stream.write(json.dumps(row, ensure_ascii=False, default=str) + "\n")
+    return number
+
+
+def write_csv(rows: Iterable[dict], stream: TextIO) -> int:
+    """Записывает фильмы в формате CSV с заголовком, возвращает число записанных фильмов"""
+    writer = csv.DictWriter(stream, fieldnames=EXPORT_FIELDS)
+    writer.writeheader()
+    number = 0
+    for number, row in enumerate(rows, 1):
+        writer.writerow({
+            name: LIST_SEPARATOR.join(value) if isinstance(value, list) else value for name, value in row.items()
+        })
+    return number
+
+
+READERS = {"jsonl": read_json_lines, "csv": read_csv}
+WRITERS = {"jsonl": write_json_lines, "csv": write_csv}
+
+
+def get_format(file_name: str) -> Union[str, None]:
+    """Формат файла по расширению: 'jsonl', 'csv' или None"""
+    extension = file_name.rsplit(".", 1)[-1].lower()
+    return extension if extension in READERS else None
+
+
+def _split_names(value: Union[str, list, None]) -> list[str]:
+    if not value:
+        return []
+    names = value if isinstance(value, list) else str(value).split(LIST_SEPARATOR)
+    return list(dict.fromkeys(str(name).strip() for name in names if str(name).strip()))
+
+
+def _to_bool(value: Union[str, bool, int, None]) -> bool:
+    if isinstance(value, str):
+        return value.strip().lower() in ("1", "true", "yes")
+    return bool(value)
+
+
+def _validate(model_field: Field, label: str, value: Union[str, int, bool, datetime.date]) -> None:
+    """Проверяет длину строки и диапазон числа по полю модели. Без проверки PostgreSQL отклоняет
+    слишком длинную строку или отрицательное число вместе со всей партией. Вызывает ValueError"""
+    try:
+        if isinstance(value, str) and model_field.max_length is not None:
+            MaxLengthValidator(model_field.max_length)(value)
+        elif isinstance(value, int) and not isinstance(value, bool):
+            # поле формы ограничивает Positive*IntegerField нулём на любой базе, валидаторы модели - не на всех
+            model_field.formfield().clean(value)
+    except ValidationError as exc:
+        raise ValueError(f"'{label}': {' '.join(exc.messages)}") from exc
+
+
+def _clean_row(row: dict) -> tuple[dict, dict[str, list[str]]]:
+    """Возвращает поля фильма и имена связанных объектов {поле Many to many: имена}.
+    Вызывает ValueError, если строка не может быть импортирована"""
+    title = str(row.get("title") or "").strip()
+    if not title:
+        raise ValueError("'title' is required")
+
+    movie_fields: dict[str, Any] = {name: str(row[name]).strip() for name in TEXT_FIELDS if row.get(name)}
+    movie_fields["title"] = title
+    for name in NUMBER_FIELDS:
+        if row.get(name) not in (None, ""):
+            movie_fields[name] = int(row[name])
+
+    world_premiere = row.get("world_premiere")
+    movie_fields["world_premiere"] = (
+        datetime.date.fromisoformat(str(world_premiere)) if world_premiere else datetime.date.today()
+    )
+    movie_fields["year"] = movie_fields["world_premiere"].year
+    movie_fields["draft"] = _to_bool(row.get("draft"))
+    movie_fields["category"] = str(row.get("category") or "").strip()
+    for name, value in movie_fields.items():
+        model_field = Category._meta.get_field("name") if name == "category" else Movie._meta.get_field(name)
+        _validate(model_field, name, value)
+
+    relations = {field_name: _split_names(row.get(field_name)) for field_name in RELATION_FIELDS}
+    for field_name, names in relations.items():
+        for name in names:
+            _validate(RELATION_FIELDS[field_name]._meta.get_field("name"), field_name, name)
+    return movie_fields, relations
+
+
+def _get_slugs(model: type[Model], names: list[str]) -> list[str]:
+    return slugs.allocate_slugs(model, transliteration.slugify_many(names))
+
+
+def _resolve_names(model: type[Model], names: set[str]) -> dict[str, int]:
+    """Возвращает {имя: id} объектов модели, отсутствующие объекты создаются одним запросом"""
+    if not names:
+        return {}
+
+    ids = dict(model.objects.filter(name__in=names).values_list("name", "pk"))
+    absent_names = sorted(names - ids.keys())
+    if absent_names:
+        # объекты с тем же адресом могли быть добавлены одновременно с импортом, такие строки пропускаются
+        # базой, а id созданных объектов читаются повторно
+        model.objects.bulk_create(
+            (model(name=name, url=slug) for name, slug in zip(absent_names, _get_slugs(model, absent_names))),
+            ignore_conflicts=True
+        )
+        ids.update(model.objects.filter(name__in=absent_names).values_list("name", "pk"))
+        if len(ids) < len(names):
+            raise IntegrityError(f"{model.__name__} objects weren't created: {', '.join(sorted(names - ids.keys()))}")
+    return ids
+
+
+class MovieImporter:
+    """Импорт фильмов вместе с жанрами, категориями, актёрами и режиссёрами.
+    Строки обрабатываются партиями по batch_size: каждая партия записывается постоянным числом запросов
+    в одной транзакции, поэтому память не зависит от размера файла"""
+
+    def __init__(self, batch_size: int = BATCH_SIZE, enqueue_ratings: bool = True):
+        self.batch_size = batch_size
+        self.enqueue_ratings = enqueue_ratings
+        # рейтинги из других источников получает команда enrich_movie_ratings, сам импорт не обращается к IMDb
+
+    def run(self, rows: Iterable[Union[dict, RowError]]) -> ImportResult:
+        result = ImportResult()
+        numbered_rows = enumerate(rows, 1)
+        while batch := list(itertools.islice(numbered_rows, self.batch_size)):
+            result.update(self.__import_batch_with_retries(batch))
+
+        if result.created:
+            search.reset_inverted_index(model=Movie)
+            search.reset_inverted_index(model=Actor)
+            suggest.reset_index()
+            page_cache.reset_catalogue_pages()
+        return result
+
+    def __import_batch_with_retries(self, batch: list[tuple[int, Union[dict, RowError]]]) -> ImportResult:
+        for attempt in range(1, slugs.MAX_ATTEMPTS + 1):
+            batch_result = ImportResult()
+            try:
+                with transaction.atomic():
+                    self.__import_batch(batch, batch_result)
+                return batch_result
+            except IntegrityError as exc:
+                # адрес был занят параллельной транзакцией, партия записывается заново с новыми адресами
+                LOGGER.error(exc)
+                error = exc
+
+        batch_result = ImportResult()
+        for line_number, _ in batch:
+            batch_result.add_error(line_number, error)
+        return batch_result
+
+    def __import_batch(self, batch: list[tuple[int, Union[dict, RowError]]], result: ImportResult) -> None:
+        cleaned_rows = {}
+        for line_number, row in batch:
+            try:
+                if isinstance(row, RowError):
+                    raise row
+                movie_fields, relations = _clean_row(row)
+            except (ValueError, TypeError) as exc:
+                result.add_error(line_number, exc)
+                continue
+
+            key = (movie_fields["title"], movie_fields["year"])
+            if key in cleaned_rows:
+                result.skipped += 1
+                continue
+            cleaned_rows[key] = (movie_fields, relations)
+
+        existing_keys = set(Movie.objects.filter(
+            title__in={title for title, _ in cleaned_rows}
+        ).values_list("title", "year"))
+        rows = [cleaned_row for key, cleaned_row in cleaned_rows.items() if key not in existing_keys]
+        result.skipped += len(cleaned_rows) - len(rows)
+        if not rows:
+            return
+
+        category_ids = _resolve_names(Category, {movie_fields["category"] for movie_fields, _ in rows} - {""})
+        related_ids = {
+            model: _resolve_names(model, {
+                name for _, relations in rows
+                for field_name, related_model in RELATION_FIELDS.items() if related_model is model
+                for name in relations[field_name]
+            })
+            for model in set(RELATION_FIELDS.values())
+        }
+
+        slugs = _get_slugs(Movie, [movie_fields["title"] for movie_fields, _ in rows])
+        movies = Movie.objects.bulk_create([
+            Movie(**{name: value for name, value in movie_fields.items() if name != "category"},
+                  category_id=category_ids.get(movie_fields["category"]), url=slug)
+            for (movie_fields, _), slug in zip(rows, slugs)
+        ])
+
+        for field_name, model in RELATION_FIELDS.items():
+            crud_utils.bulk_add_relations(
+                model=Movie, field_name=field_name,
+                pairs=((movie.pk, related_ids[model][name]) for movie, (_, relations) in zip(movies, rows)
+                       for name in relations[field_name])
+            )
+        if self.enqueue_ratings:
+            repositories.RatingEnrichmentTaskRepository().add(movie.pk for movie in movies)
+        result.created += len(movies)
+
+
+def import_movies(rows: Iterable[Union[dict, RowError]], batch_size: int = BATCH_SIZE,
+                  enqueue_ratings: bool = True) -> ImportResult:
+    return MovieImporter(batch_size=batch_size, enqueue_ratings=enqueue_ratings).run(rows)
+
+
+def _get_relation_names(movie_ids: list[int]) -> dict[str, dict[int, list[str]]]:
+    """Возвращает {поле Many to many: {id фильма: имена}} для партии фильмов, по одному запросу на поле"""
+    relation_names: dict[str, dict[int, list[str]]] = {}
+    for field_name in RELATION_FIELDS:
+        through = Movie._meta.get_field(field_name).remote_field.through
+        related_field_name = Movie._meta.get_field(field_name).m2m_reverse_field_name()
+        names = relation_names[field_name] = {}
+        for movie_id, name in through.objects.filter(movie_id__in=movie_ids).values_list(
+                "movie_id", f"{related_field_name}__name").order_by("pk"):
+            names.setdefault(movie_id, []).append(name)
+    return relation_names
+
+
+def export_movies(chunk_size: int = EXPORT_CHUNK_SIZE) -> Iterator[dict]:
+    """Возвращает все фильмы в формате импорта. Фильмы читаются курсором партиями по chunk_size,
+    связи каждой партии читаются отдельными запросами, поэтому память не зависит от размера каталога"""
+    movies = Movie.objects.order_by("pk").values_list(
+        "pk", *EXPORT_FIELDS[:EXPORT_FIELDS.index("category")], "category__name"
+    ).iterator(chunk_size=chunk_size)
+
+    while chunk := list(itertools.islice(movies, chunk_size)):
+        relation_names = _get_relation_names([movie[0] for movie in chunk])
+        for movie_id, *values in chunk:
+            row = dict(zip(EXPORT_FIELDS, values))
+            row["category"] = row["category"] or ""
+            for field_name, names in relation_names.items():
+                row[field_name] = names.get(movie_id, [])
+            yield row
@@ -10,8 +10,7 @@ from rating_movies import forms
 from rating_movies.models import Actor, Movie, UserProfile, MovieShots
 from rating_movies.services.crud import repositories
 from rating_movies.services.utils import get_client_ip
-from rating_movies.services.crud.delete import reset_cache
-from rating_movies.services.api.movies import movies_api
+from rating_movies.services.api.movies import rating_enrichment
 from rating_movies.services.crud import custom_validators
 
 
@@ -63,11 +62,8 @@ def create_movie(form: forms.MovieForm) -> Union[Movie, bool]:
     if movie_validator.can_be_saved():
         new_movie = repository.create_new_object(obj=form.cleaned_data)
         if new_movie:
-            title = new_movie.title_en or new_movie.title
-            # if attribute "title_en" exists its value will be written to the variable
-            # otherwise will be written value from attribute "title"
-            create_other_sources_rating(title=title, movie=new_movie)
-            # creating new record with movie rating
+            rating_enrichment.enqueue_movies([new_movie.pk])
+            # movie rating from other sources is received by the "enrich_movie_ratings" command
             return new_movie
         form.add_error(None, BASE_ERROR_MESSAGE)
     return False
@@ -127,14 +123,6 @@ def update_or_create_rating(form: forms.RatingForm, request: WSGIRequest) -> boo
     return False
 
 
-def create_other_sources_rating(title: str, movie: Movie) -> None:
-    """Get movie rating from IMDb API and create new record in model "OtherSourcesRating" """
-    rating_repository = repositories.OtherSourcesRatingRepository()
-    movie_rating = movies_api.get_movie_rating(movie_title=title)
-    if movie_rating:
-        rating_repository.create_new_object(obj={"rating": movie_rating, "movie": movie})
-
-
 @receiver(post_save, sender=User)
 def user_creation(sender, instance, created, **kwargs):
     """Create new record in model "UserProfile" right after new user was created"""
@@ -151,7 +139,6 @@ def add_movie_to_user_movie_list(user: User, movie: Movie) -> None:
     """Add new movie to user's watchlist"""
     try:
         user.user_profile.movies.add(movie)
-        reset_cache("user_movie")
     except User.user_profile.RelatedObjectDoesNotExist as exc:
         LOGGER.error(exc)
         create_user_profile(user_instance=user)
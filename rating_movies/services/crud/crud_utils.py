@@ -1,15 +1,22 @@
+import json
+import base64
+import hashlib
 import operator
+import itertools
 import logging
 import datetime
 from random import shuffle
-from typing import Union, Optional
+from dataclasses import dataclass
+from typing import Union, Optional, Iterable
 
 from django.core.cache import cache
-from django.db.models import QuerySet, Count, Prefetch
-from django.core.exceptions import FieldError, FieldDoesNotExist
+from django.db import connection
+from django.db.models import QuerySet, Count, Prefetch, Q, Model
+from django.core.exceptions import FieldError, FieldDoesNotExist, ValidationError
 
 from rating_movies import exceptions
 from rating_movies.models import Genre, Movie
+from rating_movies.services import cache_variables
 from rating_movies.services.crud import specifications
 
 
@@ -79,39 +86,34 @@ class GenreYear:
     @staticmethod
     def get_genres() -> list[Genre]:
         """Return several random chosen genres"""
-        genres = cache.get("genres")  # try to fetch genres from cache
-        if not genres:
-            genres = Genre.objects.prefetch_related(
-                Prefetch(
-                    "movie_genre",
-                    Movie.objects.filter(draft=False).only("pk"),
-                    "movies",
-                )
-            ).annotate(total=Count("movie_genre")).filter(total__gt=0)
-            # Transforming QuerySet to list, shuffling it and take first seven items
-            genres = list(genres)
-            shuffle(genres)
-            genres = genres[:7]
-
-            cache.set("genres", genres, 60)
-
-        return genres
+        return cache.get_or_set(cache_variables.CACHE_FOR_GENRES, GenreYear._choose_genres, 60)
 
     @staticmethod
     def get_years() -> list[dict]:
         """Return several random chosen years"""
-        years = cache.get("years")  # try to fetch years from cache
-        if not years:
-            years = Movie.objects.filter(draft=False).values("year").distinct().order_by("year")
-            # Transforming QuerySet to list, shuffling it and take first seven items, then sorting by ascending
-            years = list(years)
-            shuffle(years)
-            years = years[:7]
-            years = sorted(years, key=operator.itemgetter("year"))
+        return cache.get_or_set(cache_variables.CACHE_FOR_YEARS, GenreYear._choose_years, 60)
 
-            cache.set("years", years, 60)
+    @staticmethod
+    def _choose_genres() -> list[Genre]:
+        genres = Genre.objects.prefetch_related(
+            Prefetch(
+                "movie_genre",
+                Movie.objects.filter(draft=False).only("pk"),
+                "movies",
+            )
+        ).annotate(total=Count("movie_genre")).filter(total__gt=0)
+        # Transforming QuerySet to list, shuffling it and take first seven items
+        genres = list(genres)
+        shuffle(genres)
+        return genres[:7]
 
-        return years
+    @staticmethod
+    def _choose_years() -> list[dict]:
+        years = Movie.objects.filter(draft=False).values("year").distinct().order_by("year")
+        # Transforming QuerySet to list, shuffling it and take first seven items, then sorting by ascending
+        years = list(years)
+        shuffle(years)
+        return sorted(years[:7], key=operator.itemgetter("year"))
 
 
 def calculate_age(birth_date: datetime.date, death_date: datetime.date = None) -> int:
@@ -123,3 +125,106 @@ def calculate_age(birth_date: datetime.date, death_date: datetime.date = None) -
 
     years = int(time_delta.days / 365)
     return years
+
+
+@dataclass
+class KeysetPage:
+    objects: list
+    next_cursor: Optional[str]
+    previous_cursor: Optional[str]
+
+
+def encode_cursor(values: tuple, reverse: bool = False) -> str:
+    return base64.urlsafe_b64encode(json.dumps([*map(str, values), reverse]).encode()).decode()
+
+
+def decode_cursor(cursor: str, queryset: QuerySet, fields: tuple[str, str]) -> Optional[tuple[tuple, bool]]:
+    """Return (values of fields, reverse) or None if the cursor is invalid"""
+    try:
+        *values, reverse = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        if len(values) != len(fields):
+            raise ValueError(f"Cursor must contain {len(fields)} values")
+        values = tuple(queryset.model._meta.get_field(field).to_python(value) for field, value in zip(fields, values))
+    except (ValueError, TypeError, FieldDoesNotExist, ValidationError) as exc:
+        LOGGER.error(exc)
+        return None
+    return values, bool(reverse)
+
+
+def paginate_by_keyset(queryset: QuerySet, cursor: Optional[str], page_size: int,
+                       fields: tuple[str, str] = ("world_premiere", "id")) -> KeysetPage:
+    """Return page of objects ordered by fields descending. Instead of OFFSET the page starts after
+    the values of the last object of the previous page, so any page is read by an index in the same time.
+    The second field must be unique"""
+    first, second = fields
+    position = decode_cursor(cursor, queryset, fields) if cursor else None
+    reverse = position is not None and position[1]
+
+    if position is None:
+        queryset = queryset.order_by(f"-{first}", f"-{second}")
+    elif not reverse:
+        (first_value, second_value), _ = position
+        queryset = queryset.filter(
+            Q(**{f"{first}__lt": first_value}) | Q(**{first: first_value, f"{second}__lt": second_value})
+        ).order_by(f"-{first}", f"-{second}")
+    else:
+        (first_value, second_value), _ = position
+        queryset = queryset.filter(
+            Q(**{f"{first}__gt": first_value}) | Q(**{first: first_value, f"{second}__gt": second_value})
+        ).order_by(first, second)
+
+    objects = list(queryset[:page_size + 1])
+    has_more = len(objects) > page_size
+    objects = objects[:page_size]
+    if reverse:
+        objects.reverse()
+
+    has_next = not reverse and has_more or reverse
+    has_previous = reverse and has_more or not reverse and position is not None
+    values = [(getattr(obj, first), getattr(obj, second)) for obj in objects]
+    return KeysetPage(
+        objects=objects,
+        next_cursor=encode_cursor(values[-1]) if has_next and values else None,
+        previous_cursor=encode_cursor(values[0], reverse=True) if has_previous and values else None,
+    )
+
+
+def get_approximate_count(queryset: QuerySet, timeout: int = 60 * 5) -> int:
+    """Return number of objects without counting them on every request. PostgreSQL planner estimate is used
+    if it's available, otherwise the exact number is cached"""
+    queryset = queryset.order_by().values("pk")
+    sql, params = queryset.query.sql_with_params()
+
+    if connection.vendor == "postgresql":
+        with connection.cursor() as cursor:
+            cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+            plan = cursor.fetchone()[0]
+        return int(plan[0]["Plan"]["Plan Rows"])
+
+    key = cache_variables.CACHE_FOR_COUNT % hashlib.md5(f"{sql}{params}".encode()).hexdigest()
+    return cache.get_or_set(key, queryset.count, timeout)
+
+
+def bulk_add_relations(model: type[Model], field_name: str, pairs: Iterable[tuple[int, int]],
+                       batch_size: int = 1000) -> None:
+    """Insert pairs (object id, related object id) into the through table of the many to many field
+    with one multi-row INSERT per batch, model instances of the through table aren't created.
+    Existing pairs are skipped. Signal m2m_changed isn't sent"""
+    field = model._meta.get_field(field_name)
+    through = field.remote_field.through
+    columns = (field.m2m_column_name(), field.m2m_reverse_name())
+    batch_size = max(min(batch_size, connection.ops.bulk_batch_size(columns, range(batch_size))), 1)
+
+    quote_name = connection.ops.quote_name
+    insert_sql = (f"{connection.ops.insert_statement(ignore_conflicts=True)} {quote_name(through._meta.db_table)} "
+                  f"({', '.join(map(quote_name, columns))}) VALUES ")
+    suffix_sql = connection.ops.ignore_conflicts_suffix_sql(ignore_conflicts=True)
+
+    pairs = iter(pairs)
+    with connection.cursor() as cursor:
+        while batch := list(itertools.islice(pairs, batch_size)):
+            cursor.execute(
+                f"{insert_sql}{', '.join(['(%s, %s)'] * len(batch))} {suffix_sql}",
+                [value for pair in batch for value in pair]
+            )
+
@@ -31,16 +31,3 @@ def base_movie_ordering(func: callable) -> callable:
 
         return query_set
     return base_movie_ordering_wrapper
-
-
-def base_actor_director_ordering(func: callable) -> callable:
-    """Set base ordering for "Actor" model queries"""
-    def base_actor_director_ordering_wrapper(*args, **kwargs) -> Optional[QuerySet]:
-        try:
-            query_set = func(*args, **kwargs).order_by("name")
-        except AttributeError as attr_exc:
-            LOGGER.error(attr_exc)
-            query_set = None
-
-        return query_set
-    return base_actor_director_ordering_wrapper
@@ -1,22 +1,25 @@
 import logging
+from datetime import date
 from typing import Optional, Union
-from random import choice, shuffle
 
 from django import forms
 from django.core.cache import cache
 from django.core.handlers.wsgi import WSGIRequest
 from django.contrib.auth.models import User
-from django.db.models import F, QuerySet, Prefetch, ObjectDoesNotExist, Sum, Count, Q
+from django.db.models import F, QuerySet, Prefetch, ObjectDoesNotExist, Exists, OuterRef, Subquery, Count, Value
+from django.db.models.functions import Coalesce
 
 from rating_movies import models
-from rating_movies.services.crud import repositories, specifications
+from rating_movies.services import cache_variables, suggest, user_cache, random_movies
+from rating_movies.services.crud import repositories, specifications, crud_utils
 from rating_movies.services.crud.decorators import base_movie_filter
-from rating_movies.services.utils import get_client_ip, convert_years_for_random_movies,\
-    convert_country_for_random_movies
+from rating_movies.services.utils import get_client_ip, convert_years_for_random_movies
 
 
 LOGGER = logging.getLogger("json_main_logger")
 
+RANDOM_SORTING_PAGE_SIZE = 6
+
 
 def get_all_categories_ordered_by_parameter(parameter: str) -> QuerySet[models.Category]:
     """Return all categories ordered by given parameter"""
@@ -34,6 +37,12 @@ def get_all_movies_ordered_by_parameter(parameter: str) -> QuerySet[models.Movie
     )
 
 
+def get_movies_page(cursor: Optional[str], page_size: int) -> crud_utils.KeysetPage:
+    """Return page of active movies sorted by world premiere which starts after the given cursor"""
+    movies = get_all_movies_ordered_by_parameter("-world_premiere")
+    return crud_utils.paginate_by_keyset(movies, cursor=cursor, page_size=page_size)
+
+
 def get_non_empty_categories() -> QuerySet[models.Category]:
     """Возвращает все категории, на которые ссылается хотя бы одна запись из таблицы Movie"""
     repository = repositories.CategoryRepository()
@@ -47,6 +56,50 @@ def get_movie_by_parameters(**kwargs) -> models.Movie:
     )
 
 
+def get_movie_for_detail_page(slug: str, request: WSGIRequest) -> Optional[models.Movie]:
+    """Return movie with everything which is shown on its page. The number of queries doesn't depend
+    on the number of actors, shots or reviews: one query for the movie with annotations and one for each prefetch.
+    Annotations: user_rating, average_rating, reviews_number, is_in_watchlist.
+    Prefetched lists: other_sources_ratings, parent_reviews (with child_reviews)"""
+    user_rating = models.Rating.objects.filter(
+        movie_id=OuterRef("pk"), ip=get_client_ip(request=request)
+    ).values("star__value")[:1]
+    reviews_number = models.Review.objects.filter(
+        movie_id=OuterRef("pk")
+    ).order_by().values("movie_id").annotate(total=Count("pk")).values("total")
+
+    if request.user.is_authenticated:
+        is_in_watchlist = Exists(
+            models.UserProfileMovie.objects.filter(movie_id=OuterRef("pk"), user_profile__user_id=request.user.pk)
+        )
+    else:
+        is_in_watchlist = Value(False)
+
+    movie = models.Movie.objects.filter(url=slug).select_related("category").prefetch_related(
+        "directors",
+        "actors",
+        "genres",
+        "movieshots_set",
+        Prefetch("movie_rating", to_attr="other_sources_ratings"),
+        Prefetch(
+            "review_set",
+            models.Review.objects.filter(parent_id__isnull=True).prefetch_related(
+                Prefetch("review_parent", to_attr="child_reviews")
+            ),
+            "parent_reviews"
+        ),
+    ).annotate(
+        user_rating=Subquery(user_rating),
+        average_rating=F("rating_stats__average"),
+        reviews_number=Coalesce(Subquery(reviews_number), 0),
+        is_in_watchlist=is_in_watchlist,
+    ).first()
+
+    if movie is not None and movie.average_rating is not None:
+        movie.average_rating = round(movie.average_rating, 1)
+    return movie
+
+
 def get_all_actors_directors_ordered_by_parameter(parameter: str) -> QuerySet[models.Actor]:
     """Return all actors and directors ordered by given parameter"""
     repository = repositories.ActorDirectorRepository()
@@ -84,16 +137,14 @@ def get_related_objects_to_category(category_url: str) -> QuerySet[models.Movie]
     return models.Movie.objects.filter(category__url=category_url, draft=False)
 
 
-def get_most_recently_added_movies(number: int = 5) -> QuerySet[models.Movie]:
+def get_most_recently_added_movies(number: int = 5) -> list[models.Movie]:
     """Возвращает пять последних добавленных фильмов"""
     repository = repositories.MovieRepository()
-    movies = cache.get("most_recently_added_movies")
-
-    if not movies:
-        movies = repository.get_most_recently_added_objects(number)
-        cache.set("most_recently_added_movies", movies, 60)
-
-    return movies
+    return cache.get_or_set(
+        cache_variables.CACHE_FOR_NEW_MOVIES,
+        lambda: list(repository.get_most_recently_added_objects(number)),
+        60
+    )
 
 
 def get_filtered_movies(years: list, genres: list) -> QuerySet[dict]:
@@ -113,7 +164,7 @@ def get_sorted_movies(sorting_order="descending", **kwargs) -> Union[QuerySet[di
     if sorting == "1":
         return get_movies_sorted_by_rating(sorting_order)
     elif sorting == "4":
-        return get_movies_sorted_by_random()
+        return get_movies_sorted_by_random(seed=kwargs.get("seed", 0), page=kwargs.get("page"))
 
     pattern_sorting = {
         "2": "world_premiere" if sorting_order == "ascending" else "-world_premiere",
@@ -125,10 +176,16 @@ def get_sorted_movies(sorting_order="descending", **kwargs) -> Union[QuerySet[di
     return repository.get_sorted_objects_by_parameter(sorting_parameter)
 
 
-def get_movies_sorted_by_random() -> list[dict]:
-    movies = list(models.Movie.objects.filter(draft=False).values("url", "title", "poster", "tagline"))
-    shuffle(movies)
-    return movies
+def get_movies_sorted_by_random(seed: int, page: Optional[int] = None,
+                                page_size: int = RANDOM_SORTING_PAGE_SIZE) -> list[dict]:
+    """Возвращает фильмы в случайном порядке, заданном seed: все или одну страницу.
+    Страницы с одним seed не повторяют фильмы, поэтому при подгрузке страниц порядок не меняется"""
+    start, stop = (0, None) if page is None else ((page - 1) * page_size, page * page_size)
+    movie_pks = random_movies.get_shuffled_movie_pks(seed=seed, start=start, stop=stop)
+    movies = {movie.pop("pk"): movie for movie in models.Movie.objects.filter(pk__in=movie_pks).values(
+        "pk", "url", "title", "poster", "tagline"
+    )}
+    return [movies[pk] for pk in movie_pks if pk in movies]
 
 
 def get_movies_sorted_by_rating(sorting_order) -> QuerySet[dict]:
@@ -149,19 +206,6 @@ def get_all_rating_stars() -> QuerySet[models.RatingStar]:
     return repository.get_all_objects()
 
 
-def get_movie_rating(request: WSGIRequest, movie_id: int) -> Optional[int]:
-    """Возвращает рейтинг, который установил пользователь для данного фильма"""
-    repository = repositories.RatingRepository()
-    user_ip = get_client_ip(request=request)
-    return repository.get_rating(ip=user_ip, movie_id=movie_id)
-
-
-def fetch_average_movie_rating(movie_id: int) -> Optional[float]:
-    """Возвращает средний рейтинг для переданного фильма"""
-    repository = repositories.RatingRepository()
-    return repository.fetch_average_movie_rating(movie_id=movie_id)
-
-
 def fetch_sought_elements(search_element: str, parameter: str) -> Union[QuerySet[models.Movie], QuerySet[models.Actor]]:
     search_elements = {
         "movies": search_movies,
@@ -173,21 +217,24 @@ def fetch_sought_elements(search_element: str, parameter: str) -> Union[QuerySet
 def search_actors_directors(parameter: str) -> QuerySet[models.Actor]:
     """Return actor/director list by given parameter"""
     repository = repositories.ActorDirectorRepository()
-    actors_directors = repository.search_objects_by_name(name=parameter)
-    if not actors_directors:
-        actors_directors = repository.search_objects_by_description(description=parameter)
-
-    return actors_directors
+    return repository.search_objects(query=parameter)
 
 
 def search_movies(parameter: str) -> QuerySet[models.Movie]:
     """Return movie list by given parameter"""
     repository = repositories.MovieRepository()
-    movies = repository.search_objects_by_title(title=parameter)
-    if not movies:
-        movies = repository.search_objects_by_description(description=parameter)
+    return repository.search_objects(query=parameter)
+
+
+def get_suggestions(query: str, number: int = 10) -> list[suggest.Suggestion]:
+    """Return movies and actors/directors whose titles/names are similar to the query (typos are allowed)"""
+    return suggest.get_index().search(query=query, number=number)
 
-    return movies
+
+def get_currency_rate_series(char_code: str, start: date, end: date) -> dict:
+    """Return archived rates of the currency between dates with their min, max and mean"""
+    repository = repositories.CurrencyRateRepository()
+    return repository.get_rate_series(char_code=char_code, start=start, end=end)
 
 
 def get_unique_countries() -> list[tuple[str, str]]:
@@ -198,51 +245,27 @@ def get_unique_countries() -> list[tuple[str, str]]:
     )]
 
 
-def get_random_movies_from_form(form: forms.Form) -> Union[bool, QuerySet]:
+def get_random_movies_from_form(form: forms.Form) -> Union[bool, list[models.Movie]]:
     """Возвращает список псевдослучайных фильмов на основе переданных через форму данных"""
     if not form.is_valid():
         return False
 
     movies_number = form.cleaned_data.get("movies_number")  # количество фильмов всегда будет больше нуля
     genres = form.cleaned_data.get("genres")
-    countries = convert_country_for_random_movies(form.cleaned_data.get("countries"))
     years = convert_years_for_random_movies(form.cleaned_data.get("years"))
 
-    if not countries:
-        countries = models.Movie.objects.values("country").distinct()
-
-    if not genres:
-        genres = models.Genre.objects.all().distinct()
-
-    if not years:
-        years = list(models.Movie.objects.values_list("year").distinct().order_by("year"))
-        years = [years[0][0], years[-1][0]]  # список, содержащий минимальный и максимальный годы выхода фильмов
-
-    filtered_movies_pk = models.Movie.objects.filter(
-        genres__in=genres, country__in=countries, year__range=years, draft=False
-    ).values("pk").distinct().order_by("pk")
-
-    random_movies = get_random_movies(movies_pk=list(filtered_movies_pk), movies_number=movies_number)
-    return random_movies
-
-
-def get_random_movies(movies_pk: list[dict] = None, movies_number: int = 3) -> QuerySet:
-    """Возвращает список псевдослучайных фильмов"""
-    random_pk_list = []
-
-    if not movies_pk:
-        repository = repositories.MovieRepository()
-        movies_pk = list(repository.get_all_available_pk())
+    movie_filter = random_movies.MovieFilter(
+        genres=tuple(genre.pk for genre in genres) if genres else (),
+        countries=tuple(form.cleaned_data.get("countries") or ()),
+        years=(int(years[0]), int(years[1])) if years else None,
+    )
+    return get_random_movies(movies_number=movies_number, movie_filter=movie_filter)
 
-    for _ in range(movies_number):
-        if not movies_pk:
-            break
-        chosen_pk = choice(movies_pk)
-        random_pk_list.append(chosen_pk.get("pk"))
-        movies_pk.remove(chosen_pk)
 
-    random_movies = models.Movie.objects.filter(pk__in=random_pk_list)
-    return random_movies
+def get_random_movies(movies_number: int = 3,
+                      movie_filter: random_movies.MovieFilter = random_movies.MovieFilter()) -> list[models.Movie]:
+    """Возвращает список псевдослучайных фильмов без повторов"""
+    return random_movies.get_random_movies(number=movies_number, movie_filter=movie_filter)
 
 
 def get_count_movies():
@@ -268,34 +291,14 @@ def get_genre_movies(genre_slug: str) -> list[models.Movie]:
     return movies
 
 
-def get_other_sources_rating(movie: models.Movie) -> Optional[dict]:
-    """Get movie rating from model "OtherSourcesRating" and return it as dict"""
-    repository = repositories.OtherSourcesRatingRepository()
-    rating_object: models.OtherSourcesRating = repository.get_object_by_parameter(
-        specification=specifications.ObjectByParameterSpecification(movie=movie)
-    )
-    if rating_object:
-        return rating_object.rating
-    return None
-
-
-def get_movie_reviews(movie: models.Movie) -> QuerySet[models.Review]:
-    """Get movie object and return all reviews which are related to this movie"""
-    reviews = models.Review.objects.prefetch_related(
-        Prefetch(
-            "review_parent",
-            models.Review.objects.filter(movie_id=movie.pk, parent_id__isnull=False),
-            "child_reviews"
-        )
-    ).filter(movie_id=movie.pk, parent_id__isnull=True)
-
-    return reviews
-
-
-def get_all_user_movies(user: User) -> QuerySet[models.Movie]:
+def get_all_user_movies(user: User) -> list[models.Movie]:
     """Return all movies that were added by user earlier"""
     try:
-        user_movies = user.user_profile.movies.order_by("-world_premiere")
+        user_movies = user_cache.get_or_set(
+            user.pk,
+            cache_variables.CACHE_FOR_USER_MOVIES,
+            lambda: list(user.user_profile.movies.order_by("-world_premiere"))
+        )
 
     except User.user_profile.RelatedObjectDoesNotExist as exc:
         from rating_movies.services.crud.create import create_user_profile
@@ -308,22 +311,19 @@ def get_all_user_movies(user: User) -> QuerySet[models.Movie]:
 
 def get_most_recently_added_user_movies(user: User, number: int = 5) -> list:
     """Return last movies added by user. Amount of items is given as a parameter in the definition of the function"""
-    movies = cache.get("last_added_user_movies")
-
-    if not movies:
-        movies = []
-        try:
-            user_profile_items = user.user_profile.user_profile_movie. \
+    try:
+        movies = user_cache.get_or_set(
+            user.pk,
+            cache_variables.CACHE_FOR_USER_ADDED_MOVIES,
+            lambda: [
+                item.movie for item in user.user_profile.user_profile_movie.
                 select_related("movie").order_by("-added")[:number]
+            ]
+        )
 
-            for item in user_profile_items:
-                movies.append(item.movie)
-
-        except User.user_profile.RelatedObjectDoesNotExist as exc:
-            LOGGER.error(exc)
-
-        else:
-            cache.set("last_added_user_movies", movies, 60)
+    except User.user_profile.RelatedObjectDoesNotExist as exc:
+        LOGGER.error(exc)
+        movies = []
 
     return movies
 
@@ -334,7 +334,12 @@ def is_movie_in_user_watchlist(movie: models.Movie, user: User) -> bool:
         return False
 
     try:
-        is_movie = user.user_profile.movies.all().contains(movie)
+        watchlist = user_cache.get_or_set(
+            user.pk,
+            cache_variables.CACHE_FOR_USER_WATCHLIST,
+            lambda: set(user.user_profile.movies.values_list("pk", flat=True))
+        )
+        is_movie = movie.pk in watchlist
 
     except (User.user_profile.RelatedObjectDoesNotExist, AttributeError) as exc:
         from rating_movies.services.crud.create import create_user_profile
@@ -348,7 +353,7 @@ def is_movie_in_user_watchlist(movie: models.Movie, user: User) -> bool:
 def get_movie_set_by_pk_annotated_by_rating(pk: int) -> QuerySet[models.Movie]:
     """Return movie using 'pk' which annotated by average rating and related reviews with parent field"""
     movies = models.Movie.objects.filter(pk=pk).annotate(
-        average_rating=Sum(F("rating__star__value")) / Count(F("rating"))
+        average_rating=F("rating_stats__average")
     ).prefetch_related(
         Prefetch(
             "review_set",
@@ -361,12 +366,13 @@ def get_movie_set_by_pk_annotated_by_rating(pk: int) -> QuerySet[models.Movie]:
 
 @base_movie_filter
 def get_all_movies_annotated_by_rating(request) -> QuerySet[models.Movie]:
-    """Return all active movies annotated by average rating
+    """Return all active movies annotated by average rating (precomputed in "MovieRatingStats")
     and user rating (is current user set a rating for this movie), ordered by 'id'"""
     movies = models.Movie.objects.order_by("id").annotate(
-        user_rating=Count("rating", filter=Q(rating__ip=get_client_ip(request)))
-    ).annotate(
-        average_rating=Sum(F("rating__star__value")) / Count(F("rating"))
+        user_rating=Exists(
+            models.Rating.objects.filter(movie_id=OuterRef("pk"), ip=get_client_ip(request))
+        ),
+        average_rating=F("rating_stats__average")
     ).select_related("category")
     return movies
 
@@ -1,15 +1,20 @@
 import logging
-from typing import Union, Optional
+import datetime
+from decimal import Decimal
+from collections import defaultdict
+from typing import Union, Optional, Iterable
 
-import psycopg2
-from django.db.models import Q, QuerySet, Count
+from django.db import transaction
+from django.db.models import Q, F, QuerySet, Count, Min, Max, Avg, FloatField, ExpressionWrapper
+from django.db.models.functions import Cast
+from django.utils import timezone
 
-from site_engine.settings import environ
 from rating_movies.models import Category, Actor, Genre, Movie, MovieShots,\
-    RatingStar, Rating, OtherSourcesRating, Review
-from rating_movies.services.crud import specifications
+    RatingStar, Rating, OtherSourcesRating, Review, MovieRatingStats, CurrencyRate, RatingEnrichmentTask
+from rating_movies.services import search, page_cache
+from rating_movies.services.crud import specifications, crud_utils
 from rating_movies.services.crud.crud_utils import BaseObject
-from rating_movies.services.crud.decorators import base_movie_filter, base_movie_ordering, base_actor_director_ordering
+from rating_movies.services.crud.decorators import base_movie_filter, base_movie_ordering
 
 
 LOGGER = logging.getLogger("json_main_logger")
@@ -31,15 +36,18 @@ class CategoryRepository(BaseObject):
 class ActorDirectorRepository(BaseObject):
     model = Actor
 
-    @base_actor_director_ordering
-    def search_objects_by_name(self, name: str) -> QuerySet[Actor]:
-        """Search all actors/directors by given name"""
-        return self.model.objects.filter(name__icontains=name)
+    def search_objects(self, query: str) -> QuerySet[Actor]:
+        """Search all actors/directors by name and description, the most relevant first.
+        If the query is empty return all actors/directors"""
+        actors_directors = search.search_objects(model=self.model, query=query)
+        if actors_directors is None:
+            actors_directors = self.model.objects.order_by("name")
+        return actors_directors
 
-    @base_actor_director_ordering
-    def search_objects_by_description(self, description: str) -> QuerySet[Actor]:
-        """Search all actors/directors by given description"""
-        return self.model.objects.filter(description__icontains=description)
+    def update_age(self, pk: int, age: int) -> None:
+        """Сохраняет только возраст: запрос UPDATE не отправляет сигналы, кэш каталога и поисковый индекс
+        не сбрасываются"""
+        self.model.objects.filter(pk=pk).update(age=age)
 
 
 class GenreRepository(BaseObject):
@@ -59,23 +67,17 @@ class MovieRepository(BaseObject):
     def create_new_object(self, obj: dict) -> Union[bool, Movie]:
         try:
             # удаляем из словаря поля типа Many to many
-            directors = obj.pop("directors")
-            actors = obj.pop("actors")
-            genres = obj.pop("genres")
-
-            new_movie = self.model.objects.create(**obj)
-
-            # отдельно добавляем поля Many to many
-            for director in directors:
-                new_movie.directors.add(director)
-
-            for actor in actors:
-                new_movie.actors.add(actor)
-
-            for genre in genres:
-                new_movie.genres.add(genre)
-
-            new_movie.save()
+            relations = {field_name: obj.pop(field_name) for field_name in ("directors", "actors", "genres")}
+
+            with transaction.atomic():
+                new_movie = self.model.objects.create(**obj)
+                # все связи одного поля Many to many добавляются одним запросом
+                for field_name, related_objects in relations.items():
+                    crud_utils.bulk_add_relations(
+                        model=self.model, field_name=field_name,
+                        pairs=((new_movie.pk, related_object.pk) for related_object in related_objects)
+                    )
+                transaction.on_commit(page_cache.reset_catalogue_pages)
             return new_movie
 
         except Exception as exc:
@@ -112,21 +114,14 @@ class MovieRepository(BaseObject):
         )
         return query.values("url", "title", "poster", "tagline")
 
-    @base_movie_ordering
     @base_movie_filter
-    def search_objects_by_title(self, title: str) -> QuerySet[Movie]:
-        """Search all active movies by given title"""
-        return self.model.objects.filter(title__icontains=title)
-
-    @base_movie_ordering
-    @base_movie_filter
-    def search_objects_by_description(self, description: str) -> QuerySet[Movie]:
-        """Search all active movies by given description"""
-        return self.model.objects.filter(description__icontains=description)
-
-    @base_movie_filter
-    def get_all_available_pk(self) -> QuerySet[dict[str: int]]:
-        return self.model.objects.values("pk")
+    def search_objects(self, query: str) -> QuerySet[Movie]:
+        """Search all active movies by title and description, the most relevant first.
+        If the query is empty return all active movies"""
+        movies = search.search_objects(model=self.model, query=query)
+        if movies is None:
+            movies = self.model.objects.order_by("-world_premiere")
+        return movies
 
     def get_unique_params_dicts(self,
                                 specification: specifications.UniqueValuesSpecification) -> QuerySet[dict[str: str]]:
@@ -147,16 +142,6 @@ class RatingStarRepository(BaseObject):
 class RatingRepository(BaseObject):
     model = Rating
 
-    def get_rating(self, ip: int, movie_id: int) -> Optional[int]:
-        """Возвращает рейтинг конкретного фильма для переданного ip адреса"""
-        try:
-            obj: Rating = self.model.objects.get(ip=ip, movie_id=movie_id)
-            star = obj.star.value
-        except self.model.DoesNotExist as exc:
-            print(exc)
-            star = None
-        return star
-
     def update_or_create_rating(self, ip, movie_id, star_id) -> bool:
         """Создаёт новую запись в таблице Rating или обновляет уже имеющуюся"""
         try:
@@ -178,42 +163,136 @@ class RatingRepository(BaseObject):
 
         return rating_set
 
-    @staticmethod
-    def fetch_average_movie_rating(movie_id: int) -> Optional[float]:
-        """Возвращает средний рейтинг переданного фильма"""
-        connection = None
 
-        try:
-            connection = psycopg2.connect(
-                host=environ["DATABASE_HOST"],
-                port=environ["DATABASE_PORT"],
-                user=environ["DATABASE_USER"],
-                password=environ["DATABASE_PASSWORD"],
-                database=environ["DATABASE_NAME"]
+class MovieRatingStatsRepository(BaseObject):
+    model = MovieRatingStats
+
+    @staticmethod
+    def _form_stats(histogram: dict[str, int]) -> dict:
+        """Return count, sum, average and histogram fields calculated from histogram {star value: votes}"""
+        count = sum(histogram.values())
+        total = sum(int(value) * votes for value, votes in histogram.items())
+        return {
+            "count": count,
+            "total": total,
+            "average": total / count if count else None,
+            "histogram": histogram,
+        }
+
+    def refresh_stats(self, movie_id: int, create: bool = True) -> None:
+        """Recalculate rating stats of one movie using its ratings only.
+        If 'create' is False an absent stats record is not created (e.g. while the movie itself is being deleted)"""
+        histogram = {
+            str(row["star__value"]): row["votes"]
+            for row in Rating.objects.filter(movie_id=movie_id).values("star__value").annotate(
+                votes=Count("id")
+            ).order_by()
+        }
+        stats = self._form_stats(histogram)
+
+        if create:
+            self.model.objects.update_or_create(movie_id=movie_id, defaults=stats)
+        else:
+            self.model.objects.filter(movie_id=movie_id).update(**stats)
+
+    def rebuild_all_stats(self, batch_size: int = 1000) -> int:
+        """Rebuild rating stats of all movies with one grouped query and bulk insert. Return number of records"""
+        histograms: defaultdict[int, dict[str, int]] = defaultdict(dict)
+        for row in Rating.objects.values("movie_id", "star__value").annotate(votes=Count("id")).order_by():
+            histograms[row["movie_id"]][str(row["star__value"])] = row["votes"]
+
+        with transaction.atomic():
+            self.model.objects.all().delete()
+            self.model.objects.bulk_create(
+                (self.model(movie_id=movie_id, **self._form_stats(histogram))
+                 for movie_id, histogram in histograms.items()),
+                batch_size=batch_size
             )
-            with connection.cursor() as cursor:
-                print("[INFO] Connection with PostgreSQL was opened")
-
-                sql_query = """SELECT ROUND(AVG(rs.value), 1)
-                FROM "RatingStar" rs
-                INNER JOIN "Rating" r ON r.star_id = rs.id
-                WHERE r.movie_id = %s;""" % movie_id
-                cursor.execute(sql_query)
-                record: tuple = cursor.fetchone()
-                return record[0]
-
-        except psycopg2.OperationalError as connection_exception:
-            message = f"[INFO] Error while working with PostgreSQL. {connection_exception}"
-            LOGGER.error(message)
-        finally:
-            if connection:
-                connection.close()
-                print("[INFO] Connection with PostgreSQL was closed")
+        return len(histograms)
 
 
 class OtherSourcesRatingRepository(BaseObject):
     model = OtherSourcesRating
 
+    def save_ratings(self, ratings: dict[int, dict], batch_size: int = 500) -> None:
+        """Save ratings {movie id: rating} with one bulk UPDATE of existing records and one bulk INSERT of new ones.
+        Signals aren't sent, cached movie pages have to be reset by the caller"""
+        now = timezone.now()
+        existing_ratings = self.model.objects.filter(movie_id__in=ratings).order_by("movie_id", "id")
+        updated_ratings = {}
+        for rating_object in existing_ratings:
+            if rating_object.movie_id not in updated_ratings:
+                rating_object.rating = ratings[rating_object.movie_id]
+                rating_object.refreshed_at = now
+                updated_ratings[rating_object.movie_id] = rating_object
+
+        with transaction.atomic():
+            self.model.objects.bulk_update(updated_ratings.values(), ["rating", "refreshed_at"], batch_size=batch_size)
+            self.model.objects.bulk_create(
+                (self.model(movie_id=movie_id, rating=rating, refreshed_at=now)
+                 for movie_id, rating in ratings.items() if movie_id not in updated_ratings),
+                batch_size=batch_size
+            )
+
+    def get_stale_movie_ids(self, refreshed_before: datetime.datetime) -> QuerySet:
+        """Return ids of movies which rating was refreshed before the given time or the time is unknown"""
+        return self.model.objects.filter(
+            Q(refreshed_at__lt=refreshed_before) | Q(refreshed_at__isnull=True)
+        ).values_list("movie_id", flat=True).distinct()
+
+
+class RatingEnrichmentTaskRepository(BaseObject):
+    model = RatingEnrichmentTask
+
+    def enqueue(self, movie_ids: Iterable[int]) -> int:
+        """Add movies without rating from other sources to the queue. Movies which are already queued are skipped.
+        Return number of movies without rating"""
+        movie_ids = list(
+            Movie.objects.filter(pk__in=list(movie_ids), movie_rating__isnull=True).values_list("pk", flat=True)
+        )
+        self.add(movie_ids)
+        return len(movie_ids)
+
+    def add(self, movie_ids: Iterable[int], batch_size: int = 1000) -> None:
+        """Add movies to the queue regardless of their rating, movies which are already queued are skipped"""
+        self.model.objects.bulk_create(
+            (self.model(movie_id=movie_id) for movie_id in movie_ids), batch_size=batch_size, ignore_conflicts=True
+        )
+
+    def claim(self, batch_size: int, lease: datetime.timedelta, max_attempts: int) -> list[RatingEnrichmentTask]:
+        """Take tasks which are available now and hide them from other workers for 'lease' time.
+        A task which wasn't completed or retried in time (e.g. the worker was killed) becomes available again.
+        Expired tasks without attempts left are deleted, so the movie can be queued again"""
+        now = timezone.now()
+        with transaction.atomic():
+            self.model.objects.filter(available_at__lte=now, attempts__gte=max_attempts).delete()
+            tasks = list(
+                self.model.objects.select_related("movie").select_for_update(skip_locked=True, of=("self", )).filter(
+                    available_at__lte=now, attempts__lt=max_attempts
+                ).order_by("available_at")[:batch_size]
+            )
+            self.model.objects.filter(pk__in=[task.pk for task in tasks]).update(
+                available_at=now + lease, attempts=F("attempts") + 1
+            )
+
+        for task in tasks:
+            task.attempts += 1
+        return tasks
+
+    def complete(self, tasks: Iterable[RatingEnrichmentTask]) -> None:
+        self.model.objects.filter(pk__in=[task.pk for task in tasks]).delete()
+
+    def retry(self, tasks: Iterable[RatingEnrichmentTask], base_delay: datetime.timedelta, max_attempts: int) -> None:
+        """Postpone tasks, the delay is doubled after each attempt. Tasks after the last attempt are deleted,
+        the movie is queued again by the next pass of stale ratings or by enqueue"""
+        now = timezone.now()
+        tasks = list(tasks)
+        self.complete(task for task in tasks if task.attempts >= max_attempts)
+        tasks = [task for task in tasks if task.attempts < max_attempts]
+        for task in tasks:
+            task.available_at = now + base_delay * 2 ** (task.attempts - 1)
+        self.model.objects.bulk_update(tasks, ["available_at"])
+
 
 class ReviewRepository(BaseObject):
     model = Review
@@ -227,3 +306,52 @@ class ReviewRepository(BaseObject):
             review_set = None
 
         return review_set
+
+
+class CurrencyRateRepository(BaseObject):
+    model = CurrencyRate
+
+    def get_rates_for_date(self, date: datetime.date) -> list[dict]:
+        """Return archived rates for the date in the same form as CBR API returns them, empty list if absent"""
+        return [
+            {
+                "NumCode": rate.num_code,
+                "CharCode": rate.char_code,
+                "Nominal": rate.nominal,
+                "Name": rate.name,
+                "Value": float(rate.value),
+                "Previous": float(rate.previous),
+            }
+            for rate in self.model.objects.filter(date=date).order_by("num_code")
+        ]
+
+    def archive_rates(self, date: datetime.date, currencies_list: list[dict]) -> None:
+        """Save rates received from CBR API. Already archived rates are kept unchanged"""
+        self.model.objects.bulk_create(
+            (
+                self.model(
+                    date=date,
+                    num_code=currency["NumCode"],
+                    char_code=currency["CharCode"],
+                    nominal=currency["Nominal"],
+                    name=currency["Name"],
+                    value=Decimal(str(currency["Value"])),
+                    previous=Decimal(str(currency["Previous"])),
+                )
+                for currency in currencies_list
+            ),
+            ignore_conflicts=True
+        )
+
+    def get_rate_series(self, char_code: str, start: datetime.date, end: datetime.date) -> dict:
+        """Return archived rates of the currency between dates (inclusive) and their min, max and mean.
+        CBR changes the nominal of some currencies, so statistics are calculated over the rate of one unit
+        (unit_value = value / nominal) by the database with one aggregate query"""
+        rates = self.model.objects.filter(char_code=char_code.upper(), date__range=(start, end)).annotate(
+            unit_value=ExpressionWrapper(Cast("value", FloatField()) / F("nominal"), output_field=FloatField())
+        )
+        statistics = rates.aggregate(min=Min("unit_value"), max=Max("unit_value"), mean=Avg("unit_value"))
+        return {
+            "series": list(rates.order_by("date").values("date", "nominal", "value", "unit_value")),
+            **statistics,
+        }
@@ -3,8 +3,8 @@ import datetime
 from rating_movies.models import Actor
 from rating_movies.forms import MovieForm, ActorDirectorForm
 from rating_movies.services.crud import repositories, crud_utils, custom_validators
-from rating_movies.services.crud.create import create_other_sources_rating
-from rating_movies.services.crud.read import get_movie_by_parameters, get_other_sources_rating
+from rating_movies.services.crud.read import get_movie_by_parameters
+from rating_movies.services.api.movies import rating_enrichment
 
 
 def update_movie(form: MovieForm) -> bool:
@@ -31,19 +31,19 @@ def update_actor_director(form: ActorDirectorForm) -> bool:
 
 
 def update_movie_other_sources_rating(movie_cleaned_data: dict) -> None:
-    """Other sources rating update"""
+    """Put the movie to the other sources rating queue if it has no rating yet"""
     title = movie_cleaned_data.get("title", "")
     world_premiere = movie_cleaned_data.get("world_premiere", datetime.date.today())
     movie_object = get_movie_by_parameters(title=title, world_premiere=world_premiere)
 
     if movie_object:
-        if not get_other_sources_rating(movie=movie_object):
-            create_other_sources_rating(title=title, movie=movie_object)
+        rating_enrichment.enqueue_movies([movie_object.pk])
 
 
 def update_actor_director_age(actor_director: Actor) -> None:
-    """Update actor/directors age"""
-    repository = repositories.ActorDirectorRepository()
+    """Update actor/directors age. The age is written only when it has changed, so page views don't write"""
     current_age = crud_utils.calculate_age(birth_date=actor_director.birth_date, death_date=actor_director.death_date)
+    if current_age == actor_director.age:
+        return
     actor_director.age = current_age
-    repository.update_obj(actor_director)
+    repositories.ActorDirectorRepository().update_age(pk=actor_director.pk, age=current_age)
@@ -0,0 +1,117 @@
+import time
+import random
+from typing import Callable, Iterator, Optional
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+
+from django.conf import settings
+from django.http import HttpResponse
+from django.core.handlers.wsgi import WSGIRequest
+
+
+REPLICA_APPS = frozenset(("rating_movies", ))
+# только данные сайта читаются из реплик, сессии и пользователи всегда читаются из основной базы
+SAFE_METHODS = frozenset(("GET", "HEAD", "OPTIONS"))
+PIN_COOKIE_NAME = "primary_db_pin"
+
+
+@dataclass
+class RoutingState:
+    """Состояние маршрутизации одного запроса"""
+    is_pinned: bool
+    read_database: Optional[str] = None
+    has_written: bool = False
+
+
+_state: ContextVar[Optional[RoutingState]] = ContextVar("db_routing_state", default=None)
+
+
+def get_replicas() -> tuple[str, ...]:
+    return tuple(getattr(settings, "DATABASE_REPLICAS", ()))
+
+
+@contextmanager
+def primary_reads() -> Iterator[None]:
+    """Внутри блока данные читаются из основной базы, даже если запрос выбрал реплику"""
+    state = _state.get()
+    if state is None:
+        yield
+        return
+
+    read_database, state.read_database = state.read_database, None
+    try:
+        yield
+    finally:
+        state.read_database = read_database
+
+
+class ReplicaReadMixin:
+    """GET запросы к представлению читают данные из реплики, если сессия не привязана к основной базе"""
+    replica_reads = True
+
+
+class ReplicaRouter:
+    """Чтение в представлениях с ReplicaReadMixin направляется в реплику, выбранную для запроса.
+    Все остальные запросы, в том числе любые записи, выполняются в основной базе"""
+
+    def db_for_read(self, model, **hints) -> Optional[str]:
+        state = _state.get()
+        if state is None or state.read_database is None or model._meta.app_label not in REPLICA_APPS:
+            return None
+        return state.read_database
+
+    def db_for_write(self, model, **hints) -> str:
+        state = _state.get()
+        if state is not None and model._meta.app_label in REPLICA_APPS:
+            state.has_written = True
+        return "default"
+
+    def allow_relation(self, obj1, obj2, **hints) -> bool:
+        # реплики содержат те же данные, что и основная база
+        return True
+
+    def allow_migrate(self, db: str, app_label: str, **hints) -> Optional[bool]:
+        if db in get_replicas():
+            return False
+        return None
+
+
+class ReplicaRoutingMiddleware:
+    """Выбирает реплику для чтения и обеспечивает чтение своих записей: после записи (оценка, отзыв,
+    список фильмов) сессия DATABASE_REPLICA_PIN_SECONDS секунд читает только из основной базы,
+    пока реплики не получат изменения"""
+
+    def __init__(self, get_response: Callable[[WSGIRequest], HttpResponse]):
+        self.get_response = get_response
+
+    def __call__(self, request: WSGIRequest) -> HttpResponse:
+        state = RoutingState(is_pinned=self.__is_pinned(request))
+        token = _state.set(state)
+        try:
+            response = self.get_response(request)
+        finally:
+            _state.reset(token)
+
+        if state.has_written:
+            pin_seconds = settings.DATABASE_REPLICA_PIN_SECONDS
+            response.set_cookie(PIN_COOKIE_NAME, str(time.time() + pin_seconds), max_age=pin_seconds)
+        return response
+
+    def process_view(self, request: WSGIRequest, view_func: Callable, view_args, view_kwargs) -> None:
+        state = _state.get()
+        replicas = get_replicas()
+        if state is None or state.is_pinned or not replicas or request.method not in SAFE_METHODS:
+            return None
+
+        view_class = getattr(view_func, "view_class", None) or getattr(view_func, "cls", None)
+        if getattr(view_class, "replica_reads", False):
+            state.read_database = random.choice(replicas)
+        return None
+
+    @staticmethod
+    def __is_pinned(request: WSGIRequest) -> bool:
+        try:
+            return float(request.COOKIES.get(PIN_COOKIE_NAME, 0)) > time.time()
+        except ValueError:
+            return False
@@ -0,0 +1,97 @@
+import re
+from typing import Optional
+
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.views.generic import View
+from django.middleware.csrf import get_token
+from django.utils.translation import get_language
+from django.core.handlers.wsgi import WSGIRequest
+
+from rating_movies.models import Movie, Rating
+from rating_movies.services import cache_variables, cache_versions, db_routing
+from rating_movies.services.utils import get_client_ip
+
+
+PAGE_CACHE_TIMEOUT = 60 * 10
+
+CSRF_PLACEHOLDER = "__csrf_token_placeholder__"
+CSRF_INPUT_PATTERN = re.compile(r'(name="csrfmiddlewaretoken" value=")[^"]*(")')
+
+
+def get_catalogue_version() -> int:
+    """Version of data which are shown on every page: movies, actors, genres, categories"""
+    return cache_versions.get_version(cache_variables.CACHE_FOR_CATALOGUE_VERSION)
+
+
+def reset_catalogue_pages() -> None:
+    cache_versions.increase_version(cache_variables.CACHE_FOR_CATALOGUE_VERSION)
+
+
+def get_movie_version(movie_slug: str) -> int:
+    """Version of data which are shown only on the movie page: reviews, ratings, shots"""
+    return cache_versions.get_version(cache_variables.CACHE_FOR_MOVIE_VERSION % movie_slug)
+
+
+def reset_movie_page(movie_id: int) -> None:
+    movie_slug = Movie.objects.filter(pk=movie_id).values_list("url", flat=True).first()
+    if movie_slug is not None:
+        cache_versions.increase_version(cache_variables.CACHE_FOR_MOVIE_VERSION % movie_slug)
+
+
+def get_anonymous_user_rating(request: WSGIRequest, movie_slug: str) -> int:
+    """Return star which the visitor has given to the movie (ratings of anonymous users are bound to ip).
+    0 means that the movie wasn't rated"""
+    ip = get_client_ip(request=request)
+    return cache.get_or_set(
+        cache_variables.CACHE_FOR_ANONYMOUS_USER_RATING % (movie_slug, ip),
+        lambda: Rating.objects.filter(movie__url=movie_slug, ip=ip).values_list("star__value", flat=True).first() or 0,
+        PAGE_CACHE_TIMEOUT,
+        version=get_movie_version(movie_slug)
+    )
+
+
+class AnonymousPageCacheMixin(View):
+    """Cache whole page for anonymous users. The key contains language, path, page number or cursor and versions
+    of data shown on the page. Pages are rendered from the primary database, cached pages are served
+    without queries. CSRF tokens are saved as placeholders and replaced with a token of every request"""
+    page_cache_timeout = PAGE_CACHE_TIMEOUT
+
+    def dispatch(self, request: WSGIRequest, *args, **kwargs):
+        if not self.can_be_cached(request):
+            return super().dispatch(request, *args, **kwargs)
+
+        key = self.get_page_cache_key(request)
+        content = cache.get(key)
+        if content is not None:
+            return HttpResponse(self._insert_csrf_token(request, content))
+
+        # the version may be already increased while a replica hasn't received the change yet, so the page
+        # which is saved under this version is rendered from the primary database
+        with db_routing.primary_reads():
+            response = super().dispatch(request, *args, **kwargs)
+            if response.status_code == 200 and hasattr(response, "render"):
+                response.render()
+                cache.set(key, self._remove_csrf_token(response.content.decode()), self.page_cache_timeout)
+        return response
+
+    @staticmethod
+    def can_be_cached(request: WSGIRequest) -> bool:
+        return request.method == "GET" and set(request.GET) <= {"page", "cursor"} and not request.user.is_authenticated
+
+    def get_page_versions(self, request: WSGIRequest) -> tuple:
+        return get_catalogue_version(),
+
+    def get_page_cache_key(self, request: WSGIRequest) -> str:
+        versions = ".".join(map(str, self.get_page_versions(request)))
+        return cache_variables.CACHE_FOR_PAGE % (get_language(), request.path, request.GET.urlencode(), versions)
+
+    @staticmethod
+    def _remove_csrf_token(content: str) -> str:
+        return CSRF_INPUT_PATTERN.sub(rf"\g<1>{CSRF_PLACEHOLDER}\g<2>", content)
+
+    @staticmethod
+    def _insert_csrf_token(request: WSGIRequest, content: str) -> str:
+        if CSRF_PLACEHOLDER not in content:
+            return content
+        return content.replace(CSRF_PLACEHOLDER, get_token(request))
@@ -0,0 +1,88 @@
+import random
+import hashlib
+from array import array
+from typing import Optional
+from dataclasses import dataclass
+
+from django.core.cache import cache
+from django.db.models import QuerySet
+
+from rating_movies import models
+from rating_movies.services import cache_variables, page_cache
+
+
+POOL_TIMEOUT = 60 * 60
+SEED_LIMIT = 2 ** 31
+FEISTEL_ROUNDS = 4
+
+
+@dataclass(frozen=True)
+class MovieFilter:
+    """Условия выбора случайных фильмов. Пустое условие не ограничивает выбор"""
+    genres: tuple[int, ...] = ()
+    countries: tuple[str, ...] = ()
+    years: Optional[tuple[int, int]] = None
+
+    def get_key(self) -> str:
+        return hashlib.md5(repr((sorted(self.genres), sorted(self.countries), self.years)).encode()).hexdigest()
+
+    def filter(self, queryset: QuerySet) -> QuerySet:
+        if self.genres:
+            queryset = queryset.filter(genres__in=self.genres).distinct()
+        if self.countries:
+            queryset = queryset.filter(country__in=self.countries)
+        if self.years:
+            queryset = queryset.filter(year__range=self.years)
+        return queryset
+
+
+def get_movie_pks(movie_filter: MovieFilter = MovieFilter()) -> array:
+    """Возвращает id опубликованных фильмов, подходящих под условие, в виде массива 64-битных чисел.
+    Массив кэшируется для каждого условия и сбрасывается вместе со страницами каталога"""
+    key = cache_variables.CACHE_FOR_RANDOM_MOVIES_POOL % (page_cache.get_catalogue_version(), movie_filter.get_key())
+    return cache.get_or_set(key, lambda: array("q", movie_filter.filter(
+        models.Movie.objects.filter(draft=False)
+    ).order_by("pk").values_list("pk", flat=True)), POOL_TIMEOUT)
+
+
+def sample_movie_pks(number: int, movie_filter: MovieFilter = MovieFilter()) -> list[int]:
+    """Возвращает number разных случайных id без повторов. random.sample по range не копирует массив,
+    поэтому выбор занимает O(number) при любом размере каталога"""
+    movie_pks = get_movie_pks(movie_filter)
+    return [movie_pks[index] for index in random.sample(range(len(movie_pks)), min(number, len(movie_pks)))]
+
+
+def get_random_movies(number: int = 3, movie_filter: MovieFilter = MovieFilter()) -> list[models.Movie]:
+    movie_pks = sample_movie_pks(number, movie_filter)
+    movies = models.Movie.objects.in_bulk(movie_pks)
+    return [movies[pk] for pk in movie_pks if pk in movies]
+
+
+def new_seed() -> int:
+    return random.randrange(SEED_LIMIT)
+
+
+def _permute(index: int, size: int, seed: int) -> int:
+    """Позиция index в псевдослучайной перестановке чисел 0..size-1, заданной seed.
+    Сеть Фейстеля переставляет числа ближайшей степени четвёрки, значения вне 0..size-1 пропускаются
+    повторным применением (cycle walking), поэтому перестановку не нужно строить и хранить"""
+    half_bits = max((size - 1).bit_length() + 1, 2) // 2
+    mask = (1 << half_bits) - 1
+    while True:
+        left, right = index >> half_bits, index & mask
+        for round_number in range(FEISTEL_ROUNDS):
+            # hash кортежа целых чисел не зависит от PYTHONHASHSEED, порядок одинаков во всех процессах
+            left, right = right, left ^ (hash((seed, round_number, right)) & mask)
+        index = (left << half_bits) | right
+        if index < size:
+            return index
+
+
+def get_shuffled_movie_pks(seed: int, start: int = 0, stop: Optional[int] = None,
+                           movie_filter: MovieFilter = MovieFilter()) -> list[int]:
+    """Возвращает id с позиций start..stop случайного порядка, который определяется seed.
+    Страницы с одним seed не пересекаются и не перемешиваются заново, пока не изменится каталог.
+    Страница занимает O(stop - start)"""
+    movie_pks = get_movie_pks(movie_filter)
+    stop = len(movie_pks) if stop is None else min(stop, len(movie_pks))
+    return [movie_pks[_permute(position, len(movie_pks), seed)] for position in range(start, stop)]
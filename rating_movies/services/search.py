@@ -0,0 +1,123 @@
+import re
+from bisect import bisect_left
+from collections import defaultdict
+from typing import Iterable, Optional
+
+from django.db import connection
+from django.db.models import F, Case, When, QuerySet, Model
+from django.contrib.postgres.search import SearchQuery, SearchRank
+
+
+TITLE_WEIGHT = 1.0
+DESCRIPTION_WEIGHT = 0.4
+# the same proportion as weights 'A' and 'B' in PostgreSQL ts_rank
+
+SEARCH_FIELDS = {
+    "Movie": (("title_ru", "title_en"), ("description_ru", "description_en")),
+    "Actor": (("name_ru", "name_en"), ("description_ru", "description_en")),
+}
+# modeltranslation columns which are indexed: (title-like fields, description-like fields)
+
+
+def split_into_tokens(text: Optional[str]) -> list[str]:
+    """Split text into lowercase words"""
+    if not text:
+        return []
+    return re.findall(r"\w+", text.lower())
+
+
+class InvertedIndex:
+    """In-memory inverted index which is used instead of PostgreSQL full-text search on other databases"""
+    __slots__ = ("__postings", "__tokens")
+
+    def __init__(self, documents: Iterable[tuple[int, str, str]]):
+        """Take documents as tuples: (pk, title text, description text)"""
+        postings: defaultdict[str, dict[int, float]] = defaultdict(dict)
+        for pk, title, description in documents:
+            for weight, text in ((TITLE_WEIGHT, title), (DESCRIPTION_WEIGHT, description)):
+                for token in split_into_tokens(text):
+                    postings[token][pk] = postings[token].get(pk, 0) + weight
+
+        self.__postings = dict(postings)
+        self.__tokens = sorted(self.__postings)
+
+    def __find_by_prefix(self, prefix: str) -> dict[int, float]:
+        """Return scores of documents which contain words beginning with the given prefix"""
+        scores: defaultdict[int, float] = defaultdict(float)
+        position = bisect_left(self.__tokens, prefix)
+        while position < len(self.__tokens) and self.__tokens[position].startswith(prefix):
+            for pk, weight in self.__postings[self.__tokens[position]].items():
+                scores[pk] += weight
+            position += 1
+        return scores
+
+    def search(self, query: str) -> list[int]:
+        """Return pk list of documents containing all words of the query, the most relevant first"""
+        total_scores: Optional[dict[int, float]] = None
+        for token in split_into_tokens(query):
+            scores = self.__find_by_prefix(token)
+            if total_scores is None:
+                total_scores = scores
+            else:
+                total_scores = {pk: score + scores[pk] for pk, score in total_scores.items() if pk in scores}
+
+        if not total_scores:
+            return []
+        return [pk for pk, _ in sorted(total_scores.items(), key=lambda item: (-item[1], item[0]))]
+
+
+_indexes: dict[str, InvertedIndex] = {}
+
+
+def _get_inverted_index(model: type[Model]) -> InvertedIndex:
+    """Return inverted index of the given model building it at first request"""
+    model_name = model.__name__
+    if model_name not in _indexes:
+        title_fields, description_fields = SEARCH_FIELDS[model_name]
+        documents = (
+            (row[0], " ".join(filter(None, row[1:len(title_fields) + 1])),
+             " ".join(filter(None, row[len(title_fields) + 1:])))
+            for row in model.objects.values_list("pk", *title_fields, *description_fields).iterator()
+        )
+        _indexes[model_name] = InvertedIndex(documents)
+
+    return _indexes[model_name]
+
+
+def reset_inverted_index(model: type[Model]) -> None:
+    """Drop inverted index of the given model, it will be rebuilt at the next search"""
+    _indexes.pop(model.__name__, None)
+
+
+def _form_raw_query(query: str) -> str:
+    """Form tsquery where every word is searched as a prefix: 'word1:* & word2:*'"""
+    return " & ".join(f"{token}:*" for token in split_into_tokens(query))
+
+
+def _search_with_postgresql(model: type[Model], query: str) -> QuerySet:
+    raw_query = _form_raw_query(query)
+    search_query = SearchQuery(raw_query, config="russian", search_type="raw") | \
+        SearchQuery(raw_query, config="english", search_type="raw")
+    return model.objects.filter(search_vector=search_query).annotate(
+        rank=SearchRank(F("search_vector"), search_query)
+    ).order_by("-rank", "pk")
+
+
+def _search_with_inverted_index(model: type[Model], query: str) -> QuerySet:
+    found_pk = _get_inverted_index(model).search(query)
+    if not found_pk:
+        return model.objects.none()
+
+    ordering = Case(*(When(pk=pk, then=position) for position, pk in enumerate(found_pk)))
+    return model.objects.filter(pk__in=found_pk).order_by(ordering)
+
+
+def search_objects(model: type[Model], query: str) -> Optional[QuerySet]:
+    """Return objects of the given model ranked by relevance to the query.
+    Return None if the query doesn't contain any word"""
+    if not split_into_tokens(query):
+        return None
+
+    if connection.vendor == "postgresql":
+        return _search_with_postgresql(model, query)
+    return _search_with_inverted_index(model, query)
@@ -0,0 +1,71 @@
+import operator
+from functools import reduce
+from typing import Callable
+
+from django.db import transaction, IntegrityError
+from django.db.models import Model, Q
+
+
+SLUG_MAX_LENGTH = 150
+# поле url - SlugField(max_length=160), оставшиеся символы занимает суффикс "-<номер>"
+MAX_ATTEMPTS = 5
+
+
+def _get_base_slug(model: type[Model], slug: str) -> str:
+    return slug[:SLUG_MAX_LENGTH].strip("-") or model._meta.model_name
+
+
+def _assign_slugs(base_slugs: list[str], taken_slugs: set[str],
+                  checked_prefixes: set[str]) -> tuple[list[str], set[str]]:
+    """Распределяет свободные адреса. Возвращает адреса и занятые адреса, варианты с суффиксом которых
+    ещё не прочитаны из базы. Если такие есть, адреса нужно распределить заново"""
+    taken_slugs = set(taken_slugs)
+    next_suffixes: dict[str, int] = {}
+    unchecked_prefixes = set()
+    allocated_slugs = []
+    for base_slug in base_slugs:
+        slug = base_slug
+        if slug in taken_slugs and base_slug not in checked_prefixes:
+            unchecked_prefixes.add(base_slug)
+        suffix = next_suffixes.get(base_slug, 2)
+        while slug in taken_slugs:
+            slug = f"{base_slug}-{suffix}"
+            suffix += 1
+        next_suffixes[base_slug] = suffix
+        taken_slugs.add(slug)
+        allocated_slugs.append(slug)
+    return allocated_slugs, unchecked_prefixes
+
+
+def allocate_slugs(model: type[Model], slugs: list[str]) -> list[str]:
+    """Возвращает уникальные значения поля url для новых объектов модели в порядке slugs.
+    Занятый адрес получает наименьший свободный суффикс -2, -3 и т.д. Для любого числа адресов обычно
+    выполняется не больше двух запросов: сами адреса (url IN) и варианты с суффиксом только занятых адресов
+    (url LIKE 'адрес-%', на PostgreSQL для этого Django создаёт индекс *_like)"""
+    base_slugs = [_get_base_slug(model, slug) for slug in slugs]
+    taken_slugs = set(model.objects.filter(url__in=set(base_slugs)).values_list("url", flat=True))
+    checked_prefixes: set[str] = set()
+    while True:
+        allocated_slugs, unchecked_prefixes = _assign_slugs(base_slugs, taken_slugs, checked_prefixes)
+        if not unchecked_prefixes:
+            return allocated_slugs
+        taken_slugs.update(model.objects.filter(
+            reduce(operator.or_, (Q(url__startswith=f"{prefix}-") for prefix in unchecked_prefixes))
+        ).values_list("url", flat=True))
+        checked_prefixes |= unchecked_prefixes
+
+
+def save_with_unique_slug(obj: Model, slug: str, save: Callable[[], None]) -> None:
+    """Сохраняет новый объект с уникальным url. Если параллельная транзакция заняла адрес между проверкой
+    и INSERT, уникальный индекс отклоняет строку, точка сохранения откатывается и берётся следующий адрес"""
+    model = type(obj)
+    for attempt in range(1, MAX_ATTEMPTS + 1):
+        obj.url = allocate_slugs(model, [slug])[0]
+        try:
+            with transaction.atomic():
+                save()
+            return
+        except IntegrityError:
+            # ошибка не связана с адресом или адрес не удаётся получить
+            if attempt == MAX_ATTEMPTS or not model.objects.filter(url=obj.url).exists():
+                raise
@@ -0,0 +1,250 @@
+import math
+import threading
+from array import array
+from collections import Counter
+from dataclasses import dataclass
+from typing import Iterable, Optional
+
+from django.urls import reverse
+
+from rating_movies.models import Movie, Actor
+
+
+MOVIE = 0
+ACTOR = 1
+KINDS = {
+    MOVIE: ("movie", "movie_detail"),
+    ACTOR: ("actor_director", "actor_director_detail"),
+}
+# вид объекта: (название в ответе API, имя url-адреса детальной страницы)
+
+MIN_SIMILARITY = 0.5
+# доля триграмм запроса, которые должны встретиться в названии
+MAX_CANDIDATES = 20_000
+# кандидаты берутся из самых редких списков триграмм и проверяются точно, при большем числе кандидатов
+# проверяются те, что встретились в большем числе редких списков
+COMPACTION_MIN_DEAD_SLOTS = 1000
+# массивы перестраиваются, когда удалённых записей больше половины и больше этого числа
+
+SEPARATOR = "\x1f"
+
+
+@dataclass
+class Suggestion:
+    kind: int
+    pk: int
+    url: str
+    text: str
+    similarity: float
+
+    @property
+    def type(self) -> str:
+        return KINDS[self.kind][0]
+
+    def get_absolute_url(self) -> str:
+        return reverse(KINDS[self.kind][1], kwargs={"slug": self.url})
+
+
+def _normalize(text: str) -> str:
+    return " ".join(text.lower().split())
+
+
+def make_trigrams(text: str, is_prefix: bool = False) -> set[str]:
+    """Return trigrams of every word padded like in pg_trgm: two spaces before and one space after the word.
+    A prefix (text which user is still typing) isn't padded at the end"""
+    trigrams: set[str] = set()
+    words = _normalize(text).split()
+    for number, word in enumerate(words):
+        padded = f"  {word}" if is_prefix and number == len(words) - 1 else f"  {word} "
+        trigrams.update(padded[index:index + 3] for index in range(len(padded) - 2))
+    return trigrams
+
+
+class _IndexState:
+    """Arrays of the index. Slots are only appended and marked as removed, a compaction builds a new state,
+    so a search which took the state keeps reading consistent arrays"""
+
+    def __init__(self):
+        self.storage = bytearray()
+        self.offsets = array("Q", [0])
+        self.kinds = array("b")
+        self.object_ids = array("q")
+        self.trigram_counts = array("H")
+        self.alive = bytearray()
+        self.postings: dict[str, array] = {}
+        self.slots: dict[tuple[int, int], list[int]] = {}
+        self.dead_slots = 0
+
+    def append_slot(self, kind: int, pk: int, url: str, text: str) -> int:
+        slot = len(self.kinds)
+        self.storage += f"{url}{SEPARATOR}{text}".encode("utf-8")
+        self.offsets.append(len(self.storage))
+        self.kinds.append(kind)
+        self.object_ids.append(pk)
+        self.alive.append(1)
+
+        # slot is added to postings last, so every slot found by a search has all columns
+        trigrams = make_trigrams(text)
+        self.trigram_counts.append(min(len(trigrams), 65535))
+        for trigram in trigrams:
+            posting = self.postings.get(trigram)
+            if posting is None:
+                posting = self.postings[trigram] = array("I")
+            posting.append(slot)
+        return slot
+
+    def read_slot(self, slot: int) -> tuple[str, str]:
+        url, text = self.storage[self.offsets[slot]:self.offsets[slot + 1]].decode("utf-8").split(SEPARATOR, 1)
+        return url, text
+
+    def remove(self, key: tuple[int, int]) -> None:
+        for slot in self.slots.pop(key, ()):
+            self.alive[slot] = 0
+            self.dead_slots += 1
+
+    def needs_compaction(self) -> bool:
+        return self.dead_slots > max(len(self.kinds) // 2, COMPACTION_MIN_DEAD_SLOTS)
+
+    def compact(self) -> "_IndexState":
+        """Return a new state without removed slots"""
+        state = _IndexState()
+        for key, slots in self.slots.items():
+            state.slots[key] = [state.append_slot(*key, *self.read_slot(slot)) for slot in slots]
+        return state
+
+
+class TrigramIndex:
+    """Trigram index over short texts (movie titles and actor names).
+    Texts are kept as UTF-8 in one bytearray, every other column is a typed array,
+    so memory grows by tens of bytes per title instead of hundreds for Python objects"""
+
+    def __init__(self):
+        self.__state = _IndexState()
+        self.__lock = threading.Lock()
+
+    def __len__(self) -> int:
+        """Return number of indexed objects"""
+        return len(self.__state.slots)
+
+    @property
+    def slots_number(self) -> int:
+        """Return number of stored texts including removed ones which weren't compacted yet"""
+        return len(self.__state.kinds)
+
+    def __remove(self, key: tuple[int, int]) -> None:
+        self.__state.remove(key)
+        if self.__state.needs_compaction():
+            self.__state = self.__state.compact()
+
+    def update(self, kind: int, pk: int, url: str, texts: Iterable[Optional[str]]) -> None:
+        """Add or replace texts (e.g. every translation of a title) of the given object"""
+        key = (kind, pk)
+        with self.__lock:
+            self.__remove(key)
+            unique_texts = dict.fromkeys(text.strip() for text in texts if text and text.strip())
+            if unique_texts:
+                self.__state.slots[key] = [self.__state.append_slot(kind, pk, url, text) for text in unique_texts]
+
+    def remove(self, kind: int, pk: int) -> None:
+        with self.__lock:
+            self.__remove((kind, pk))
+
+    def search(self, query: str, number: int = 10) -> list[Suggestion]:
+        """Return objects with the most similar texts. Similarity is a share of query trigrams found in a text,
+        so a prefix or a text with a typo is still found"""
+        query_trigrams = make_trigrams(query, is_prefix=True)
+        if not query_trigrams:
+            return []
+
+        with self.__lock:
+            state = self.__state
+
+        # текст с долей MIN_SIMILARITY содержит хотя бы одну из (q - required + 1) самых редких триграмм запроса,
+        # поэтому кандидаты берутся только из редких списков, а сходство проверяется по триграммам текста
+        query_size = len(query_trigrams)
+        rare_number = query_size - math.ceil(MIN_SIMILARITY * query_size) + 1
+        postings = sorted((state.postings.get(trigram, ()) for trigram in query_trigrams), key=len)
+        hits: Counter[int] = Counter()
+        for posting in postings[:rare_number]:
+            hits.update(posting)
+
+        # сходство не больше (попадания в редкие списки + число частых триграмм) / q: кандидаты проверяются
+        # по убыванию этой границы, пока number объектов не достигли границы оставшихся кандидатов
+        best: dict[tuple[int, int], tuple] = {}
+        upper_bound, settled = None, 0
+        for slot, slot_hits in hits.most_common(MAX_CANDIDATES):
+            if slot_hits != upper_bound:
+                upper_bound = slot_hits
+                settled = sum(-candidate[0] * query_size >= slot_hits + query_size - rare_number
+                              for candidate in best.values())
+            if settled >= number:
+                break
+            if not state.alive[slot]:
+                continue
+            url, text = state.read_slot(slot)
+            slot_similarity = len(query_trigrams & make_trigrams(text))
+            similarity = slot_similarity / query_size
+            key = (state.kinds[slot], state.object_ids[slot])
+            candidate = (-similarity, state.trigram_counts[slot], slot, url, text)
+            if similarity >= MIN_SIMILARITY and (key not in best or candidate < best[key]):
+                if slot_similarity >= slot_hits + query_size - rare_number and key not in best:
+                    settled += 1
+                best[key] = candidate
+
+        suggestions = []
+        for key, (negative_similarity, _, _, url, text) in sorted(best.items(), key=lambda item: item[1])[:number]:
+            suggestions.append(Suggestion(kind=key[0], pk=key[1], url=url, text=text,
+                                          similarity=round(-negative_similarity, 2)))
+        return suggestions
+
+
+_index: Optional[TrigramIndex] = None
+_index_lock = threading.Lock()
+
+
+def _build_index() -> TrigramIndex:
+    index = TrigramIndex()
+    movies = Movie.objects.filter(draft=False).values_list("pk", "url", "title_ru", "title_en")
+    for pk, url, *titles in movies.iterator(chunk_size=5000):
+        index.update(MOVIE, pk, url, titles)
+
+    actors = Actor.objects.values_list("pk", "url", "name_ru", "name_en")
+    for pk, url, *names in actors.iterator(chunk_size=5000):
+        index.update(ACTOR, pk, url, names)
+    return index
+
+
+def get_index() -> TrigramIndex:
+    """Return the index of this process building it at the first request"""
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _index = _build_index()
+    return _index
+
+
+def update_movie(movie: Movie) -> None:
+    """Apply changes of one movie to the index if it was built already"""
+    if _index is None:
+        return
+    if movie.draft:
+        _index.remove(MOVIE, movie.pk)
+    else:
+        _index.update(MOVIE, movie.pk, movie.url, (movie.title_ru, movie.title_en))
+
+
+def update_actor(actor: Actor) -> None:
+    """Apply changes of one actor/director to the index if it was built already"""
+    if _index is not None:
+        _index.update(ACTOR, actor.pk, actor.url, (actor.name_ru, actor.name_en))
+
+
+def remove_object(kind: int, pk: int) -> None:
+    if _index is not None:
+        _index.remove(kind, pk)
+
+
+def reset_index() -> None:
+    global _index
+    _index = None
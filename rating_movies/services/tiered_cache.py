@@ -0,0 +1,174 @@
+import time
+import pickle
+import threading
+from collections import OrderedDict, Counter
+from typing import Any, Optional
+
+from django.core.cache import caches
+from django.core.cache.backends.base import BaseCache, DEFAULT_TIMEOUT
+
+
+_MISSING = object()
+
+
+class TieredCache(BaseCache):
+    """Two-level cache: LRU dictionary of the current process in front of a shared cache (Redis or files).
+    The local level keeps values for LOCAL_TIMEOUT seconds at most, so changes made by other processes
+    become visible after this delay. Counters (versions of cached data) are read by get_counter from the shared
+    level only, so an increment is visible to all processes at once.
+
+    OPTIONS:
+        SHARED_ALIAS - alias of the shared cache in settings.CACHES
+        LOCAL_TIMEOUT - lifetime of values in the local level
+        LOCK_TIMEOUT - how long get_or_set waits for a value which is being computed by another process
+        MAX_ENTRIES - size of the local level
+    """
+    lock_stripes = 64
+    poll_interval = 0.05
+
+    def __init__(self, location: str, params: dict):
+        super().__init__(params)
+        options = params.get("OPTIONS", {})
+        self._shared_alias = options.get("SHARED_ALIAS", "shared")
+        self._local_timeout = options.get("LOCAL_TIMEOUT", 5)
+        self._lock_timeout = options.get("LOCK_TIMEOUT", 10)
+
+        self._local: OrderedDict[str, tuple[float, bytes]] = OrderedDict()
+        self._local_lock = threading.Lock()
+        self._flight_locks = [threading.Lock() for _ in range(self.lock_stripes)]
+        # одна блокировка на группу ключей, чтобы значение по ключу вычислялось одним потоком процесса
+        self._stats: Counter[str] = Counter()
+
+    @property
+    def shared(self) -> BaseCache:
+        return caches[self._shared_alias]
+
+    def get_stats(self) -> dict[str, int]:
+        """Return counters: local_hits, shared_hits, misses, computations"""
+        return {name: self._stats[name] for name in ("local_hits", "shared_hits", "misses", "computations")}
+
+    def _get_local(self, local_key: str) -> Any:
+        with self._local_lock:
+            item = self._local.get(local_key)
+            if item is None:
+                return _MISSING
+            expire_at, pickled = item
+            if expire_at <= time.monotonic():
+                del self._local[local_key]
+                return _MISSING
+            self._local.move_to_end(local_key)
+        return pickle.loads(pickled)
+
+    def _set_local(self, local_key: str, value: Any, timeout: Optional[float]) -> None:
+        local_timeout = self._local_timeout if timeout is None else min(timeout, self._local_timeout)
+        if local_timeout <= 0:
+            self._delete_local(local_key)
+            return
+        pickled = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        with self._local_lock:
+            self._local[local_key] = (time.monotonic() + local_timeout, pickled)
+            self._local.move_to_end(local_key)
+            while len(self._local) > self._max_entries:
+                self._local.popitem(last=False)
+
+    def _delete_local(self, local_key: str) -> None:
+        with self._local_lock:
+            self._local.pop(local_key, None)
+
+    def get(self, key: str, default: Any = None, version: Optional[int] = None) -> Any:
+        local_key = self.make_and_validate_key(key, version=version)
+        value = self._get_local(local_key)
+        if value is not _MISSING:
+            self._stats["local_hits"] += 1
+            return value
+
+        value = self.shared.get(key, _MISSING, version=version)
+        if value is _MISSING:
+            self._stats["misses"] += 1
+            return default
+
+        self._stats["shared_hits"] += 1
+        self._set_local(local_key, value, None)
+        return value
+
+    def set(self, key: str, value: Any, timeout=DEFAULT_TIMEOUT, version: Optional[int] = None) -> None:
+        local_key = self.make_and_validate_key(key, version=version)
+        timeout = self._shared_timeout(timeout)
+        self.shared.set(key, value, timeout, version=version)
+        self._set_local(local_key, value, timeout)
+
+    def add(self, key: str, value: Any, timeout=DEFAULT_TIMEOUT, version: Optional[int] = None) -> bool:
+        local_key = self.make_and_validate_key(key, version=version)
+        self._delete_local(local_key)
+        return self.shared.add(key, value, self._shared_timeout(timeout), version=version)
+
+    def touch(self, key: str, timeout=DEFAULT_TIMEOUT, version: Optional[int] = None) -> bool:
+        return self.shared.touch(key, self._shared_timeout(timeout), version=version)
+
+    def delete(self, key: str, version: Optional[int] = None) -> bool:
+        local_key = self.make_and_validate_key(key, version=version)
+        self._delete_local(local_key)
+        return self.shared.delete(key, version=version)
+
+    def has_key(self, key: str, version: Optional[int] = None) -> bool:
+        local_key = self.make_and_validate_key(key, version=version)
+        return self._get_local(local_key) is not _MISSING or self.shared.has_key(key, version=version)
+
+    def incr(self, key: str, delta: int = 1, version: Optional[int] = None) -> int:
+        """Increment in the shared cache only, counters must be the same for all processes"""
+        local_key = self.make_and_validate_key(key, version=version)
+        self._delete_local(local_key)
+        return self.shared.incr(key, delta, version=version)
+
+    def get_counter(self, key: str, default: Any = None, version: Optional[int] = None) -> Any:
+        """Read a counter from the shared cache only. The local level of other processes would keep the old value
+        for LOCAL_TIMEOUT after incr"""
+        return self.shared.get(key, default, version=version)
+
+    def clear(self) -> None:
+        with self._local_lock:
+            self._local.clear()
+        self.shared.clear()
+
+    def get_or_set(self, key: str, default: Any, timeout=DEFAULT_TIMEOUT, version: Optional[int] = None) -> Any:
+        """Return value by key or compute it by default (it can be callable) and save.
+        Only one thread of all processes computes the value, others wait for it"""
+        value = self.get(key, _MISSING, version=version)
+        if value is not _MISSING:
+            return value
+
+        with self._flight_locks[hash(key) % self.lock_stripes]:
+            value = self.get(key, _MISSING, version=version)
+            if value is not _MISSING:
+                return value
+
+            lock_key = f"{key}:lock"
+            if not self.shared.add(lock_key, 1, self._lock_timeout, version=version):
+                value = self._wait_for_value(key, version)
+                if value is not _MISSING:
+                    return value
+                # процесс, вычислявший значение, не успел или упал: вычисляем сами
+
+            try:
+                value = default() if callable(default) else default
+                self._stats["computations"] += 1
+                self.set(key, value, timeout, version=version)
+            finally:
+                self.shared.delete(lock_key, version=version)
+        return value
+
+    def _wait_for_value(self, key: str, version: Optional[int]) -> Any:
+        deadline = time.monotonic() + self._lock_timeout
+        while time.monotonic() < deadline:
+            time.sleep(self.poll_interval)
+            value = self.shared.get(key, _MISSING, version=version)
+            if value is not _MISSING:
+                self._set_local(self.make_and_validate_key(key, version=version), value, None)
+                return value
+        return _MISSING
+
+    def _shared_timeout(self, timeout) -> Optional[float]:
+        """Return timeout in seconds for the shared cache, None means forever"""
+        if timeout is DEFAULT_TIMEOUT:
+            return self.default_timeout
+        return timeout
@@ -0,0 +1,53 @@
+import re
+import unicodedata
+from typing import Iterable
+
+
+CYRILLIC_TO_LATIN = {
+    "а": "a", "б": "b", "в": "v", "г": "g", "д": "d", "е": "e", "ё": "yo", "ж": "zh", "з": "z", "и": "i",
+    "й": "j", "к": "k", "л": "l", "м": "m", "н": "n", "о": "o", "п": "p", "р": "r", "с": "s", "т": "t",
+    "у": "u", "ф": "f", "х": "kh", "ц": "ts", "ч": "ch", "ш": "sh", "щ": "shch", "ъ": "", "ы": "i", "ь": "",
+    "э": "e", "ю": "yu", "я": "ya",
+    # украинский и белорусский алфавиты
+    "ґ": "g", "є": "ye", "і": "i", "ї": "yi", "ў": "u",
+}
+
+TRANSLITERATION_TABLE = str.maketrans({
+    **CYRILLIC_TO_LATIN,
+    **{letter.upper(): latin.capitalize() for letter, latin in CYRILLIC_TO_LATIN.items()},
+    # переводы строк разделяют названия в slugify_many
+    "\n": " ",
+})
+# таблица строится один раз при импорте модуля, str.translate заменяет все буквы за один проход
+
+NOT_SLUG_CHARACTERS = re.compile(r"[^\w\s-]")
+SEPARATORS = re.compile(r"(?:-|[^\S\n])+")
+# как в django.utils.text.slugify, но перевод строки сохраняется
+
+
+def transliterate(text: str) -> str:
+    return text.translate(TRANSLITERATION_TABLE)
+
+
+def _to_ascii(text: str) -> str:
+    return unicodedata.normalize("NFKD", text).encode("ascii", "ignore").decode("ascii")
+
+
+def slugify(text: str) -> str:
+    """Адрес из текста на русском, украинском, белорусском или английском языке.
+    Результат совпадает с django.utils.text.slugify для транслитерированного текста"""
+    text = _to_ascii(str(text).translate(TRANSLITERATION_TABLE))
+    return SEPARATORS.sub("-", NOT_SLUG_CHARACTERS.sub("", text.lower())).strip("-_")
+
+
+def slugify_many(texts: Iterable[str]) -> list[str]:
+    """То же, что slugify для каждого текста, но нормализация Unicode и регулярные выражения
+    применяются один раз ко всем текстам, соединённым переводом строки"""
+    texts = [str(text).translate(TRANSLITERATION_TABLE) for text in texts]
+    if not texts:
+        return []
+
+    text = _to_ascii("\n".join(texts))
+    text = SEPARATORS.sub("-", NOT_SLUG_CHARACTERS.sub("", text.lower()))
+    return [slug.strip("-_") for slug in text.split("\n")]
+
@@ -0,0 +1,45 @@
+from collections import Counter
+from typing import Any, Callable
+
+from django.core.cache import cache
+
+from rating_movies.services import cache_variables, cache_versions
+
+
+USER_CACHE_TIMEOUT = 60 * 5
+
+_MISSING = object()
+_stats: Counter[str] = Counter()
+
+
+def get_user_cache_version(user_id: int) -> int:
+    """Return version of the user's cache namespace"""
+    return cache_versions.get_version(cache_variables.CACHE_FOR_USER_VERSION % user_id)
+
+
+def get_or_set(user_id: int, key_template: str, default: Callable[[], Any]) -> Any:
+    """Return user's data from cache or compute it by default and save"""
+    key = key_template % user_id
+    version = get_user_cache_version(user_id)
+    value = cache.get(key, _MISSING, version=version)
+    if value is not _MISSING:
+        _stats["hits"] += 1
+        return value
+
+    _stats["misses"] += 1
+    return cache.get_or_set(key, default, USER_CACHE_TIMEOUT, version=version)
+
+
+def reset_user_cache(user_id: int) -> None:
+    """Invalidate all cached data of the given user only"""
+    cache_versions.increase_version(cache_variables.CACHE_FOR_USER_VERSION % user_id)
+
+
+def get_hit_rate() -> float:
+    """Return share of requests to user's data which were served from cache in the current process"""
+    total = _stats["hits"] + _stats["misses"]
+    return _stats["hits"] / total if total else 0.0
+
+
+def get_stats() -> dict[str, int]:
+    return {"hits": _stats["hits"], "misses": _stats["misses"]}
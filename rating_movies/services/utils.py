@@ -63,12 +63,6 @@ def convert_years_for_random_movies(years: str) -> Optional[list]:
     return years.split(" - ")
 
 
-def convert_country_for_random_movies(country):
-    if not country:
-        return None
-    return country[0]
-
-
 def format_currency_date(currency_date: str) -> str:
     """Принимает дату в формате: 'YYYY-MM-DD' и возвращает её в отформатированном виде: 'DD.MM.YYYY' """
     date_split = currency_date.split("-")
@@ -0,0 +1,99 @@
+from django.dispatch import receiver
+from django.db.models.signals import post_save, post_delete, m2m_changed
+
+from rating_movies.models import Rating, Movie, Actor, Genre, Category, Review, MovieShots, OtherSourcesRating, \
+    UserProfile, UserProfileMovie
+from rating_movies.services import search, suggest, user_cache, page_cache
+from rating_movies.services.crud.repositories import MovieRatingStatsRepository
+
+
+@receiver(post_save, sender=Rating)
+def rating_saved(sender, instance: Rating, **kwargs):
+    """Recalculate movie rating stats whenever somebody rates the movie"""
+    MovieRatingStatsRepository().refresh_stats(movie_id=instance.movie_id)
+
+
+@receiver(post_delete, sender=Rating)
+def rating_deleted(sender, instance: Rating, **kwargs):
+    """Recalculate movie rating stats after a rating was deleted.
+    The stats record isn't created here because ratings are also deleted in cascade with their movie"""
+    MovieRatingStatsRepository().refresh_stats(movie_id=instance.movie_id, create=False)
+
+
+@receiver((post_save, post_delete), sender=Movie)
+@receiver((post_save, post_delete), sender=Actor)
+def searchable_object_changed(sender, **kwargs):
+    """Drop in-memory search index of the changed model (it's used when the database isn't PostgreSQL)"""
+    search.reset_inverted_index(model=sender)
+
+
+@receiver(post_save, sender=Movie)
+def movie_saved(sender, instance: Movie, **kwargs):
+    """Update movie title in autocomplete index, drafts are removed from it"""
+    suggest.update_movie(instance)
+
+
+@receiver(post_save, sender=Actor)
+def actor_saved(sender, instance: Actor, **kwargs):
+    suggest.update_actor(instance)
+
+
+@receiver(post_delete, sender=Movie)
+def movie_deleted(sender, instance: Movie, **kwargs):
+    suggest.remove_object(kind=suggest.MOVIE, pk=instance.pk)
+
+
+@receiver(post_delete, sender=Actor)
+def actor_deleted(sender, instance: Actor, **kwargs):
+    suggest.remove_object(kind=suggest.ACTOR, pk=instance.pk)
+
+
+@receiver(m2m_changed, sender=UserProfile.movies.through)
+def watchlist_changed(sender, instance, action: str, reverse: bool, pk_set: set, **kwargs):
+    """Reset cached data only of users whose watchlists were changed.
+    movie.user_movies.clear() doesn't pass pk_set, so watchers of the movie are read before the clear"""
+    if reverse and action == "pre_clear":
+        instance._watchlist_user_ids = list(
+            UserProfile.objects.filter(movies=instance).values_list("user_id", flat=True)
+        )
+    if not action.startswith("post_"):
+        return
+    if not reverse:
+        user_cache.reset_user_cache(user_id=instance.user_id)
+        return
+
+    if pk_set is None:
+        user_ids = instance.__dict__.pop("_watchlist_user_ids", [])
+    else:
+        user_ids = UserProfile.objects.filter(pk__in=pk_set).values_list("user_id", flat=True)
+    for user_id in user_ids:
+        user_cache.reset_user_cache(user_id=user_id)
+
+
+@receiver(post_delete, sender=UserProfileMovie)
+def watchlist_item_deleted(sender, instance: UserProfileMovie, **kwargs):
+    """Items are deleted without m2m_changed signal in cascade with a movie or a user profile"""
+    user_id = UserProfile.objects.filter(pk=instance.user_profile_id).values_list("user_id", flat=True).first()
+    if user_id is not None:
+        user_cache.reset_user_cache(user_id=user_id)
+
+
+@receiver((post_save, post_delete), sender=Movie)
+@receiver((post_save, post_delete), sender=Actor)
+@receiver((post_save, post_delete), sender=Genre)
+@receiver((post_save, post_delete), sender=Category)
+@receiver(m2m_changed, sender=Movie.genres.through)
+@receiver(m2m_changed, sender=Movie.actors.through)
+@receiver(m2m_changed, sender=Movie.directors.through)
+def catalogue_changed(sender, **kwargs):
+    """Reset cached pages of anonymous users, movies, actors, genres and categories are shown on all of them"""
+    page_cache.reset_catalogue_pages()
+
+
+@receiver((post_save, post_delete), sender=Rating)
+@receiver((post_save, post_delete), sender=Review)
+@receiver((post_save, post_delete), sender=MovieShots)
+@receiver((post_save, post_delete), sender=OtherSourcesRating)
+def movie_page_changed(sender, instance, **kwargs):
+    """Reset cached page of the movie only"""
+    page_cache.reset_movie_page(movie_id=instance.movie_id)
@@ -0,0 +1,25 @@
+import time
+import random
+
+from rating_movies.services.transliteration import slugify, slugify_many
+
+
+def benchmark(number: int = 1_000_000) -> dict[str, float]:
+    """Время в секундах для number случайных названий: python -m rating_movies.tests.benchmark_transliteration"""
+    words = ("Война", "и", "мир", "The", "Matrix", "Їжак", "у", "тумані", "Ўсё", "ПОБЕГ", "из", "Шоушенка",
+             "Part", "2:", "—", "Café", "Ёлки")
+    titles = [" ".join(random.choices(words, k=random.randint(1, 6))) for _ in range(number)]
+
+    start = time.perf_counter()
+    for title in titles:
+        slugify(title)
+    slugify_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    slugify_many(titles)
+    return {"slugify": slugify_time, "slugify_many": time.perf_counter() - start}
+
+
+if __name__ == "__main__":
+    for name, seconds in benchmark().items():
+        print(f"{name}: {seconds:.2f} s")
@@ -1,16 +1,42 @@
-from datetime import date
+import json
+import time
+import tempfile
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from io import StringIO
+from pathlib import Path
+from unittest import mock
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta
 
-from django.test import TestCase
+from django.core.cache import cache, caches
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
 from django.test.client import RequestFactory
+from django.test.utils import CaptureQueriesContext
+from django.db import connection, router, transaction, IntegrityError
+from django.http import HttpResponse
+from django.template import engines
+from django.template.response import SimpleTemplateResponse
+from django.views.generic import View
+from django.contrib.auth.models import User
+from django.utils import timezone, translation
 from django.http.request import QueryDict
 
 from rating_movies import models
-from rating_movies.services import utils
-from rating_movies.services.crud import crud_utils
+from rating_movies.services import utils, suggest, user_cache, page_cache, cache_variables, db_routing, slugs,\
+    transliteration, random_movies, cache_versions
+from rating_movies.services.tiered_cache import TieredCache
+from rating_movies.services.crud import crud_utils, read, create, repositories, specifications, catalogue_import
 from rating_movies.services.api.currency import currency_api
-from rating_movies.services.api.crypto_currency import crypto_currency_api
+from rating_movies.services.api.crypto_currency import crypto_currency_api, crypto_currency_sorting,\
+    crypto_currency_service
 from rating_movies.services.api.weather import weather_api
-from rating_movies.services.api.movies import movies_api
+from rating_movies.services.api.movies import movies_api, rating_enrichment
+from rating_movies.services.api import snapshot_refresh, snapshot_store, http_client, api_utils
+from rating_movies.services.api.weather import weather_json_recording
+from rating_movies.services.api.currency import currency_json_recording
 
 
 class UtilsTestCase(TestCase):
@@ -133,6 +159,1224 @@ class CrudUtilsTestCase(TestCase):
         self.assertEqual(years, results)
 
 
+class KeysetPaginationTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        for number in range(8):
+            models.Movie.objects.create(title=f"Movie {number}", url=f"movie-{number}",
+                                        world_premiere=date(year=2000 + number // 3, month=1, day=1))
+        self.movies = list(models.Movie.objects.order_by("-world_premiere", "-id"))
+
+    def test_paginate_by_keyset(self):
+        first_page = read.get_movies_page(cursor=None, page_size=3)
+        second_page = read.get_movies_page(cursor=first_page.next_cursor, page_size=3)
+        last_page = read.get_movies_page(cursor=second_page.next_cursor, page_size=3)
+
+        self.assertEqual(self.movies, first_page.objects + second_page.objects + last_page.objects)
+        self.assertEqual((None, None), (first_page.previous_cursor, last_page.next_cursor))
+        self.assertEqual(second_page.objects, read.get_movies_page(last_page.previous_cursor, page_size=3).objects)
+
+    def test_main_page_links(self):
+        response = self.client.get(reverse("home"))
+        next_cursor = response.context["cursor_page"].next_cursor
+        self.assertIn(f"?cursor={next_cursor}", response.content.decode())
+
+        response = self.client.get(reverse("home"), {"cursor": next_cursor})
+        self.assertEqual(self.movies[6:12], list(response.context["movies"]))
+
+    def test_get_approximate_count(self):
+        self.assertEqual(8, crud_utils.get_approximate_count(models.Movie.objects.all()))
+        models.Movie.objects.create(title="New movie")
+        self.assertEqual(8, crud_utils.get_approximate_count(models.Movie.objects.all()))
+
+
+class MovieRatingStatsTestCase(TestCase):
+    def setUp(self):
+        self.first_star = models.RatingStar.objects.create(value=3)
+        self.second_star = models.RatingStar.objects.create(value=5)
+        self.movie = models.Movie.objects.create(title="Rated movie")
+
+    def test_stats_are_updated_on_rating_write(self):
+        first_rating = models.Rating.objects.create(ip="127.0.0.1", star=self.first_star, movie=self.movie)
+        models.Rating.objects.create(ip="127.0.0.2", star=self.second_star, movie=self.movie)
+
+        stats = models.MovieRatingStats.objects.get(movie=self.movie)
+        self.assertEqual((2, 8, 4), (stats.count, stats.total, stats.average))
+        self.assertEqual({"3": 1, "5": 1}, stats.histogram)
+
+        first_rating.star = self.second_star
+        first_rating.save()
+        stats.refresh_from_db()
+        self.assertEqual((2, 10, 5), (stats.count, stats.total, stats.average))
+
+        first_rating.delete()
+        stats.refresh_from_db()
+        self.assertEqual({"5": 1}, stats.histogram)
+
+    def test_stats_are_deleted_with_movie(self):
+        models.Rating.objects.create(ip="127.0.0.1", star=self.first_star, movie=self.movie)
+        self.movie.delete()
+
+        self.assertEqual(0, models.MovieRatingStats.objects.count())
+
+    def test_rebuild_movie_rating_stats(self):
+        models.Rating.objects.create(ip="127.0.0.1", star=self.first_star, movie=self.movie)
+        models.MovieRatingStats.objects.all().delete()
+
+        call_command("rebuild_movie_rating_stats", stdout=StringIO())
+        stats = models.MovieRatingStats.objects.get(movie=self.movie)
+        self.assertEqual((1, 3, 3), (stats.count, stats.total, stats.average))
+
+
+class SearchTestCase(TestCase):
+    def setUp(self):
+        self.first_movie = models.Movie.objects.create(
+            title="Terminator", title_en="Terminator", description="A cyborg is sent back in time",
+            world_premiere=date(year=1984, month=10, day=26)
+        )
+        self.second_movie = models.Movie.objects.create(
+            title="Time travel", title_en="Time travel", description="A story about the terminator",
+            world_premiere=date(year=2001, month=1, day=1)
+        )
+        self.draft_movie = models.Movie.objects.create(title="Terminator draft", title_en="Terminator draft",
+                                                       draft=True)
+        self.actor = models.Actor.objects.create(name="Arnold Schwarzenegger", name_en="Arnold Schwarzenegger",
+                                                 description="Austrian bodybuilder")
+
+    def test_search_movies_ranks_title_first(self):
+        movies = list(read.search_movies("terminator"))
+        self.assertEqual([self.first_movie, self.second_movie], movies)
+
+    def test_search_movies_by_prefix_of_every_word(self):
+        self.assertEqual([self.first_movie], list(read.search_movies("termin cyborg")))
+        self.assertEqual([], list(read.search_movies("terminator bodybuilder")))
+
+    def test_search_movies_with_empty_query(self):
+        self.assertEqual([self.second_movie, self.first_movie], list(read.search_movies("")))
+
+    def test_search_actors_directors(self):
+        self.assertEqual([self.actor], list(read.search_actors_directors("schwarz")))
+        self.assertEqual([self.actor], list(read.search_actors_directors("bodybuilder")))
+
+    def test_search_index_is_updated(self):
+        self.assertEqual([], list(read.search_movies("predator")))
+        new_movie = models.Movie.objects.create(title="Predator", title_en="Predator")
+        self.assertEqual([new_movie], list(read.search_movies("predator")))
+
+
+class TrigramIndexTestCase(TestCase):
+    def setUp(self):
+        self.index = suggest.TrigramIndex()
+        self.index.update(suggest.MOVIE, 1, "terminator", ("Терминатор", "Terminator"))
+        self.index.update(suggest.MOVIE, 2, "terminal", ("Терминал", "The Terminal"))
+        self.index.update(suggest.ACTOR, 1, "arnold", ("Арнольд Шварценеггер", "Arnold Schwarzenegger"))
+
+    def test_search_by_prefix(self):
+        self.assertEqual([1, 2], [suggestion.pk for suggestion in self.index.search("termin")])
+        self.assertEqual(["Terminator", "The Terminal"],
+                         [suggestion.text for suggestion in self.index.search("terminator")])
+
+    def test_search_with_typo(self):
+        suggestions = self.index.search("терминатар")
+        self.assertEqual((suggest.MOVIE, 1, "Терминатор"), (suggestions[0].kind, suggestions[0].pk, suggestions[0].text))
+        self.assertEqual([suggest.ACTOR], [suggestion.kind for suggestion in self.index.search("шварцнегер")])
+
+    def test_update_and_remove(self):
+        self.index.update(suggest.MOVIE, 2, "terminal", ("Терминал",))
+        self.assertEqual("Терминал", self.index.search("терминал")[0].text)
+        self.assertNotIn("The Terminal", [suggestion.text for suggestion in self.index.search("the terminal")])
+
+        self.index.remove(suggest.MOVIE, 1)
+        self.assertEqual([2], [suggestion.pk for suggestion in self.index.search("термин")])
+        self.assertEqual(2, len(self.index))
+
+    def test_search_limit(self):
+        self.assertEqual(1, len(self.index.search("termin", number=1)))
+        self.assertEqual([], self.index.search("   "))
+
+    def test_updates_are_compacted(self):
+        with mock.patch.object(suggest, "COMPACTION_MIN_DEAD_SLOTS", 10):
+            for _ in range(50):
+                self.index.update(suggest.ACTOR, 1, "arnold", ("Арнольд Шварценеггер", "Arnold Schwarzenegger"))
+        self.assertLessEqual(self.index.slots_number, 2 * 6 + 10)
+        self.assertEqual(["Arnold Schwarzenegger"], [suggestion.text for suggestion in self.index.search("arnold")])
+
+    def test_exact_match_among_frequent_trigrams(self):
+        for pk in range(3, 3000):
+            self.index.update(suggest.MOVIE, pk, f"movie-{pk}", (f"Movie {pk}",))
+        self.index.update(suggest.MOVIE, 3000, "movie-star", ("Movie star",))
+
+        with mock.patch.object(suggest, "MAX_CANDIDATES", 100):
+            suggestion = self.index.search("movie star")[0]
+        self.assertEqual(("Movie star", 1.0), (suggestion.text, suggestion.similarity))
+
+    def test_search_during_compaction(self):
+        errors = []
+
+        def search():
+            try:
+                for _ in range(200):
+                    self.index.search("terminator")
+            except Exception as exc:
+                errors.append(exc)
+
+        with mock.patch.object(suggest, "COMPACTION_MIN_DEAD_SLOTS", 0):
+            thread = threading.Thread(target=search)
+            thread.start()
+            for _ in range(200):
+                self.index.update(suggest.MOVIE, 1, "terminator", ("Терминатор", "Terminator"))
+            thread.join()
+        self.assertEqual([], errors)
+
+
+class QueryIndexTestCase(TestCase):
+    """Queries of read.py use indexes which were created for them"""
+
+    def setUp(self):
+        self.movie = models.Movie.objects.create(title="Movie", url="movie", year=2000)
+        if connection.vendor == "postgresql":
+            with connection.cursor() as cursor:
+                cursor.execute("SET LOCAL enable_seqscan = off")
+            # on small tables PostgreSQL prefers sequential scan to any index
+
+    def assertUsesIndex(self, queryset, *index_names):
+        plan = queryset.explain()
+        self.assertTrue(any(index_name in plan for index_name in index_names), plan)
+
+    def test_movie_ordering(self):
+        self.assertUsesIndex(read.get_all_movies_ordered_by_parameter("-world_premiere"), "movie_premiere_id_idx")
+        self.assertUsesIndex(read.get_sorted_movies("ascending", sorting="2"), "movie_premiere_id_idx")
+        self.assertUsesIndex(read.get_sorted_movies("descending", sorting="5"), "movie_active_id_idx")
+        self.assertUsesIndex(repositories.MovieRepository().get_most_recently_added_objects(5), "movie_active_id_idx")
+        with translation.override("ru"):
+            self.assertUsesIndex(read.get_sorted_movies("ascending", sorting="3"), "movie_active_title_ru_idx")
+        with translation.override("en"):
+            self.assertUsesIndex(read.get_sorted_movies("ascending", sorting="3"), "movie_active_title_en_idx")
+
+    def test_movie_filtering(self):
+        self.assertUsesIndex(read.get_filtered_movies(years=["2000"], genres=[]), "movie_active_year_idx")
+        self.assertUsesIndex(read.get_filtered_movies(years=["2000"], genres=["1"]), "movie_active_year_idx")
+        with translation.override("ru"):
+            self.assertUsesIndex(
+                repositories.MovieRepository().get_unique_params_dicts(
+                    specification=specifications.UniqueValuesSpecification("country")
+                ),
+                "movie_country_ru_idx"
+            )
+
+    def test_rating_and_reviews(self):
+        self.assertUsesIndex(
+            read.get_rating_set_by_parameters(ip="127.0.0.1", movie=self.movie.pk),
+            "rating_ip_movie_unique", "sqlite_autoindex_Rating"
+        )
+        # отзывы страницы фильма читаются в get_movie_for_detail_page запросом prefetch_related
+        self.assertUsesIndex(
+            models.Review.objects.filter(movie_id__in=[self.movie.pk], parent_id__isnull=True),
+            "review_movie_parent_idx"
+        )
+
+    def test_rating_is_unique_for_ip_and_movie(self):
+        star = models.RatingStar.objects.create(value=1)
+        models.Rating.objects.create(ip="127.0.0.1", star=star, movie=self.movie)
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            models.Rating.objects.create(ip="127.0.0.1", star=star, movie=self.movie)
+
+
+@override_settings(CACHES={
+    "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+    "shared": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache", "LOCATION": "shared"},
+})
+class TieredCacheTestCase(TestCase):
+    def setUp(self):
+        caches["shared"].clear()
+        self.cache = TieredCache("", {"OPTIONS": {"SHARED_ALIAS": "shared", "LOCAL_TIMEOUT": 60, "MAX_ENTRIES": 2}})
+
+    def test_local_and_shared_levels(self):
+        self.cache.set("genres", ["action"], 60)
+        self.assertEqual(["action"], caches["shared"].get("genres"))
+
+        caches["shared"].set("genres", ["drama"])
+        self.assertEqual(["action"], self.cache.get("genres"))
+
+        other_process_cache = TieredCache("", {"OPTIONS": {"SHARED_ALIAS": "shared"}})
+        self.assertEqual(["drama"], other_process_cache.get("genres"))
+        self.assertEqual(["drama"], other_process_cache.get("genres"))
+        self.assertEqual(None, other_process_cache.get("years"))
+        self.assertEqual(
+            {"local_hits": 1, "shared_hits": 1, "misses": 1, "computations": 0}, other_process_cache.get_stats()
+        )
+
+        self.cache.delete("genres")
+        self.assertEqual(None, self.cache.get("genres"))
+        self.assertEqual(None, caches["shared"].get("genres"))
+
+    def test_counter_is_shared_by_processes(self):
+        other_process_cache = TieredCache("", {"OPTIONS": {"SHARED_ALIAS": "shared", "LOCAL_TIMEOUT": 60}})
+        self.cache.add("version", 100, None)
+        self.assertEqual(100, other_process_cache.get_counter("version"))
+        self.assertEqual(100, other_process_cache.get("version"))
+
+        self.assertEqual(101, self.cache.incr("version"))
+        self.assertEqual(101, self.cache.get_counter("version"))
+        self.assertEqual(101, other_process_cache.get_counter("version"))
+        self.assertEqual(None, other_process_cache.get_counter("absent"))
+
+    def test_local_level_is_limited(self):
+        for key in ("first", "second", "third"):
+            self.cache.set(key, key)
+        caches["shared"].clear()
+
+        self.assertEqual(None, self.cache.get("first"))
+        self.assertEqual("third", self.cache.get("third"))
+
+    def test_get_or_set_computes_value_once(self):
+        computations = []
+        start = threading.Event()
+
+        def compute():
+            computations.append(1)
+            start.wait(1)
+            return "value"
+
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(self.cache.get_or_set("key", compute, 60)))
+                   for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        start.set()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(1, len(computations))
+        self.assertEqual(["value"] * 8, results)
+        self.assertEqual(1, self.cache.get_stats()["computations"])
+
+    def test_get_or_set_waits_for_other_process(self):
+        caches["shared"].add("key:lock", 1)
+        threading.Timer(0.1, lambda: caches["shared"].set("key", "computed by other process")).start()
+
+        self.assertEqual("computed by other process", self.cache.get_or_set("key", lambda: "own value", 60))
+        self.assertEqual(0, self.cache.get_stats()["computations"])
+
+
+class UserCacheTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.first_user = User.objects.create_user("first")
+        self.second_user = User.objects.create_user("second")
+        self.first_movie = models.Movie.objects.create(title="First movie", url="first-movie")
+        self.second_movie = models.Movie.objects.create(title="Second movie", url="second-movie")
+
+    def test_user_data_is_isolated(self):
+        create.add_movie_to_user_movie_list(user=self.first_user, movie=self.first_movie)
+
+        self.assertEqual([self.first_movie], read.get_most_recently_added_user_movies(self.first_user))
+        self.assertEqual([], read.get_most_recently_added_user_movies(self.second_user))
+        self.assertEqual(True, read.is_movie_in_user_watchlist(self.first_movie, self.first_user))
+        self.assertEqual(False, read.is_movie_in_user_watchlist(self.first_movie, self.second_user))
+
+    def test_invalidation_is_targeted(self):
+        read.get_all_user_movies(self.first_user)
+        read.get_all_user_movies(self.second_user)
+        first_version = user_cache.get_user_cache_version(self.first_user.pk)
+
+        create.add_movie_to_user_movie_list(user=self.second_user, movie=self.second_movie)
+
+        self.assertEqual(first_version, user_cache.get_user_cache_version(self.first_user.pk))
+        with self.assertNumQueries(0):
+            self.assertEqual([], read.get_all_user_movies(self.first_user))
+        self.assertEqual([self.second_movie], read.get_all_user_movies(self.second_user))
+
+    def test_clear_movie_watchers_resets_only_them(self):
+        create.add_movie_to_user_movie_list(user=self.first_user, movie=self.first_movie)
+        create.add_movie_to_user_movie_list(user=self.second_user, movie=self.second_movie)
+        first_version = user_cache.get_user_cache_version(self.first_user.pk)
+        second_version = user_cache.get_user_cache_version(self.second_user.pk)
+
+        self.first_movie.user_movies.clear()
+
+        self.assertNotEqual(first_version, user_cache.get_user_cache_version(self.first_user.pk))
+        self.assertEqual(second_version, user_cache.get_user_cache_version(self.second_user.pk))
+        self.assertEqual([], read.get_all_user_movies(self.first_user))
+
+    def test_watchlist_change_is_visible_in_other_process(self):
+        first_process, second_process = (
+            TieredCache("", {"OPTIONS": {"SHARED_ALIAS": "shared", "LOCAL_TIMEOUT": 60}}) for _ in range(2)
+        )
+        with self.in_process(second_process):
+            self.assertEqual([], read.get_all_user_movies(self.first_user))
+        with self.in_process(first_process):
+            create.add_movie_to_user_movie_list(user=self.first_user, movie=self.first_movie)
+        with self.in_process(second_process):
+            self.assertEqual([self.first_movie], read.get_all_user_movies(self.first_user))
+
+    @staticmethod
+    @contextmanager
+    def in_process(process_cache: TieredCache):
+        with mock.patch.object(user_cache, "cache", process_cache), \
+                mock.patch.object(cache_versions, "cache", process_cache):
+            yield
+
+    def test_hit_rate(self):
+        stats = user_cache.get_stats()
+        for _ in range(4):
+            read.is_movie_in_user_watchlist(self.first_movie, self.first_user)
+        new_stats = user_cache.get_stats()
+
+        self.assertEqual(3, new_stats["hits"] - stats["hits"])
+        self.assertEqual(1, new_stats["misses"] - stats["misses"])
+        self.assertGreater(user_cache.get_hit_rate(), 0)
+
+
+class MovieDetailTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user("user")
+        self.star = models.RatingStar.objects.create(value=4)
+        self.small_movie = self._create_movie("small-movie", cast_size=1, reviews_number=1)
+        self.big_movie = self._create_movie("big-movie", cast_size=10, reviews_number=10)
+
+    def _create_movie(self, url: str, cast_size: int, reviews_number: int) -> models.Movie:
+        movie = models.Movie.objects.create(title=url, url=url)
+        for number in range(cast_size):
+            movie.actors.add(models.Actor.objects.create(name=f"{url} actor {number}", url=f"{url}-actor-{number}"))
+            movie.directors.add(models.Actor.objects.create(name=f"{url} director {number}",
+                                                            url=f"{url}-director-{number}"))
+            movie.genres.add(models.Genre.objects.create(name=f"{url} genre {number}", url=f"{url}-genre-{number}"))
+            models.MovieShots.objects.create(title=f"{url} shot {number}", image="shot.jpg", movie=movie)
+        for number in range(reviews_number):
+            review = models.Review.objects.create(name="user", text="text", email="user@mail.com", movie=movie)
+            models.Review.objects.create(name="user", text="answer", email="user@mail.com", movie=movie, parent=review)
+        models.Rating.objects.create(ip="127.0.0.1", star=self.star, movie=movie)
+        return movie
+
+    def test_get_movie_for_detail_page(self):
+        request = RequestFactory().get("/", REMOTE_ADDR="127.0.0.1")
+        request.user = self.user
+        create.add_movie_to_user_movie_list(user=self.user, movie=self.big_movie)
+
+        with self.assertNumQueries(8):
+            movie = read.get_movie_for_detail_page(slug="big-movie", request=request)
+            actors, reviews = list(movie.actors.all()), movie.parent_reviews
+            child_reviews = [child for review in reviews for child in review.child_reviews]
+
+        self.assertEqual((10, 10, 10, 20), (len(actors), len(reviews), len(child_reviews), movie.reviews_number))
+        self.assertEqual((4, 4.0, True), (movie.user_rating, movie.average_rating, movie.is_in_watchlist))
+
+    def test_number_of_queries_does_not_depend_on_movie_size(self):
+        self.client.force_login(self.user)
+        # pages of anonymous users are cached
+        self.client.get(self.small_movie.get_absolute_url())
+        # the first request fills cache of the sidebar
+        numbers = []
+        for movie in (self.small_movie, self.big_movie):
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(movie.get_absolute_url())
+            self.assertEqual(200, response.status_code)
+            numbers.append(len(queries))
+
+        self.assertEqual(numbers[0], numbers[1])
+
+
+class PageCacheTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.movie = models.Movie.objects.create(title="Terminator", url="terminator", poster="poster.jpg")
+        self.url = self.movie.get_absolute_url()
+
+    def test_catalogue_version_is_shared_by_processes(self):
+        first_process, second_process = (
+            TieredCache("", {"OPTIONS": {"SHARED_ALIAS": "shared", "LOCAL_TIMEOUT": 60}}) for _ in range(2)
+        )
+        with mock.patch.object(cache_versions, "cache", second_process):
+            version = page_cache.get_catalogue_version()
+        with mock.patch.object(cache_versions, "cache", first_process):
+            page_cache.reset_catalogue_pages()
+        with mock.patch.object(cache_versions, "cache", second_process):
+            self.assertEqual(version + 1, page_cache.get_catalogue_version())
+
+    def test_anonymous_page_is_served_from_cache(self):
+        first_response = self.client.get(self.url)
+        with self.assertNumQueries(0):
+            second_response = self.client.get(self.url)
+
+        self.assertEqual(200, second_response.status_code)
+        self.assertNotIn(page_cache.CSRF_PLACEHOLDER, second_response.content.decode())
+        self.assertIn('name="csrfmiddlewaretoken"', second_response.content.decode())
+        self.assertEqual(len(first_response.content.decode()), len(second_response.content.decode()))
+
+    def test_page_is_reset_after_changes(self):
+        self.client.get(self.url)
+        models.Review.objects.create(name="Reviewer", text="Great movie", email="user@mail.com", movie=self.movie)
+        self.assertIn("Great movie", self.client.get(self.url).content.decode())
+
+        self.client.get(reverse("home"))
+        self.movie.title = "Terminator 2"
+        self.movie.save()
+        self.assertIn("Terminator 2", self.client.get(reverse("home")).content.decode())
+
+    def test_authenticated_user_page_is_not_cached(self):
+        self.client.force_login(User.objects.create_user("user"))
+        self.client.get(self.url)
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(self.url)
+        self.assertGreater(len(queries), 0)
+
+    def test_actor_page_view_does_not_write(self):
+        actor = models.Actor.objects.create(name="Actor", birth_date=date(1970, 1, 1))
+        version = page_cache.get_catalogue_version()
+        for _ in range(3):
+            response = self.client.get(actor.get_absolute_url())
+            self.assertEqual(200, response.status_code)
+            self.assertNotIn(db_routing.PIN_COOKIE_NAME, response.cookies)
+        self.assertEqual(version, page_cache.get_catalogue_version())
+
+        models.Actor.objects.filter(pk=actor.pk).update(age=0)
+        self.client.get(actor.get_absolute_url())
+        actor.refresh_from_db()
+        self.assertEqual(crud_utils.calculate_age(birth_date=actor.birth_date, death_date=None), actor.age)
+
+
+class CryptoCurrencySortingTestCase(TestCase):
+    @staticmethod
+    def _data() -> crypto_currency_api.CryptoCurrencyData:
+        coins = [
+            {"number": 1, "name": "Bitcoin", "price": "40,000.00", "raw": {"price": 40000.0}},
+            {"number": 2, "name": "Ethereum", "price": "3,000.00", "raw": {"price": 3000.0}},
+            {"number": 3, "name": "Tether", "price": "1.00", "raw": {"price": 1.0004}},
+            {"number": 4, "name": "Dollar", "price": "1.00", "raw": {"price": 0.9998}},
+            {"number": 5, "name": "Old", "price": "950.50"},
+        ]
+        return crypto_currency_api.CryptoCurrencyData(error_message="", last_updated="", crypto_currencies_list=coins)
+
+    @staticmethod
+    def _sort(sorting: str) -> list:
+        data = crypto_currency_sorting.sort_crypto_currency(sorting, CryptoCurrencySortingTestCase._data())
+        return [coin["number"] for coin in data.crypto_currencies_list]
+
+    def test_numeric_columns_are_sorted_by_raw_values(self):
+        self.assertEqual([4, 3, 5, 2, 1], self._sort("ascending:2"))
+        self.assertEqual([1, 2, 5, 3, 4], self._sort("descending:2"))
+
+    def test_text_and_number_columns(self):
+        self.assertEqual([1, 4, 2, 5, 3], self._sort("ascending:1"))
+        self.assertEqual([5, 4, 3, 2, 1], self._sort("descending:0"))
+
+    def test_unknown_sorting_keeps_order(self):
+        self.assertEqual([1, 2, 3, 4, 5], self._sort("ascending:9"))
+        self.assertEqual([1, 2, 3, 4, 5], self._sort("None"))
+
+
+class CryptoCurrencyPageTestCase(TestCase):
+    def setUp(self):
+        coins = [
+            {"number": number, "name": f"Coin {number}", "symbol": f"C{number}",
+             "raw": {"price": 1000.25 * number, "percent_change_24h": -number - 0.25, "percent_change_7d": None,
+                     "percent_change_30d": 0.5}}
+            for number in range(1, 5001)
+        ]
+        snapshot = crypto_currency_api.CryptoCurrencyData(error_message="", last_updated="",
+                                                          crypto_currencies_list=coins)
+        patcher = mock.patch.object(crypto_currency_service, "get_read_data", lambda: snapshot)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_only_window_is_formatted(self):
+        with mock.patch.object(crypto_currency_service, "format_crypto_currency_value",
+                               wraps=crypto_currency_service.format_crypto_currency_value) as format_value:
+            page = crypto_currency_service.get_crypto_currency_page(offset=4990, limit=20, columns=("number", "price"))
+
+        self.assertEqual(list(range(4991, 5001)), [coin["number"] for coin in page.crypto_currencies_list])
+        self.assertEqual({"number": 4991, "price": "4,992,247.75"}, page.crypto_currencies_list[0])
+        self.assertEqual(10, format_value.call_count)
+        self.assertEqual((5000, 4970, None), (page.count, page.previous_offset, page.next_offset))
+
+    def test_whole_snapshot_is_sorted_before_windowing(self):
+        page = crypto_currency_service.get_crypto_currency_page(offset=0, limit=3, sorting="descending:2")
+        self.assertEqual([5000, 4999, 4998], [coin["number"] for coin in page.crypto_currencies_list])
+        self.assertEqual("-5,000.25", page.crypto_currencies_list[0]["percent_change_24h"])
+        self.assertEqual("", page.crypto_currencies_list[0]["percent_change_7d"])
+        self.assertEqual(3, page.next_offset)
+
+    def test_invalid_window_values(self):
+        page = crypto_currency_service.get_crypto_currency_page(offset="-5", limit="many")
+        self.assertEqual((0, crypto_currency_service.DEFAULT_LIMIT), (page.offset, page.limit))
+        self.assertIsNone(page.previous_offset)
+
+
+class ExternalDataSnapshotTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        for module in (weather_json_recording, currency_json_recording):
+            patcher = mock.patch.object(module.SNAPSHOT_STORE, "path", Path(directory.name) / module.__name__)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    @staticmethod
+    def _weather_data(temperature: int, minutes_ago: int = 0) -> weather_api.WeatherData:
+        return weather_api.WeatherData(
+            error_message="",
+            last_updated=str(datetime.now() - timedelta(minutes=minutes_ago)),
+            current_weather={"temp": temperature},
+            weather_forecast=[]
+        )
+
+    def test_outdated_snapshot_is_returned_without_waiting_for_api(self):
+        with mock.patch.object(weather_json_recording, "get_yandex_weather_data",
+                               return_value=self._weather_data(10, minutes_ago=60)):
+            self.assertTrue(weather_json_recording.refresh_data())
+
+        is_called = threading.Event()
+        can_answer = threading.Event()
+
+        def slow_api():
+            is_called.set()
+            can_answer.wait(5)
+            return self._weather_data(20)
+
+        with mock.patch.object(weather_json_recording, "get_yandex_weather_data", slow_api):
+            self.assertEqual({"temp": 10}, weather_json_recording.get_read_data().current_weather)
+            self.assertTrue(is_called.wait(5))
+            can_answer.set()
+            for thread in threading.enumerate():
+                if thread.name == "refresh_weather":
+                    thread.join(5)
+
+        self.assertEqual({"temp": 20}, weather_json_recording.get_read_data().current_weather)
+        self.assertFalse(weather_json_recording.is_outdated())
+
+    def test_snapshot_is_refreshed_once_at_a_time(self):
+        results = []
+        is_called = threading.Event()
+        can_finish = threading.Event()
+
+        def slow_refresh():
+            is_called.set()
+            return can_finish.wait(5)
+
+        thread = snapshot_refresh.refresh_in_background("test", slow_refresh)
+        self.assertTrue(is_called.wait(5))
+        results.append(snapshot_refresh.refresh_snapshot("test", lambda: True))
+        self.assertIsNone(snapshot_refresh.refresh_in_background("test", lambda: True))
+        can_finish.set()
+        thread.join(5)
+        results.append(snapshot_refresh.refresh_snapshot("test", lambda: True))
+
+        self.assertEqual([False, True], results)
+
+    def test_snapshots_are_refreshed_concurrently(self):
+        barrier = threading.Barrier(2, timeout=5)
+
+        def refresh():
+            barrier.wait()
+            return True
+
+        results = snapshot_refresh.refresh_concurrently({"first": refresh, "second": refresh})
+        self.assertEqual({"first": True, "second": True}, results)
+
+    def test_snapshot_is_parsed_once_until_replaced(self):
+        store = weather_json_recording.SNAPSHOT_STORE
+        store.write({"last_updated": "first"})
+        with mock.patch.object(snapshot_store.json, "load", wraps=json.load) as load:
+            for _ in range(3):
+                self.assertEqual({"last_updated": "first"}, store.read())
+            store.write({"last_updated": "second"})
+            self.assertEqual({"last_updated": "second"}, store.read())
+
+        self.assertEqual(2, load.call_count)
+        self.assertEqual([store.path.name], [path.name for path in store.path.parent.glob(f"*{store.path.name}")])
+
+    def test_snapshot_is_refreshed_by_one_process(self):
+        store = weather_json_recording.SNAPSHOT_STORE
+        other_process_store = snapshot_store.JSONSnapshotStore(store.path.name)
+        other_process_store.path = store.path
+
+        with store.lock() as is_locked, other_process_store.lock() as is_other_locked:
+            self.assertTrue(is_locked)
+            self.assertFalse(is_other_locked)
+        self.assertTrue(other_process_store.refresh(lambda: {"last_updated": "new"}, lambda data: False))
+        self.assertFalse(other_process_store.refresh(lambda: {"last_updated": "newer"}, lambda data: False))
+        self.assertEqual({"last_updated": "new"}, store.read())
+
+    def test_currency_rates_are_archived(self):
+        def get_cbr_data(specific_date=None):
+            value = 60.5 if specific_date else 90.25
+            return currency_api.CurrencyData(error_message="", last_updated=str(datetime.now()), currencies_list=[
+                {"NumCode": "840", "CharCode": "USD", "Nominal": 1, "Name": "Доллар США", "Value": value,
+                 "Previous": value}
+            ], rates_date=specific_date or date(2022, 3, 26))
+
+        with mock.patch.object(currency_json_recording, "get_cbr_data", side_effect=get_cbr_data) as api:
+            currency_json_recording.refresh_data(force=True)
+            for _ in range(2):
+                past_data = currency_json_recording.get_read_data(date(2020, 1, 1))
+            current_data = currency_json_recording.get_read_data(None)
+
+        self.assertEqual(60.5, past_data.currencies_list[0]["Value"])
+        self.assertEqual(90.25, current_data.currencies_list[0]["Value"])
+        self.assertEqual(2, api.call_count)
+        self.assertEqual(1, models.CurrencyRate.objects.filter(date=date(2020, 1, 1)).count())
+        self.assertEqual(90.25, float(models.CurrencyRate.objects.get(date=date(2022, 3, 26)).value))
+
+    def test_command_refreshes_only_outdated_snapshots(self):
+        refreshed = []
+        output = StringIO()
+
+        def refresh(name):
+            return lambda force: refreshed.append(name) or True
+
+        with mock.patch.object(weather_json_recording, "is_outdated", return_value=True), \
+                mock.patch.object(currency_json_recording, "is_outdated", return_value=False), \
+                mock.patch.object(weather_json_recording, "refresh_data", refresh("weather")), \
+                mock.patch.object(currency_json_recording, "refresh_data", refresh("currency")):
+            call_command("refresh_external_data", "weather", "currency", stdout=output)
+
+        self.assertEqual(["weather"], refreshed)
+        self.assertIn("Snapshot 'weather' was refreshed", output.getvalue())
+
+
+class StubAPIHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    connections = 0
+    requests = 0
+
+    def setup(self):
+        super().setup()
+        StubAPIHandler.connections += 1
+
+    def do_GET(self):
+        StubAPIHandler.requests += 1
+        if self.path == "/slow":
+            time.sleep(0.5)
+        status_code = 500 if self.path == "/error" else 200
+        body = json.dumps({"path": self.path}).encode()
+        try:
+            self.send_response(status_code)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        except (BrokenPipeError, ConnectionResetError):
+            # клиент не дождался ответа
+            pass
+
+    def log_message(self, *args):
+        pass
+
+
+class HTTPClientTestCase(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), StubAPIHandler)
+        cls.server.daemon_threads = True
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.url = f"http://127.0.0.1:{cls.server.server_address[1]}"
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        super().tearDownClass()
+
+    def setUp(self):
+        StubAPIHandler.connections = StubAPIHandler.requests = 0
+        self.addCleanup(http_client.reset_clients)
+
+    def test_connection_is_reused(self):
+        client = http_client.get_client("stub")
+        for _ in range(3):
+            self.assertEqual({"path": "/ok"}, client.get(f"{self.url}/ok", endpoint="ok").json())
+
+        self.assertIs(client, http_client.get_client("stub"))
+        self.assertEqual(1, StubAPIHandler.connections)
+        self.assertEqual(3, http_client.get_stats()["stub"]["endpoints"]["ok"]["count"])
+
+    def test_read_timeout(self):
+        client = http_client.get_client("stub", timeout=(1, 0.1))
+        with self.assertRaises(api_utils.return_base_requests_exceptions()):
+            client.get(f"{self.url}/slow", endpoint="slow")
+        self.assertEqual(1, client.get_stats()["endpoints"]["slow"]["count"])
+
+    def test_circuit_breaker(self):
+        client = http_client.get_client("stub", failure_threshold=2, reset_timeout=0.2)
+        for _ in range(2):
+            self.assertEqual(500, client.get(f"{self.url}/error", endpoint="error").status_code)
+
+        with self.assertRaises(api_utils.return_base_requests_exceptions()):
+            client.get(f"{self.url}/ok", endpoint="ok")
+        self.assertEqual(("open", 2), (client.circuit_breaker.state, StubAPIHandler.requests))
+
+        time.sleep(0.25)
+        self.assertEqual(200, client.get(f"{self.url}/ok", endpoint="ok").status_code)
+        self.assertEqual("closed", client.circuit_breaker.state)
+
+    def test_unavailable_provider_returns_error_message(self):
+        client = mock.Mock()
+        client.get.side_effect = http_client.CircuitOpenError("cbr")
+        with mock.patch.object(http_client, "get_client", return_value=client):
+            currency_data = currency_api.get_cbr_data(date(2022, 3, 1))
+            crypto_currency_data = crypto_currency_api.get_coin_market_cap_data(limit="10")
+
+        self.assertEqual(([], api_utils.return_error_message()),
+                         (currency_data.currencies_list, currency_data.error_message))
+        self.assertEqual(([], api_utils.return_error_message()),
+                         (crypto_currency_data.crypto_currencies_list, crypto_currency_data.error_message))
+
+
+class RatingEnrichmentTestCase(TestCase):
+    def setUp(self):
+        self.first_movie = models.Movie.objects.create(title="First movie", url="first-movie")
+        self.second_movie = models.Movie.objects.create(title="Second movie", url="second-movie")
+        self.rated_movie = models.Movie.objects.create(title="Rated movie", url="rated-movie")
+        models.OtherSourcesRating.objects.create(
+            movie=self.rated_movie, rating={"imDb": "7.0"}, refreshed_at=timezone.now()
+        )
+
+    @staticmethod
+    def get_movie_rating(movie_title: str):
+        return {"imDb": "8.0", "metacritic": "70", "rottenTomatoes": "90"} if movie_title == "First movie" else None
+
+    def test_enqueue_movies(self):
+        movie_ids = [self.first_movie.pk, self.second_movie.pk, self.rated_movie.pk]
+        self.assertEqual(2, rating_enrichment.enqueue_movies(movie_ids))
+        rating_enrichment.enqueue_movies(movie_ids)
+        self.assertEqual(
+            {self.first_movie.pk, self.second_movie.pk},
+            set(models.RatingEnrichmentTask.objects.values_list("movie_id", flat=True))
+        )
+
+    def test_process_batch(self):
+        rating_enrichment.enqueue_movies([self.first_movie.pk, self.second_movie.pk])
+        with mock.patch.object(movies_api, "get_movie_rating", side_effect=self.get_movie_rating):
+            self.assertEqual((1, 1), rating_enrichment.process_batch(rate=100))
+            self.assertEqual((0, 0), rating_enrichment.process_batch(rate=100))
+
+        rating = models.OtherSourcesRating.objects.get(movie=self.first_movie)
+        self.assertEqual("8.0", rating.rating["imDb"])
+        self.assertIsNotNone(rating.refreshed_at)
+        task = models.RatingEnrichmentTask.objects.get()
+        self.assertEqual((self.second_movie.pk, 1), (task.movie_id, task.attempts))
+        self.assertGreater(task.available_at, timezone.now())
+
+    def test_exhausted_tasks_are_deleted(self):
+        rating_enrichment.enqueue_movies([self.second_movie.pk])
+        with mock.patch.object(movies_api, "get_movie_rating", side_effect=self.get_movie_rating):
+            for _ in range(rating_enrichment.MAX_ATTEMPTS):
+                self.assertEqual((0, 1), rating_enrichment.process_batch(rate=100))
+                models.RatingEnrichmentTask.objects.update(available_at=timezone.now())
+
+        self.assertFalse(models.RatingEnrichmentTask.objects.exists())
+        self.assertEqual(1, rating_enrichment.enqueue_movies([self.second_movie.pk]))
+        self.assertEqual(0, models.RatingEnrichmentTask.objects.get().attempts)
+
+    def test_expired_last_attempt_is_deleted(self):
+        models.RatingEnrichmentTask.objects.create(
+            movie=self.first_movie, attempts=rating_enrichment.MAX_ATTEMPTS, available_at=timezone.now()
+        )
+        task_repository = repositories.RatingEnrichmentTaskRepository()
+        self.assertEqual([], task_repository.claim(batch_size=10, lease=timedelta(minutes=1),
+                                                      max_attempts=rating_enrichment.MAX_ATTEMPTS))
+        self.assertFalse(models.RatingEnrichmentTask.objects.exists())
+
+    def test_enqueue_stale_ratings(self):
+        stale_movie = models.Movie.objects.create(title="Stale movie", url="stale-movie")
+        models.OtherSourcesRating.objects.create(
+            movie=stale_movie, rating={"imDb": "6.0"}, refreshed_at=timezone.now() - timedelta(days=31)
+        )
+        unknown_movie = models.Movie.objects.create(title="Unknown movie", url="unknown-movie")
+        models.OtherSourcesRating.objects.create(movie=unknown_movie, rating={"imDb": "5.0"})
+
+        rating_enrichment.enqueue_stale_ratings(ttl=timedelta(days=30))
+        self.assertEqual(
+            {stale_movie.pk, unknown_movie.pk},
+            set(models.RatingEnrichmentTask.objects.values_list("movie_id", flat=True))
+        )
+
+    def test_save_ratings_in_bulk(self):
+        ratings = {movie.pk: {"imDb": "9.0"} for movie in (self.first_movie, self.second_movie, self.rated_movie)}
+        with CaptureQueriesContext(connection) as context:
+            repositories.OtherSourcesRatingRepository().save_ratings(ratings)
+        queries = [query["sql"] for query in context.captured_queries if "SAVEPOINT" not in query["sql"]]
+        self.assertEqual(["SELECT", "UPDATE", "INSERT"], [query.split()[0] for query in queries])
+        self.assertEqual(3, models.OtherSourcesRating.objects.filter(rating__imDb="9.0").count())
+
+    def test_fetch_ratings_concurrency(self):
+        running = []
+        max_running = []
+        lock = threading.Lock()
+
+        def get_movie_rating(movie_title: str):
+            with lock:
+                running.append(movie_title)
+                max_running.append(len(running))
+            time.sleep(0.05)
+            with lock:
+                running.remove(movie_title)
+            return {"imDb": movie_title}
+
+        titles = {number: f"Movie {number}" for number in range(8)}
+        with mock.patch.object(movies_api, "get_movie_rating", side_effect=get_movie_rating):
+            ratings = rating_enrichment.fetch_ratings(titles, concurrency=3, rate=1000)
+
+        self.assertEqual({number: {"imDb": title} for number, title in titles.items()}, ratings)
+        self.assertEqual(3, max(max_running))
+
+    def test_rate_limiter(self):
+        rate_limiter = rating_enrichment.RateLimiter(rate=50)
+        start = time.monotonic()
+        for _ in range(6):
+            rate_limiter.wait()
+        self.assertGreaterEqual(time.monotonic() - start, 0.1)
+
+    def test_enrich_movie_ratings_command(self):
+        with mock.patch.object(movies_api, "get_movie_rating", side_effect=self.get_movie_rating):
+            call_command("enrich_movie_ratings", "--all", "--rate", "100", stdout=StringIO())
+
+        self.assertTrue(models.OtherSourcesRating.objects.filter(movie=self.first_movie).exists())
+        self.assertEqual(1, models.RatingEnrichmentTask.objects.count())
+
+
+class TransliterationTestCase(TestCase):
+    def test_slugify(self):
+        self.assertEqual("vojna-i-mir", transliteration.slugify("Война и мир"))
+        self.assertEqual("pobeg-iz-shoushenka", transliteration.slugify("ПОБЕГ из Шоушенка"))
+        self.assertEqual("yizhak-u-tumani", transliteration.slugify("Їжак у тумані"))
+        self.assertEqual("usyo-yevropa-ganok", transliteration.slugify("Ўсё: Європа — Ґанок!"))
+        self.assertEqual("podezd-matrix-2", transliteration.slugify(" Подъезд  Matrix 2 "))
+
+    def test_slugify_many(self):
+        texts = ["Война и мир", "", "ПОБЕГ\nиз Шоушенка", "--Café--", "_Ёлки_"]
+        self.assertEqual([transliteration.slugify(text) for text in texts], transliteration.slugify_many(texts))
+        self.assertEqual(["vojna-i-mir", "", "pobeg-iz-shoushenka", "cafe", "yolki"],
+                         transliteration.slugify_many(texts))
+        self.assertEqual([], transliteration.slugify_many([]))
+
+
+class RandomMoviesTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.drama = models.Genre.objects.create(name="Drama", url="drama")
+        self.movies = [
+            models.Movie.objects.create(title=f"Movie {number}", country="USA" if number % 2 else "France",
+                                        world_premiere=date(2000 + number, 1, 1))
+            for number in range(20)
+        ]
+        models.Movie.objects.create(title="Draft movie", draft=True)
+        for movie in self.movies[:5]:
+            movie.genres.add(self.drama)
+
+    def test_permutation(self):
+        for size in (1, 2, 3, 7, 16, 17, 100):
+            for seed in (0, 1, 12345):
+                with self.subTest(size=size, seed=seed):
+                    self.assertEqual(list(range(size)),
+                                     sorted(random_movies._permute(index, size, seed) for index in range(size)))
+
+    def test_get_random_movies(self):
+        movies = read.get_random_movies(movies_number=5)
+        self.assertEqual(5, len({movie.pk for movie in movies}))
+        self.assertEqual(set(self.movies), set(read.get_random_movies(movies_number=100)))
+
+        with self.assertNumQueries(1):
+            read.get_random_movies(movies_number=3)
+
+        movie_filter = random_movies.MovieFilter(genres=(self.drama.pk, ), countries=("USA", ), years=(2000, 2002))
+        self.assertEqual([self.movies[1]], read.get_random_movies(movies_number=5, movie_filter=movie_filter))
+
+    def test_pool_is_reset_with_catalogue(self):
+        self.assertEqual(20, len(random_movies.get_movie_pks()))
+        models.Movie.objects.create(title="New movie")
+        self.assertEqual(21, len(random_movies.get_movie_pks()))
+
+    def test_random_sorting_pages(self):
+        all_movies = read.get_sorted_movies(sorting="4", seed=42)
+        pages = [read.get_sorted_movies(sorting="4", seed=42, page=page) for page in range(1, 5)]
+
+        self.assertEqual(all_movies, [movie for page in pages for movie in page])
+        self.assertEqual([6, 6, 6, 2], [len(page) for page in pages])
+        self.assertEqual({movie.url for movie in self.movies}, {movie["url"] for movie in all_movies})
+        self.assertNotEqual(all_movies, read.get_sorted_movies(sorting="4", seed=43))
+
+    def test_random_sorting_view(self):
+        response = self.client.get(reverse("sorting"), data={"sorting": "4", "page": 1})
+        seed = response.json()["seed"]
+        next_response = self.client.get(reverse("sorting"), data={"sorting": "4", "page": 2, "seed": seed})
+
+        urls = [movie["url"] for movie in response.json()["movies"] + next_response.json()["movies"]]
+        self.assertEqual(12, len(set(urls)))
+        self.assertEqual(seed, next_response.json()["seed"])
+
+
+class SlugsTestCase(TestCase):
+    def setUp(self):
+        models.Movie.objects.create(title="Movie")
+        models.Movie.objects.create(title="Movie 2")
+
+    def test_save_with_taken_slug(self):
+        movies = [models.Movie.objects.create(title="Movie") for _ in range(2)]
+        self.assertEqual(["movie-3", "movie-4"], [movie.url for movie in movies])
+
+        actors = [models.Actor.objects.create(name="Actor") for _ in range(2)]
+        self.assertEqual(["actor", "actor-2"], [actor.url for actor in actors])
+
+    def test_allocate_slugs(self):
+        with self.assertNumQueries(2):
+            allocated_slugs = slugs.allocate_slugs(models.Movie, ["movie", "new-movie", "new-movie", "movie-2", ""])
+        self.assertEqual(["movie-3", "new-movie", "new-movie-2", "movie-2-2", "movie-4"], allocated_slugs)
+
+        with self.assertNumQueries(1):
+            self.assertEqual(["first", "second"], slugs.allocate_slugs(models.Movie, ["first", "second"]))
+
+    def test_save_with_slug_taken_concurrently(self):
+        # адрес "movie" занят между проверкой и INSERT: вторая попытка получает следующий адрес
+        with mock.patch.object(slugs, "allocate_slugs", side_effect=[["movie"], ["movie-3"]]):
+            movie = models.Movie.objects.create(title="Movie")
+        self.assertEqual("movie-3", movie.url)
+
+        with mock.patch.object(slugs, "allocate_slugs", return_value=["movie"]):
+            with self.assertRaises(IntegrityError):
+                models.Movie.objects.create(title="Movie")
+
+
+class MovieImportTestCase(TestCase):
+    def setUp(self):
+        self.category = models.Category.objects.create(name="Films", url="films")
+        self.genre = models.Genre.objects.create(name="Drama", url="drama")
+        self.existing_movie = models.Movie.objects.create(
+            title="Existing movie", url="existing-movie", world_premiere=date(2001, 2, 3), year=2001
+        )
+
+    def test_create_movie_with_relations_in_bulk(self):
+        actors = models.Actor.objects.bulk_create(
+            models.Actor(name=f"Actor {number}", url=f"actor-{number}") for number in range(60)
+        )
+        with CaptureQueriesContext(connection) as context:
+            movie = repositories.MovieRepository().create_new_object({
+                "title": "Cast movie", "url": "cast-movie", "category": self.category,
+                "directors": actors[:1], "actors": actors, "genres": [self.genre],
+            })
+        inserts = [query["sql"] for query in context.captured_queries if query["sql"].startswith("INSERT")]
+
+        self.assertEqual(4, len(inserts))
+        self.assertEqual(60, movie.actors.count())
+        self.assertEqual([self.genre], list(movie.genres.all()))
+
+    def test_import_json_lines(self):
+        lines = [
+            json.dumps({"title": "New movie", "world_premiere": "2005-06-07", "category": "Films",
+                        "genres": ["Drama", "Comedy"], "actors": ["First actor", "Second actor"],
+                        "directors": ["First actor"]}),
+            json.dumps({"title": "New movie", "world_premiere": "2005-01-01"}),
+            json.dumps({"title": "Existing movie", "world_premiere": "2001-02-03"}),
+            "{broken",
+            json.dumps({"title": "Bad budget", "budget": "a lot"}),
+            "",
+        ]
+        result = catalogue_import.import_movies(catalogue_import.read_json_lines(lines), batch_size=2)
+
+        self.assertEqual((1, 2, 2), (result.created, result.skipped, result.failed))
+        self.assertEqual(2, len(result.errors))
+        movie = models.Movie.objects.get(title="New movie")
+        self.assertEqual((self.category, 2005), (movie.category, movie.year))
+        self.assertEqual({"Drama", "Comedy"}, set(movie.genres.values_list("name", flat=True)))
+        self.assertEqual({"First actor", "Second actor"}, set(movie.actors.values_list("name", flat=True)))
+        self.assertEqual(["First actor"], list(movie.directors.values_list("name", flat=True)))
+        self.assertTrue(models.RatingEnrichmentTask.objects.filter(movie=movie).exists())
+
+    def test_rows_are_validated_by_model_fields(self):
+        rows = [
+            {"title": "T" * 101},
+            {"title": "Long country", "country": "C" * 51},
+            {"title": "Long tagline", "tagline_en": "T" * 151},
+            {"title": "Negative budget", "budget": -1},
+            {"title": "Long actor", "actors": ["A" * 101]},
+            {"title": "Valid movie", "country": "C" * 50, "budget": 0},
+        ]
+        result = catalogue_import.import_movies(rows)
+
+        self.assertEqual((1, 0, 5), (result.created, result.skipped, result.failed))
+        self.assertEqual(
+            ["Line 1: 'title'", "Line 2: 'country'", "Line 3: 'tagline_en'", "Line 4: 'budget'", "Line 5: 'actors'"],
+            [error[:error.index("':") + 1] for error in result.errors]
+        )
+        self.assertTrue(models.Movie.objects.filter(title="Valid movie").exists())
+
+    def test_import_csv_allocates_unique_slugs(self):
+        lines = [
+            "title,world_premiere,genres,actors\r\n",
+            "Existing movie,2010-01-01,Drama|Comedy,Some actor\r\n",
+            "Existing movie,2011-01-01,Drama,Some actor|Other actor\r\n",
+        ]
+        result = catalogue_import.import_movies(catalogue_import.read_csv(lines))
+
+        self.assertEqual((2, 0, 0), (result.created, result.skipped, result.failed))
+        self.assertEqual(
+            {"existing-movie", "existing-movie-2", "existing-movie-3"},
+            set(models.Movie.objects.values_list("url", flat=True))
+        )
+        self.assertEqual(2, models.Genre.objects.count())
+        self.assertEqual(2, models.Actor.objects.count())
+
+    def test_export_movies(self):
+        catalogue_import.import_movies([
+            {"title": f"Movie {number}", "category": "Films", "genres": ["Drama"], "actors": ["Actor", "Actress"]}
+            for number in range(3)
+        ])
+        with CaptureQueriesContext(connection) as context:
+            rows = list(catalogue_import.export_movies(chunk_size=2))
+
+        self.assertEqual(1 + 2 * len(catalogue_import.RELATION_FIELDS), len(context.captured_queries))
+        self.assertEqual(["Existing movie", "Movie 0", "Movie 1", "Movie 2"], [row["title"] for row in rows])
+        self.assertEqual(("", [], []), (rows[0]["category"], rows[0]["genres"], rows[0]["actors"]))
+        self.assertEqual(("Films", ["Drama"], ["Actor", "Actress"]),
+                         (rows[1]["category"], rows[1]["genres"], rows[1]["actors"]))
+
+    def test_export_and_import_catalogue_commands(self):
+        catalogue_import.import_movies([{"title": "Exported movie", "genres": ["Drama"], "actors": ["A, B"]}])
+        for file_format in catalogue_import.WRITERS:
+            with self.subTest(file_format=file_format), tempfile.TemporaryDirectory() as directory:
+                path = str(Path(directory) / f"catalogue.{file_format}")
+                call_command("export_catalogue", path, stdout=StringIO())
+                models.Movie.objects.filter(title="Exported movie").delete()
+
+                stdout = StringIO()
+                call_command("import_catalogue", path, "--no-enrichment", stdout=stdout, stderr=StringIO())
+
+                self.assertIn("Created: 1, skipped: 1, failed: 0", stdout.getvalue())
+                movie = models.Movie.objects.get(title="Exported movie")
+                self.assertEqual(["A, B"], list(movie.actors.values_list("name", flat=True)))
+                self.assertFalse(models.RatingEnrichmentTask.objects.filter(movie=movie).exists())
+
+
+class ReplicaView(db_routing.ReplicaReadMixin, View):
+    def get(self, request):
+        return HttpResponse(router.db_for_read(models.Movie))
+
+    def post(self, request):
+        models.RatingStar.objects.create(value=5)
+        return HttpResponse(router.db_for_read(models.Movie))
+
+
+class CachedReplicaView(db_routing.ReplicaReadMixin, page_cache.AnonymousPageCacheMixin, View):
+    def get(self, request):
+        # база выбирается при отрисовке шаблона, как для ленивых QuerySet в ListView
+        return SimpleTemplateResponse(engines["django"].from_string("{{ database }}"), {
+            "database": lambda: router.db_for_read(models.Movie)
+        })
+
+
+class PrimaryView(View):
+    def get(self, request):
+        return HttpResponse(router.db_for_read(models.Movie))
+
+
+@override_settings(DATABASE_REPLICAS=["replica_1"], DATABASE_REPLICA_PIN_SECONDS=10)
+class ReplicaRoutingTestCase(TestCase):
+    def setUp(self):
+        self.factory = RequestFactory()
+
+    def get_response(self, view, request):
+        def handle(request):
+            # как и обработчик Django, шаблон отрисовывается внутри middleware
+            response = middleware.process_view(request, view, (), {}) or view(request)
+            return response.render() if hasattr(response, "render") else response
+
+        middleware = db_routing.ReplicaRoutingMiddleware(handle)
+        return middleware(request)
+
+    def test_reads_go_to_replica(self):
+        response = self.get_response(ReplicaView.as_view(), self.factory.get("/"))
+        self.assertEqual(b"replica_1", response.content)
+        self.assertEqual("default", router.db_for_read(models.Movie))
+
+    def test_sessions_and_users_are_read_from_primary(self):
+        router_instance = db_routing.ReplicaRouter()
+        state = db_routing.RoutingState(is_pinned=False, read_database="replica_1")
+        token = db_routing._state.set(state)
+        try:
+            self.assertEqual("replica_1", router_instance.db_for_read(models.Movie))
+            self.assertIsNone(router_instance.db_for_read(User))
+        finally:
+            db_routing._state.reset(token)
+
+    def test_view_without_mixin_reads_from_primary(self):
+        response = self.get_response(PrimaryView.as_view(), self.factory.get("/"))
+        self.assertEqual(b"default", response.content)
+
+    def test_write_pins_session_to_primary(self):
+        response = self.get_response(ReplicaView.as_view(), self.factory.post("/"))
+        self.assertEqual(b"default", response.content)
+        self.assertIn(db_routing.PIN_COOKIE_NAME, response.cookies)
+
+        request = self.factory.get("/")
+        request.COOKIES[db_routing.PIN_COOKIE_NAME] = response.cookies[db_routing.PIN_COOKIE_NAME].value
+        response = self.get_response(ReplicaView.as_view(), request)
+        self.assertEqual(b"default", response.content)
+        self.assertNotIn(db_routing.PIN_COOKIE_NAME, response.cookies)
+
+    def test_expired_pin(self):
+        request = self.factory.get("/")
+        request.COOKIES[db_routing.PIN_COOKIE_NAME] = str(time.time() - 1)
+        self.assertEqual(b"replica_1", self.get_response(ReplicaView.as_view(), request).content)
+
+    def test_cached_pages_are_rendered_from_primary(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        request = self.factory.get("/")
+        request.user = mock.Mock(is_authenticated=False)
+        response = self.get_response(CachedReplicaView.as_view(), request)
+        self.assertEqual(b"default", response.content)
+        self.assertEqual(b"default", self.get_response(CachedReplicaView.as_view(), request).content)
+
+        request = self.factory.get("/", {"q": "matrix"})
+        request.user = mock.Mock(is_authenticated=False)
+        self.assertEqual(b"replica_1", self.get_response(CachedReplicaView.as_view(), request).content)
+
+
+class GeocodeCacheTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        nominatim_patcher = mock.patch.object(api_utils, "Nominatim")
+        self.geocode = nominatim_patcher.start().return_value.geocode
+        self.addCleanup(nominatim_patcher.stop)
+        self.geocode.return_value = mock.Mock(latitude=59.95, longitude=30.31)
+
+    def test_my_coordinates_are_cached(self):
+        with mock.patch.object(api_utils, "_get_my_geolocation", return_value="Saint Petersburg") as my_geolocation:
+            coordinates = api_utils.get_coordinates()
+            self.assertEqual(coordinates, api_utils.get_coordinates())
+
+        self.assertEqual((59.95, 30.31, "Saint"), (coordinates.latitude, coordinates.longitude, coordinates.city))
+        self.assertEqual(1, my_geolocation.call_count)
+        self.assertEqual(1, self.geocode.call_count)
+
+    def test_place_is_normalized(self):
+        api_utils.get_coordinates("Saint Petersburg")
+        api_utils.get_coordinates("  saint   PETERSBURG ")
+        self.assertEqual(1, self.geocode.call_count)
+
+    def test_not_found_place_is_cached(self):
+        self.geocode.return_value = None
+        for _ in range(2):
+            self.assertEqual("Penza", api_utils.get_coordinates("Atlantis").city)
+        self.assertEqual(1, self.geocode.call_count)
+
+    def test_network_error_is_not_cached(self):
+        self.geocode.side_effect = [api_utils.ConnectionError(), mock.Mock(latitude=59.95, longitude=30.31)]
+        self.assertEqual("Penza", api_utils.get_coordinates("Saint Petersburg").city)
+        self.assertEqual(59.95, api_utils.get_coordinates("Saint Petersburg").latitude)
+        self.assertEqual(2, self.geocode.call_count)
+
+    def test_default_coordinates_are_not_cached_as_mine(self):
+        with mock.patch.object(api_utils, "_get_my_geolocation", return_value=None):
+            api_utils.get_coordinates()
+        self.assertIsNone(cache.get(cache_variables.CACHE_FOR_MY_COORDINATES))
+
+
 class TestAPICase(TestCase):
     def test_currency_api(self):
         results = currency_api.get_cbr_data(None)
@@ -11,15 +11,15 @@ from allauth.account.views import LoginView, SignupView, PasswordResetView, Logo
 
 
 from rating_movies import models, forms
-from rating_movies.services import utils
+from rating_movies.services import utils, page_cache, random_movies
+from rating_movies.services.db_routing import ReplicaReadMixin
 from rating_movies.services.crud import create, read, update, delete
 from rating_movies.permissions import StaffPermissionsMixin
 from rating_movies.services.crud.crud_utils import GenreYear
 
-from rating_movies.services.api.crypto_currency.crypto_currency_service import get_crypto_currency_data
+from rating_movies.services.api.crypto_currency.crypto_currency_service import get_crypto_currency_page
 from rating_movies.services.api.currency.currency_service import get_currency_data
 from rating_movies.services.api.weather.weather_service import get_weather_data
-from rating_movies.services.api.crypto_currency.crypto_currency_sorting import sort_crypto_currency
 
 
 def show_page_not_found(request, exception):
@@ -32,16 +32,21 @@ def show_beautiful_page_not_found(request):
     return render(request, template, context={"previous_url": utils.get_previous_url(request)})
 
 
-class MoviesView(GenreYear, ListView):
+class MoviesView(ReplicaReadMixin, page_cache.AnonymousPageCacheMixin, GenreYear, ListView):
     """Список фильмов"""
     model = models.Movie
     template_name = "rating_movies/main.html"
     queryset = read.get_all_movies_ordered_by_parameter("-world_premiere")
     context_object_name = "movies"
-    paginate_by = 6
+    page_size = 6
+
+    def get_context_data(self, *args, **kwargs):
+        # постраничный вывод по ключу (world_premiere, id) вместо OFFSET и COUNT(*)
+        page = read.get_movies_page(cursor=self.request.GET.get("cursor"), page_size=self.page_size)
+        return super().get_context_data(*args, object_list=page.objects, cursor_page=page, **kwargs)
 
 
-class JsonFilteringMoviesView(ListView):
+class JsonFilteringMoviesView(ReplicaReadMixin, ListView):
     """Movies filtering with ajax"""
     template_name = "rating_movies/main.html"
     context_object_name = "movies"
@@ -68,7 +73,7 @@ class JsonFilteringMoviesView(ListView):
         return self.request.GET.getlist("genre")
 
 
-class JsonSortingMoviesView(ListView):
+class JsonSortingMoviesView(ReplicaReadMixin, ListView):
     """Movies sorting with ajax"""
     template_name = "rating_movies/main.html"
     context_object_name = "movies"
@@ -79,6 +84,9 @@ class JsonSortingMoviesView(ListView):
     def get(self, *args, **kwargs):
         sorting = self.request.GET.get("sorting", "2")  # base sorting by world premiere
         sorting_order = self.request.GET.get("sorting_order", "descending")  # base order by descending
+        if sorting == "4":
+            return self.get_random_order()
+
         queryset = self.get_queryset(sorting=sorting, sorting_order=sorting_order)
 
         if not isinstance(queryset, list):
@@ -86,8 +94,21 @@ class JsonSortingMoviesView(ListView):
 
         return JsonResponse({"movies": queryset})
 
+    def get_random_order(self) -> JsonResponse:
+        """Random sorting: the seed from the response keeps the order when next pages are requested (&seed=&page=)"""
+        try:
+            seed = int(self.request.GET["seed"])
+        except (KeyError, ValueError):
+            seed = random_movies.new_seed()
+        try:
+            page = max(int(self.request.GET["page"]), 1)
+        except (KeyError, ValueError):
+            page = None
 
-class SearchView(GenreYear, ListView):
+        return JsonResponse({"movies": self.get_queryset(sorting="4", seed=seed, page=page), "seed": seed})
+
+
+class SearchView(ReplicaReadMixin, GenreYear, ListView):
     """Поиск фильмов по названию"""
     template_name = "rating_movies/main.html"
     context_object_name = "movies"
@@ -116,27 +137,27 @@ class SearchView(GenreYear, ListView):
         return self.request.GET.get("q", "")
 
 
-class ActorsDirectorsView(GenreYear, ListView):
+class ActorsDirectorsView(ReplicaReadMixin, GenreYear, ListView):
     """Список актёров и режиссёров"""
     template_name = "rating_movies/list/actors_directors.html"
     queryset = read.get_all_actors_directors_ordered_by_parameter("name")
 
 
-class CategoriesView(GenreYear, ListView):
+class CategoriesView(ReplicaReadMixin, GenreYear, ListView):
     """Список категорий"""
     template_name = "rating_movies/list/categories.html"
     queryset = read.get_all_categories_ordered_by_parameter("id")
     context_object_name = "categories"
 
 
-class GenresView(GenreYear, ListView):
+class GenresView(ReplicaReadMixin, GenreYear, ListView):
     """Список жанров"""
     template_name = "rating_movies/list/genres.html"
     queryset = read.get_all_genres_ordered_by_parameter("id")
     context_object_name = "genres"
 
 
-class GenreDetailView(GenreYear, ListView):
+class GenreDetailView(ReplicaReadMixin, page_cache.AnonymousPageCacheMixin, GenreYear, ListView):
     """Список фильмов заданного жанра"""
     template_name = "rating_movies/main.html"
     context_object_name = "movies"
@@ -147,7 +168,7 @@ class GenreDetailView(GenreYear, ListView):
         return super().get(request, *args, **kwargs)
 
 
-class CategoryDetailView(GenreYear, ListView):
+class CategoryDetailView(ReplicaReadMixin, page_cache.AnonymousPageCacheMixin, GenreYear, ListView):
     """Список объектов в данной категории"""
     template_name = "rating_movies/main.html"
     context_object_name = "movies"
@@ -158,15 +179,22 @@ class CategoryDetailView(GenreYear, ListView):
         return super().get(request, *args, **kwargs)
 
 
-class MovieDetailView(GenreYear, DetailView):
+class MovieDetailView(ReplicaReadMixin, page_cache.AnonymousPageCacheMixin, GenreYear, DetailView):
     """Полное описание фильма"""
     template_name = "rating_movies/detail/movie_detail.html"
     context_object_name = "movie"
     star_form = forms.RatingForm
     review_form = forms.ReviewForm
 
+    def get_page_versions(self, request: WSGIRequest) -> tuple:
+        movie_slug = self.kwargs.get("slug")
+        return super().get_page_versions(request) + (
+            page_cache.get_movie_version(movie_slug),
+            page_cache.get_anonymous_user_rating(request, movie_slug),
+        )
+
     def get_object(self, queryset=None):
-        self.movie = read.get_movie_by_parameters(url=self.kwargs.get("slug"))
+        self.movie = read.get_movie_for_detail_page(slug=self.kwargs.get("slug"), request=self.request)
         if not self.movie:
             raise Http404("Such movie does not exist")
         utils.change_movie_fields(self.movie)
@@ -174,20 +202,21 @@ class MovieDetailView(GenreYear, DetailView):
 
     def get_context_data(self, *args, **kwargs):
         context = super().get_context_data(**kwargs)
+        other_sources_rating = self.movie.other_sources_ratings[0].rating if self.movie.other_sources_ratings else None
 
         context["star_form"] = self.star_form
         context["review_form"] = self.review_form
-        context["user_rating"] = str(read.get_movie_rating(request=self.request, movie_id=self.movie.pk))
+        context["user_rating"] = str(self.movie.user_rating)
         # для корректного сравнения в шаблоне user_rating должен быть типа str
-        context["average_rating"] = read.fetch_average_movie_rating(movie_id=self.movie.pk)
-        context["movie_rating"] = utils.add_class_color_to_movie_rating(read.get_other_sources_rating(self.movie))
+        context["average_rating"] = self.movie.average_rating
+        context["movie_rating"] = utils.add_class_color_to_movie_rating(other_sources_rating)
         # return movie rating from api with identified colors
-        context["movie_reviews"] = read.get_movie_reviews(self.movie)
-        context["is_movie"] = read.is_movie_in_user_watchlist(movie=self.movie, user=self.request.user)
+        context["movie_reviews"] = self.movie.parent_reviews
+        context["is_movie"] = self.movie.is_in_watchlist
         return context
 
 
-class ActorDirectorDetailView(GenreYear, DetailView):
+class ActorDirectorDetailView(ReplicaReadMixin, GenreYear, DetailView):
     """Полное описание актёра/режиссёра"""
     template_name = "rating_movies/detail/actor_director_detail.html"
     context_object_name = "actor_director"
@@ -503,19 +532,23 @@ class CryptoCurrencyView(View):
 
     def get(self, request):
         data = {
-            "crypto_currency_data": get_crypto_currency_data(),
+            "crypto_currency_data": get_crypto_currency_page(offset=request.GET.get("offset"),
+                                                             limit=request.GET.get("rows")),
             "form": self.form,
             "back_link": utils.get_previous_url(request)
         }
         return render(request, self.template, context=data)
 
     def post(self, request: WSGIRequest):
-        rows = request.POST.get("rows")
-        sorting = request.POST.get("sorting")
-        crypto_currency_data = get_crypto_currency_data(rows=rows)
+        crypto_currency_data = get_crypto_currency_page(
+            offset=request.POST.get("offset"),
+            limit=request.POST.get("rows"),
+            sorting=request.POST.get("sorting"),
+        )
+        # таблица сортируется целиком, а выводится только окно [offset, offset + rows)
 
         data = {
-            "crypto_currency_data": sort_crypto_currency(sorting=sorting, crypto_currency_data=crypto_currency_data),
+            "crypto_currency_data": crypto_currency_data,
             "form": self.form(request.POST),
             "back_link": utils.get_previous_url(request)
         }
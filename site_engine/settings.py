@@ -84,6 +84,7 @@ MIDDLEWARE = [
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
+    "rating_movies.services.db_routing.ReplicaRoutingMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
     "django.contrib.flatpages.middleware.FlatpageFallbackMiddleware",
@@ -165,9 +166,25 @@ DATABASES = {
         "PASSWORD": environ["DATABASE_PASSWORD"],
         "HOST": environ["DATABASE_HOST"],
         "PORT": environ["DATABASE_PORT"],
+        "CONN_MAX_AGE": int(environ.get("DATABASE_CONN_MAX_AGE", 60)),
+        # persistent connections: a request reuses the worker's connection instead of opening a new one
     }
 }
 
+DATABASE_REPLICAS = []
+for number, replica_host in enumerate(filter(None, environ.get("DATABASE_REPLICA_HOSTS", "").split(",")), 1):
+    # read-only replicas of the default database, e.g. DATABASE_REPLICA_HOSTS=10.0.0.2,10.0.0.3
+    DATABASE_REPLICAS.append(f"replica_{number}")
+    DATABASES[f"replica_{number}"] = {
+        **DATABASES["default"],
+        "HOST": replica_host.strip(),
+        "TEST": {"MIRROR": "default"},
+    }
+
+DATABASE_ROUTERS = ["rating_movies.services.db_routing.ReplicaRouter"]
+DATABASE_REPLICA_PIN_SECONDS = int(environ.get("DATABASE_REPLICA_PIN_SECONDS", 10))
+# after a write the session reads from the default database until replicas catch up
+
 AUTHENTICATION_BACKENDS = (
     "django.contrib.auth.backends.ModelBackend",
     "allauth.account.auth_backends.AuthenticationBackend",
@@ -328,9 +345,21 @@ INTERNAL_IPS = [
 
 CACHES = {
     "default": {
+        "BACKEND": "rating_movies.services.tiered_cache.TieredCache",
+        "OPTIONS": {
+            "SHARED_ALIAS": "shared",
+            "LOCAL_TIMEOUT": 5,
+            "MAX_ENTRIES": 1000,
+        },
+    },
+    # local per-process level in front of the shared cache, see rating_movies/services/tiered_cache.py
+    "shared": {
+        "BACKEND": "django.core.cache.backends.redis.RedisCache",
+        "LOCATION": environ["REDIS_URL"],
+    } if environ.get("REDIS_URL") else {
         "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
-        "LOCATION": BASE_DIR / "rating_movies" / "rating_movies_cache",
-    }
+        "LOCATION": str(BASE_DIR / "rating_movies" / "rating_movies_cache"),
+    },
 }
 
 